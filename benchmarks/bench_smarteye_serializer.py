@@ -0,0 +1,140 @@
+"""Per-packet cost of SEListener.prepare_data, before and after the compiled serializer.
+
+Run from the repository root:
+    python benchmarks/bench_smarteye_serializer.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sep.sepd import Packet
+from sep.se_types import SEType_Point3D, SEType_Quaternion, SEType_Vect3D, SEType_WorldIntersectionItem, SEType_u16
+
+from smarteye import SEListener
+
+RATES_HZ = (120, 250)
+
+
+class _KeyRecorder(dict):
+    """Dict that remembers the last sub-packet id a Packet property looked up."""
+
+    def get(self, key, default=None):
+        self.last_key = key
+        return default
+
+
+def _subpacket_id(name):
+    recorder = _KeyRecorder()
+    getattr(Packet(recorder), name)
+    return recorder.last_key
+
+
+def make_packet(values):
+    """Build a real sep Packet with the given property values."""
+    return Packet({SEType_u16(_subpacket_id(name)): value for name, value in values.items()})
+
+
+def sample_packet():
+    point = SEType_Point3D(0.1, 0.2, 0.3)
+    vector = SEType_Vect3D(0.01, -0.02, 0.99)
+    intersection = SEType_WorldIntersectionItem(world_point=point, object_point=point, object_name="Windshield")
+    return make_packet({
+        "frame_number": 123456,
+        "estimated_delay": 12000,
+        "time_stamp": 987654321,
+        "real_time_clock": 1700000000000,
+        "frame_rate": 120.0,
+        "left_gaze_direction": vector,
+        "right_gaze_direction": vector,
+        "left_eye_position": point,
+        "right_eye_position": point,
+        "head_rotation_quality": 0.9,
+        "head_roll": 0.01,
+        "head_pitch": 0.02,
+        "head_heading": 0.03,
+        "head_position": point,
+        "head_position_quality": 0.95,
+        "head_rotation_rodrigues": vector,
+        "head_rotation_quaternion": SEType_Quaternion(w=1.0, x=0.0, y=0.0, z=0.0),
+        "fixation": 42,
+        "blink": 0,
+        "saccade": 0,
+        "left_closest_world_intersection": intersection,
+        "right_closest_world_intersection": intersection,
+    })
+
+
+def legacy_prepare_data(packet):
+    """The nested-conditional f-string SEListener.prepare_data used before."""
+    return f'{packet.frame_number if packet.frame_number is not None else 0 };\
+{packet.estimated_delay if packet.estimated_delay is not None else 0 };\
+{packet.time_stamp if packet.time_stamp is not None else 0 };\
+{packet.user_time_stamp if packet.user_time_stamp is not None else 0 };\
+{packet.real_time_clock if packet.real_time_clock is not None else 0 };\
+{packet.frame_rate if packet.frame_rate is not None else 0 };\
+{packet.left_gaze_direction.x if packet.left_gaze_direction and packet.left_gaze_direction.x is not None else 0 };\
+{packet.left_gaze_direction.y if packet.left_gaze_direction and packet.left_gaze_direction.y is not None else 0 };\
+{packet.left_gaze_direction.z if packet.left_gaze_direction and packet.left_gaze_direction.z is not None else 0 };\
+{packet.right_gaze_direction.x if packet.right_gaze_direction and packet.right_gaze_direction.x is not None else 0 };\
+{packet.right_gaze_direction.y if packet.right_gaze_direction and packet.right_gaze_direction.y is not None else 0 };\
+{packet.right_gaze_direction.z if packet.right_gaze_direction and packet.right_gaze_direction.z is not None else 0 };\
+{packet.left_eye_position.x if packet.left_eye_position and packet.left_eye_position.x is not None else 0 };\
+{packet.left_eye_position.y if packet.left_eye_position and packet.left_eye_position.y is not None else 0 };\
+{packet.left_eye_position.z if packet.left_eye_position and packet.left_eye_position.z is not None else 0 };\
+{packet.right_eye_position.x if packet.right_eye_position and packet.right_eye_position.x is not None else 0 };\
+{packet.right_eye_position.y if packet.right_eye_position and packet.right_eye_position.y is not None else 0 };\
+{packet.right_eye_position.z if packet.right_eye_position and packet.right_eye_position.z is not None else 0 };\
+{packet.head_rotation_quality if packet.head_rotation_quality is not None else 0 };\
+{packet.head_roll if packet.head_roll is not None else 0 };\
+{packet.head_pitch if packet.head_pitch is not None else 0 };\
+{packet.head_heading if packet.head_heading is not None else 0 };\
+{packet.head_position.x if packet.head_position and packet.head_position.x is not None else 0 };\
+{packet.head_position.y if packet.head_position and packet.head_position.y is not None else 0 };\
+{packet.head_position.z if packet.head_position and packet.head_position.z is not None else 0 };\
+{packet.head_position_quality if packet.head_position_quality is not None else 0 };\
+{packet.head_rotation_rodrigues.x if packet.head_rotation_rodrigues and packet.head_rotation_rodrigues.x is not None else 0 };\
+{packet.head_rotation_rodrigues.y if packet.head_rotation_rodrigues and packet.head_rotation_rodrigues.y is not None else 0 };\
+{packet.head_rotation_rodrigues.z if packet.head_rotation_rodrigues and packet.head_rotation_rodrigues.z is not None else 0 };\
+{packet.head_rotation_quaternion.x if packet.head_rotation_quaternion and packet.head_rotation_quaternion.x is not None else 0 };\
+{packet.head_rotation_quaternion.y if packet.head_rotation_quaternion and packet.head_rotation_quaternion.y is not None else 0 };\
+{packet.head_rotation_quaternion.z if packet.head_rotation_quaternion and packet.head_rotation_quaternion.z is not None else 0 };\
+{packet.head_rotation_quaternion.w if packet.head_rotation_quaternion and packet.head_rotation_quaternion.w is not None else 0 };\
+{packet.fixation if packet.fixation is not None else 0 };\
+{packet.blink if packet.blink is not None else 0 };\
+{packet.saccade if packet.saccade is not None else 0 };\
+{1 if packet.left_closest_world_intersection is not None else 0 };\
+{packet.left_closest_world_intersection.world_point.x if packet.left_closest_world_intersection and packet.left_closest_world_intersection.world_point and packet.left_closest_world_intersection.world_point.x is not None else 0 };\
+{packet.left_closest_world_intersection.world_point.y if packet.left_closest_world_intersection and  packet.left_closest_world_intersection.world_point and packet.left_closest_world_intersection.world_point.y is not None else 0 };\
+{packet.left_closest_world_intersection.world_point.z if packet.left_closest_world_intersection and  packet.left_closest_world_intersection.world_point and packet.left_closest_world_intersection.world_point.z is not None else 0 };\
+{1 if packet.right_closest_world_intersection is not None else 0 };\
+{packet.right_closest_world_intersection.world_point.x if packet.right_closest_world_intersection and  packet.right_closest_world_intersection.world_point and packet.right_closest_world_intersection.world_point.x is not None else 0 };\
+{packet.right_closest_world_intersection.world_point.y if packet.right_closest_world_intersection and  packet.right_closest_world_intersection.world_point and packet.right_closest_world_intersection.world_point.y is not None else 0 };\
+{packet.right_closest_world_intersection.world_point.z if packet.right_closest_world_intersection and  packet.right_closest_world_intersection.world_point and packet.right_closest_world_intersection.world_point.z is not None else 0 };\
+{packet.left_closest_world_intersection.object_name if packet.left_closest_world_intersection and packet.left_closest_world_intersection.object_name is not None else "" };\
+{packet.right_closest_world_intersection.object_name if packet.right_closest_world_intersection and packet.right_closest_world_intersection.object_name is not None else "" }'
+
+
+def per_call_seconds(function, arg, repeat=5, number=20000):
+    return min(timeit.repeat(lambda: function(arg), repeat=repeat, number=number)) / number
+
+
+def main():
+    packet = sample_packet()
+    listener = SEListener(port=0)
+    assert legacy_prepare_data(packet) == listener.prepare_data(packet)
+
+    results = {
+        "before (f-string)": per_call_seconds(legacy_prepare_data, packet),
+        "after (compiled)": per_call_seconds(listener.prepare_data, packet),
+    }
+    for name, seconds in results.items():
+        load = ", ".join(f"{rate} Hz: {seconds * rate * 100:.3f}% CPU" for rate in RATES_HZ)
+        print(f"{name:<18} {seconds * 1e6:8.2f} us/packet  ({load})")
+    before, after = results.values()
+    print(f"speedup: {before / after:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""Minimal benchmark harness: throughput and per-call memory of a callable.
+
+For every benchmark it reports:
+    ops/s        calls per second (best of several timeit repeats)
+    ns/op        the inverse, in nanoseconds
+    peak B/op    largest transient memory a single call allocates (tracemalloc)
+    net blk/op   memory blocks still allocated per call afterwards (leaks, caches)
+"""
+import gc
+import json
+import sys
+import timeit
+import tracemalloc
+
+
+class BenchmarkResult:
+    def __init__(self, name, ns_per_op, peak_bytes, net_blocks):
+        self.name = name
+        self.ns_per_op = ns_per_op
+        self.peak_bytes = peak_bytes
+        self.net_blocks = net_blocks
+
+    @property
+    def ops_per_sec(self):
+        return 1e9 / self.ns_per_op if self.ns_per_op else float("inf")
+
+    def as_dict(self):
+        return {"name": self.name, "ns_per_op": self.ns_per_op, "ops_per_sec": self.ops_per_sec,
+                "peak_bytes": self.peak_bytes, "net_blocks": self.net_blocks}
+
+
+def measure(name, function, *args, repeat=5, min_time=0.2, memory_calls=200):
+    """Benchmark function(*args)."""
+    call = lambda: function(*args)
+    timer = timeit.Timer(call)
+    number, elapsed = timer.autorange()
+    number = max(number, int(number * min_time / max(elapsed, 1e-9)))
+    ns_per_op = min(timer.repeat(repeat=repeat, number=number)) / number * 1e9
+
+    gc.collect()
+    tracemalloc.start()
+    try:
+        call()
+        peak_bytes = 0
+        for _ in range(memory_calls):
+            tracemalloc.reset_peak()
+            current = tracemalloc.get_traced_memory()[0]
+            call()
+            peak_bytes = max(peak_bytes, tracemalloc.get_traced_memory()[1] - current)
+    finally:
+        tracemalloc.stop()
+
+    gc.collect()
+    blocks = sys.getallocatedblocks()
+    for _ in range(memory_calls):
+        call()
+    gc.collect()
+    net_blocks = (sys.getallocatedblocks() - blocks) / memory_calls
+
+    return BenchmarkResult(name, ns_per_op, peak_bytes, net_blocks)
+
+
+def print_results(results, baseline=None):
+    header = f"{'benchmark':<40} {'ops/s':>12} {'ns/op':>10} {'peak B/op':>10} {'net blk/op':>10}"
+    if baseline:
+        header += f" {'vs base':>8}"
+    print(header)
+    print("-" * len(header))
+    for result in results:
+        line = (f"{result.name:<40} {result.ops_per_sec:>12,.0f} {result.ns_per_op:>10.0f} "
+                f"{result.peak_bytes:>10} {result.net_blocks:>10.2f}")
+        if baseline and result.name in baseline:
+            line += f" {result.ns_per_op / baseline[result.name]['ns_per_op']:>7.2f}x"
+        print(line)
+
+
+def save_results(results, path):
+    with open(path, "w") as f:
+        json.dump({result.name: result.as_dict() for result in results}, f, indent=2)
+
+
+def load_results(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def regressions(results, baseline, tolerance):
+    """Return the results slower than baseline by more than tolerance (0.2 = 20%)."""
+    return [result for result in results
+            if result.name in baseline and result.ns_per_op > baseline[result.name]["ns_per_op"] * (1 + tolerance)]
@@ -0,0 +1,225 @@
+"""Benchmarks of the sensor parsing and formatting hot paths.
+
+Inputs are synthetic, generated by simulators.py, so this runs headless on
+Linux without any hardware. Run from the repository root:
+
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py -k gps --save baseline.json
+    python benchmarks/run_benchmarks.py --compare baseline.json --tolerance 0.2
+
+With --compare, the exit status is 1 if any benchmark is slower than the
+baseline by more than the tolerance.
+"""
+import argparse
+import itertools
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "PythonExamples"))
+
+from harness import load_results, measure, print_results, regressions, save_results
+
+
+def gps_cases():
+    from gps import GPSListener
+    from nmea import NMEAParser
+    from simulators import nmea_chunks
+
+    parser = NMEAParser()
+    epoch = next(nmea_chunks(10))
+    gga, rmc = epoch.split(b"\r\n")[:2]
+    yield "NMEAParser.parse GGA", parser.parse, gga
+    yield "NMEAParser.parse RMC", parser.parse, rmc
+    yield "NMEAParser.feed GGA + RMC epoch", parser.feed, epoch
+
+    listener = GPSListener("SIMULATED", None)
+    # Generated up front, so the case does not time the simulator
+    generator = nmea_chunks(10)
+    epochs = itertools.cycle([next(generator).split(b"\r\n")[:2] for _ in range(1000)])
+
+    def process_epoch():
+        for line in next(epochs):
+            listener.process_line(line, 0)
+
+    process_epoch()
+    yield "GPSListener.process_line GGA + RMC epoch", process_epoch
+
+
+def gps_kalman_cases():
+    from gps_kalman import GPSKalmanFilter
+
+    kalman = GPSKalmanFilter()
+    kalman.update(0.0, 32.0853, 34.7818)
+    fixes = itertools.cycle([(0.1 * i, 32.0853 + 1e-5 * i, 34.7818, 0.8, 12.0, 3.0) for i in range(1, 1001)])
+
+    def update():
+        return kalman.update(*next(fixes))
+
+    yield "GPSKalmanFilter.update", update
+
+
+def heart_rate_cases():
+    from heart_rate import decode_heart_rate
+    from simulators import heart_rate_measurement
+
+    one_rr = heart_rate_measurement(72, [0.83])
+    three_rr = heart_rate_measurement(72, [0.83, 0.81, 0.85])
+    yield "decode_heart_rate 1 RR", decode_heart_rate, one_rr
+    yield "decode_heart_rate 3 RR", decode_heart_rate, three_rr
+
+
+def hrv_cases():
+    from hrv import HRVEngine
+
+    engine = HRVEngine(300.0)
+    for i in range(400):
+        engine.add(0.8 + 0.01 * (i % 5))
+
+    def add_beat(rr):
+        engine.add(rr)
+        return engine.features()
+
+    yield "HRVEngine add + features (full 300 s window)", add_beat, 0.8125
+
+
+def rr_filter_cases():
+    from rr_filter import RRArtifactFilter
+
+    rr_filter = RRArtifactFilter()
+    for i in range(20):
+        rr_filter.check(0.8 + 0.01 * (i % 5))
+    yield "RRArtifactFilter.check normal beat", rr_filter.check, 0.8125
+    yield "RRArtifactFilter.check out-of-range beat", rr_filter.check, 3.0
+
+
+def heart_rate_batch_cases():
+    import numpy  # noqa: F401 - the batch decoder needs it
+    from heart_rate import decode_heart_rate_batch
+    from simulators import heart_rate_measurement
+
+    notifications = [heart_rate_measurement(60 + i % 40, [0.8, 0.82][:1 + i % 2]) for i in range(1000)]
+    yield "decode_heart_rate_batch 1000 notifications", decode_heart_rate_batch, notifications
+
+
+def smarteye_cases():
+    from sep.sepd import Parser
+    from smarteye import SEListener, _extract_sep_dx
+    from simulators import sepd_packets
+
+    packet = Parser().parse_packet(next(sepd_packets(120)))
+    yield "SEListener.prepare_data", SEListener(0).prepare_data, packet
+    yield "smarteye._extract_sep_dx", _extract_sep_dx, packet
+
+
+def trigger_box_cases():
+    from trigger_box import TriggerBoxListener
+
+    listener = TriggerBoxListener(["FP_LEFT", "FP_RIGHT", "DRIVE", "DONE"], "SIMULATED", None)
+    yield "TriggerBoxListener.parse_trigger first", listener.parse_trigger, b"1"
+    yield "TriggerBoxListener.parse_trigger last", listener.parse_trigger, b"4"
+    yield "TriggerBoxListener.process_line", listener.process_line, b"4\r\n", 0
+    # Device times 2 ms apart; the jump back at the end of the cycle restarts the clock estimate
+    timed_lines = itertools.cycle([b"4,%d\r\n" % (i * 2000) for i in range(1000)])
+
+    def process_timed_line():
+        listener.process_line(next(timed_lines), time.perf_counter_ns())
+
+    yield "TriggerBoxListener.process_line with device time", process_timed_line
+
+
+def trigger_frame_cases():
+    from trigger_box import TriggerBoxListener
+    from trigger_frames import FrameDecoder, encode_frame
+
+    decoder = FrameDecoder()
+    yield "FrameDecoder.feed one frame", decoder.feed, encode_frame(4, 123456789), 0
+    yield "FrameDecoder.feed 8 frames", decoder.feed, b"".join(encode_frame(i % 5, i * 1000) for i in range(8)), 0
+
+    listener = TriggerBoxListener(["FP_LEFT", "FP_RIGHT", "DRIVE", "DONE"], "SIMULATED", None, protocol="binary")
+    # Device times 2 ms apart; the jump back at the end of the cycle restarts the clock estimate
+    frames = itertools.cycle([decoder.feed(encode_frame(4, i * 2000))[0] for i in range(1000)])
+
+    def process_frame():
+        trigger_id, micros, _ = next(frames)
+        listener.process_frame(trigger_id, micros, time.perf_counter_ns())
+
+    yield "TriggerBoxListener.process_frame", process_frame
+
+
+def serial_cases():
+    from sensor_runtime import LineBuffer
+    from simulators import nmea_chunks
+
+    lines = LineBuffer()
+    yield "LineBuffer.feed GGA + RMC epoch", lines.feed, next(nmea_chunks(10))
+    yield "LineBuffer.feed trigger line", lines.feed, b"1\r\n"
+
+
+def utils_cases():
+    from utils import haversine_distance
+
+    yield "utils.haversine_distance", haversine_distance, 32.0853, 34.7818, 32.0854, 34.7819
+
+
+def encoder_cases():
+    from imotions_schema import get_encoder
+    from sep.sepd import Parser
+    from smarteye import _extract_sep_dx
+    from simulators import sepd_packets
+
+    values = _extract_sep_dx(Parser().parse_packet(next(sepd_packets(120))))
+    yield "get_encoder('SEP_DX')", get_encoder("SEP_DX"), values
+    yield "get_encoder('GPS')", get_encoder("GPS"), ("120000.00", 12, 32.0853, 34.7818, 35.2, 12.3, 0.1)
+
+
+def can_client_cases():
+    from can_client import CanClient
+
+    data = [0x12, 0x34, 0x56, 0x78, 0x9A, 0xBC, 0xDE, 0xF0]
+    yield "CanClient.get_data 2 bytes", CanClient.get_data, 2, data, 0
+    yield "CanClient.get_data 4 bytes", CanClient.get_data, 4, data, 4
+    yield "CanClient.get_data_signed 2 bytes", CanClient.get_data_signed, 2, data, 0
+    yield "CanClient.get_data_signed 4 bytes", CanClient.get_data_signed, 4, data, 4
+
+
+CASE_GROUPS = [gps_cases, gps_kalman_cases, heart_rate_cases, heart_rate_batch_cases, hrv_cases, rr_filter_cases,
+               smarteye_cases, trigger_box_cases, trigger_frame_cases, serial_cases, utils_cases, encoder_cases,
+               can_client_cases]
+
+
+def collect_cases(keyword=None):
+    """Return (name, function, args) of every case matching keyword; skipped groups are reported."""
+    cases = []
+    for group in CASE_GROUPS:
+        try:
+            for name, function, *args in group():
+                if keyword is None or keyword.lower() in name.lower():
+                    cases.append((name, function, args))
+        except ImportError as e:
+            print(f"skipping {group.__name__}: {e}", file=sys.stderr)
+    return cases
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the sensor hot paths")
+    parser.add_argument("-k", dest="keyword", help="only run benchmarks whose name contains this")
+    parser.add_argument("--repeat", type=int, default=5, help="timeit repeats per benchmark")
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="compare against a JSON file written by --save")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown vs --compare (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    results = [measure(name, function, *case_args, repeat=args.repeat)
+               for name, function, case_args in collect_cases(args.keyword)]
+    baseline = load_results(args.compare) if args.compare else None
+    print_results(results, baseline)
+    if args.save:
+        save_results(results, args.save)
+    if baseline:
+        slower = regressions(results, baseline, args.tolerance)
+        for result in slower:
+            print(f"REGRESSION: {result.name} is {result.ns_per_op / baseline[result.name]['ns_per_op']:.2f}x the baseline")
+        sys.exit(1 if slower else 0)
@@ -0,0 +1,184 @@
+"""Fast BLE device lookup backed by a persistent cache of last-seen wearables.
+
+A full BleakScanner.discover() costs its whole timeout on every connect. The
+listeners instead connect, in order, to:
+
+1. a device the background scanner saw advertising in the last few seconds,
+2. the configured or cached address, directly, without any scan
+   (known_target() returns one of these two),
+3. only if that fails, a device found by find(): a short scan filtered by
+   the device's name.
+
+Whatever the scan finds is written to the cache file, so the next session
+connects at step 2 right away.
+"""
+import json
+import logging
+import os
+import time
+
+from bleak import BleakScanner
+
+logger = logging.getLogger(__name__)
+
+
+class DeviceCache:
+    """Last-seen address and metadata of each wearable, keyed by role (e.g. "H10"), saved as JSON."""
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path) as f:
+                self.entries = json.load(f)
+        except FileNotFoundError:
+            self.entries = {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable BLE device cache {self.path}: {e}")
+            self.entries = {}
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def update(self, key, address, name=None, rssi=None):
+        """Store a sighting of key; returns True if the address changed."""
+        entry = self.entries.get(key) or {}
+        changed = entry.get("address") != address
+        entry.update({"address": address, "name": name or entry.get("name"), "last_seen": time.time()})
+        if rssi is not None:
+            entry["rssi"] = rssi
+        self.entries[key] = entry
+        return changed
+
+    def save(self):
+        """Write the cache atomically, so a crash never leaves half a file."""
+        tmp_path = self.path + ".tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(self.entries, f, indent=2, sort_keys=True)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            logger.warning(f"Failed to save BLE device cache {self.path}: {e}")
+
+
+class BLEDiscovery:
+    """Find wearables by role through the cache or a short filtered scan.
+
+    matcher(name) decides whether an advertised name belongs to the role.
+    address_timeout_s bounds a direct connect to a known address. All
+    coroutines must run on the same event loop (the shared sensor runtime).
+    """
+
+    def __init__(self, cache_path="ble_devices.json", address_timeout_s=2.0, scan_timeout_s=3.0, warm_max_age_s=10.0):
+        self.cache = DeviceCache(cache_path)
+        self.address_timeout_s = address_timeout_s
+        self.scan_timeout_s = scan_timeout_s
+        self.warm_max_age_s = warm_max_age_s
+        self._matchers = {}
+        # address -> (BLEDevice, monotonic time seen), filled by the background scanner
+        self._seen = {}
+        self._scanner = None
+
+    def register(self, key, matcher):
+        """Tell the background scanner which advertisements belong to key."""
+        self._matchers[key] = matcher
+
+    def warm_device(self, address):
+        """Return the BLEDevice of address if the background scanner saw it recently, else None."""
+        seen = self._seen.get(address.upper())
+        if seen is not None and time.monotonic() - seen[1] <= self.warm_max_age_s:
+            return seen[0]
+        return None
+
+    def remember(self, key, device, rssi=None):
+        """Record that key was found as device and persist it."""
+        if self.cache.update(key, device.address, device.name, rssi):
+            logger.info(f"BLE cache: {key} is {device.address} ({device.name})")
+        self.cache.save()
+
+    def forget(self, address):
+        """Drop a warm sighting of address, e.g. after connecting to it failed."""
+        self._seen.pop(address.upper(), None)
+
+    def known_target(self, key, address=None):
+        """Return what to connect key to without a scan, or None.
+
+        That is a recent background sighting of the configured address or the
+        cached one, else the configured address, else the cached one.
+        """
+        cached = self.cache.get(key)
+        candidates = [a for a in (address, cached and cached.get("address")) if a]
+        for candidate in candidates:
+            device = self.warm_device(candidate)
+            if device is not None:
+                logger.info(f"{key}: using {candidate} seen by the background scanner")
+                return device
+        return candidates[0] if candidates else None
+
+    async def find(self, key, matcher):
+        """Scan for an advertisement matching key; return its BLEDevice, or None."""
+        self.register(key, matcher)
+        logger.info(f"{key}: scanning for up to {self.scan_timeout_s:.1f} s...")
+        found = {}
+
+        def detected(device, advertisement_data):
+            if matcher(device.name or advertisement_data.local_name or ""):
+                found["rssi"] = advertisement_data.rssi
+                return True
+            return False
+
+        device = await BleakScanner.find_device_by_filter(detected, timeout=self.scan_timeout_s)
+        if device is not None:
+            self.remember(key, device, found.get("rssi"))
+        return device
+
+    async def start_background_scan(self, scanning_mode="passive"):
+        """Keep scanning in the background so find() can skip the scan; passive mode sends no scan requests."""
+        if self._scanner is not None:
+            return
+        try:
+            self._scanner = BleakScanner(detection_callback=self._on_advertisement, scanning_mode=scanning_mode)
+            await self._scanner.start()
+        except Exception as e:
+            self._scanner = None
+            if scanning_mode == "passive":
+                # BlueZ needs or_patterns for passive scans; an active scan works everywhere
+                logger.info(f"Passive BLE scan unavailable ({e}), using an active scan")
+                await self.start_background_scan("active")
+            else:
+                logger.error(f"Background BLE scan failed: {e}")
+            return
+        logger.info(f"Background BLE scan started ({scanning_mode})")
+
+    async def stop_background_scan(self):
+        if self._scanner is not None:
+            scanner, self._scanner = self._scanner, None
+            try:
+                await scanner.stop()
+            except Exception as e:
+                logger.warning(f"Stopping the background BLE scan failed: {e}")
+
+    def _on_advertisement(self, device, advertisement_data):
+        address = device.address.upper()
+        self._seen[address] = (device, time.monotonic())
+        name = device.name or advertisement_data.local_name or ""
+        for key, matcher in self._matchers.items():
+            cached = self.cache.get(key)
+            if (cached and cached.get("address", "").upper() == address) or (cached is None and matcher(name)):
+                # Only write the file when the address is new, not on every advertisement
+                if self.cache.update(key, device.address, name, advertisement_data.rssi):
+                    self.cache.save()
+
+
+_default_discovery = None
+
+
+def default_discovery():
+    """Return the process-wide BLEDiscovery used by listeners that were not given one."""
+    global _default_discovery
+    if _default_discovery is None:
+        _default_discovery = BLEDiscovery()
+    return _default_discovery
@@ -0,0 +1,321 @@
+"""Many BLE heart-rate wearables on one event loop.
+
+BLEHub runs one scan for all configured addresses, connects to the devices
+concurrently and multiplexes their Heart Rate Measurement notifications.
+Each device is sent to IMotions with its own instance id, so the H10 chest
+straps and Vivosmart wristbands of several participants can be recorded in
+the same session.
+"""
+import asyncio
+import logging
+import time
+
+from bleak import BleakClient, BleakScanner
+
+from ble_discovery import default_discovery
+from heart_rate import HR_CHAR_UUID, RR_LAST, RR_MODES, decode_heart_rate, rr_samples
+from hrv import HRVEngine
+from rr_filter import RRArtifactFilter
+from sensor import Sensor, backoff_delay
+
+logger = logging.getLogger(__name__)
+
+
+class HubDevice:
+    """One configured wearable and its throughput and reconnect statistics."""
+
+    def __init__(self, sample_id, address, instance, hrv_window_s=None, artifact_threshold=None):
+        self.sample_id = sample_id  # IMotions Sample it is sent as: "H10" or "Vivosmart5"
+        self.address = address
+        self.instance = str(instance)
+        self.hrv = HRVEngine(hrv_window_s) if hrv_window_s else None
+        self.rr_filter = RRArtifactFilter(artifact_threshold) if artifact_threshold else None
+        self.connected = False
+        self.notifications = 0
+        self.samples_sent = 0
+        self.errors = 0
+        self.connects = 0
+        self.connect_failures = 0
+        self.disconnects = 0
+        self.last_connect_s = None
+        self._connected_since = None
+        self._connected_s = 0.0
+
+    @property
+    def name(self):
+        return f"{self.sample_id}/{self.instance}"
+
+    def mark_connected(self, connect_s):
+        self.connected = True
+        self.connects += 1
+        self.last_connect_s = connect_s
+        self._connected_since = time.monotonic()
+
+    def mark_disconnected(self):
+        if self.connected:
+            self.connected = False
+            self.disconnects += 1
+            self._connected_s += time.monotonic() - self._connected_since
+            self._connected_since = None
+
+    def connected_seconds(self):
+        if self._connected_since is None:
+            return self._connected_s
+        return self._connected_s + time.monotonic() - self._connected_since
+
+    def snapshot(self):
+        connected_s = self.connected_seconds()
+        return {
+            "address": self.address,
+            "connected": self.connected,
+            "notifications": self.notifications,
+            "samples_sent": self.samples_sent,
+            "rate_hz": self.notifications / connected_s if connected_s > 0 else 0.0,
+            "errors": self.errors,
+            "artifacts": self.rr_filter.corrected if self.rr_filter is not None else 0,
+            "connects": self.connects,
+            "connect_failures": self.connect_failures,
+            "disconnects": self.disconnects,
+            "last_connect_s": self.last_connect_s,
+            "connected_s": connected_s,
+        }
+
+
+class BLEHub(Sensor):
+    """Connect to a list of (sample_id, address, instance) wearables and stream all of them.
+
+    Every device reconnects on its own when it drops out, while the others
+    keep streaming; retries back off exponentially from reconnect_delay_s up
+    to reconnect_max_s. The hub reports connected while at least one device
+    is connected.
+    """
+
+    def __init__(self, devices, stream, callback=None, scan_timeout_s=5.0, reconnect_delay_s=1.0, simulated_rate_hz=None,
+                 discovery=None, rr_mode=RR_LAST, hrv_window_s=None, artifact_threshold=None):
+        super().__init__()
+        self.devices = [HubDevice(*device, hrv_window_s=hrv_window_s, artifact_threshold=artifact_threshold) for device in devices]
+        self.stream = stream
+        self.callback = callback
+        self.scan_timeout_s = scan_timeout_s
+        # Per-device retries; reconnect_initial_s is the supervise() backoff of the hub as a whole
+        self.reconnect_delay_s = reconnect_delay_s
+        self.simulated_rate_hz = simulated_rate_hz
+        self.discovery = discovery
+        self.rr_mode = rr_mode
+        self.running = False
+        self._loop = None
+        self._stop_event = None
+
+    def connect(self):
+        """The hub scans and connects in start()/run(); there is nothing to open up front."""
+        return f"{len(self.devices)} devices configured"
+
+    def start(self):
+        """Run the hub in the calling thread until stop() is called."""
+        asyncio.run(self.run())
+
+    async def run(self):
+        """Scan once, then keep every configured device connected until stopped."""
+        self._loop = asyncio.get_running_loop()
+        self._stop_event = asyncio.Event()
+        self.running = True
+        self._notify_message(f"BLE Hub: Connecting {len(self.devices)} devices", "Info")
+        try:
+            found = await self._scan()
+            tasks = [asyncio.create_task(self._run_device(device, found.get(device.address.upper())))
+                     for device in self.devices]
+            try:
+                await self._stop_event.wait()
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            self.running = False
+            self._loop = None
+            self._stop_event = None
+
+    async def _scan(self):
+        """Return {address: BLEDevice} of the configured devices seen recently or in one scan."""
+        if self.simulated_rate_hz:
+            from simulators import SimulatedBLEDevice
+
+            return {device.address.upper(): SimulatedBLEDevice(device.address, f"{device.sample_id} (simulated)")
+                    for device in self.devices}
+        discovery = self.discovery or default_discovery()
+        found = {}
+        for device in self.devices:
+            # Hub devices are recognised by address only
+            discovery.register(device.name, lambda name: False)
+            ble_device = discovery.warm_device(device.address)
+            if ble_device is not None:
+                found[device.address.upper()] = ble_device
+        wanted = {device.address.upper() for device in self.devices} - found.keys()
+        if not wanted:
+            return found
+        all_found = asyncio.Event()
+
+        def detected(ble_device, advertisement_data):
+            address = ble_device.address.upper()
+            if address in wanted and address not in found:
+                found[address] = ble_device
+                if wanted <= found.keys():
+                    all_found.set()
+
+        logger.info(f"Scanning for {len(wanted)} devices...")
+        try:
+            async with BleakScanner(detection_callback=detected):
+                await asyncio.wait_for(all_found.wait(), self.scan_timeout_s)
+        except asyncio.TimeoutError:
+            logger.warning(f"Not found in scan, connecting by address: {', '.join(sorted(wanted - found.keys()))}")
+        except Exception as e:
+            logger.error(f"Scan error: {e}")
+        for device in self.devices:
+            ble_device = found.get(device.address.upper())
+            if ble_device is not None:
+                discovery.remember(device.name, ble_device)
+        return found
+
+    def _client(self, target, disconnected_callback):
+        if self.simulated_rate_hz:
+            from simulators import SimulatedBleakClient
+
+            return SimulatedBleakClient(target, self.simulated_rate_hz, disconnected_callback=disconnected_callback)
+        return BleakClient(target, disconnected_callback=disconnected_callback)
+
+    async def _run_device(self, device, ble_device):
+        """Keep one device connected and subscribed while the hub runs."""
+        target = ble_device or device.address
+        attempt = 0
+        while self.running:
+            disconnected = asyncio.Event()
+            t_start = time.monotonic()
+            try:
+                async with self._client(target, lambda client: disconnected.set()) as client:
+                    if device.hrv is not None:
+                        device.hrv.reset()
+                    if device.rr_filter is not None:
+                        device.rr_filter.reset()
+                    await client.start_notify(HR_CHAR_UUID, lambda sender, data: self._on_notification(device, data))
+                    device.mark_connected(time.monotonic() - t_start)
+                    self._update_connected()
+                    attempt = 0
+                    self._notify_message(f"BLE Hub: {device.name} connected ({device.address})", "Success")
+                    await disconnected.wait()
+                self._notify_message(f"BLE Hub: {device.name} disconnected", "Error")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                device.connect_failures += 1
+                logger.warning(f"{device.name} ({device.address}): {e}")
+            finally:
+                device.mark_disconnected()
+                self._update_connected()
+            await asyncio.sleep(backoff_delay(attempt, self.reconnect_delay_s, self.reconnect_max_s))
+            attempt += 1
+
+    def _update_connected(self):
+        """Report connected when the first device connects and disconnected when the last one drops."""
+        # stop() reports the hub disconnected itself
+        connected = self.running and any(device.connected for device in self.devices)
+        if connected != self.connected:
+            self._notify_status_change(connected)
+
+    def _on_notification(self, device, data):
+        t_received = time.perf_counter_ns()
+        t_wall = time.time()
+        device.notifications += 1
+        try:
+            measurement = decode_heart_rate(data)
+            if measurement is None:
+                return
+            samples = rr_samples(measurement[0], measurement[2], t_wall, self.rr_mode, device.hrv, device.rr_filter)
+            if self.stream:
+                self._record_parse_latency(t_received)
+                if len(samples) == 1:
+                    sent = self.stream.send_sample(device.sample_id, samples[0], t_received, self.latency,
+                                                   instance=device.instance)
+                else:
+                    sent = self.stream.send_samples(device.sample_id, samples, t_received, self.latency,
+                                                    instance=device.instance)
+                if sent is not False:
+                    device.samples_sent += len(samples)
+            if self.callback:
+                for values in samples:
+                    self.callback(device, values)
+        except Exception as e:
+            device.errors += 1
+            logger.error(f"Error handling {device.name} data: {e}")
+
+    def stats(self):
+        """Return {device name: statistics} for every configured device."""
+        return {device.name: device.snapshot() for device in self.devices}
+
+    def format_stats(self):
+        lines = ["BLE Hub devices:"]
+        for name, stats in self.stats().items():
+            state = "connected" if stats["connected"] else "disconnected"
+            lines.append(f"  {name:<16} {state:<12} {stats['rate_hz']:.1f} Hz sent={stats['samples_sent']} "
+                         f"connects={stats['connects']} failures={stats['connect_failures']} drops={stats['disconnects']} "
+                         f"artifacts={stats['artifacts']}")
+        return "\n".join(lines)
+
+    def stop(self):
+        """Disconnect every device and stop the hub."""
+        self.running = False
+        # Before waking run(): supervise() must see a stop, not a lost connection, when run() returns
+        self._stop_requested = True
+        loop, event = self._loop, self._stop_event
+        if loop is not None and event is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(event.set)
+        self._cancel_run()
+        self._notify_status_change(False)
+        self._notify_message("BLE Hub: Disconnected", "Info")
+
+    def status(self):
+        return self.running
+
+
+if __name__ == "__main__":
+    import argparse
+    import sys
+    import threading
+    from imotions_schema import get_encoder
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(levelname)s: %(message)s"
+    )
+
+    parser = argparse.ArgumentParser(description="Stream several BLE heart-rate wearables at once")
+    parser.add_argument("device", nargs="+", help="SAMPLE,ADDRESS,INSTANCE, e.g. H10,A0:9E:1A:00:00:01,P1")
+    parser.add_argument("--simulate", type=float, metavar="HZ", help="use simulated devices at this notification rate")
+    parser.add_argument("--rr-mode", choices=RR_MODES, default=RR_LAST, help="send the last or every RR interval of a notification")
+    parser.add_argument("--hrv-window", type=float, metavar="S", help="send rolling HRV features over this many seconds")
+    parser.add_argument("--artifact-threshold", type=float, metavar="FRACTION",
+                        help="correct RR intervals deviating from the running median by more than this fraction")
+    args = parser.parse_args()
+
+    # Mock stream for testing (prints to stdout)
+    class MockStream:
+        def send_sample(self, sample_id, values, t_received=None, latency=None, instance=""):
+            print(f"[STREAM] {get_encoder(sample_id, instance=instance)(values).decode()}", end="", file=sys.stdout)
+
+        def send_samples(self, sample_id, rows, t_received=None, latency=None, instance=""):
+            for values in rows:
+                self.send_sample(sample_id, values, t_received, latency, instance)
+
+    hub = BLEHub([device.split(",") for device in args.device], MockStream(), simulated_rate_hz=args.simulate,
+                 rr_mode=args.rr_mode, hrv_window_s=args.hrv_window,
+                 artifact_threshold=args.artifact_threshold)
+    thread = threading.Thread(target=hub.start, daemon=True)
+    thread.start()
+    try:
+        while thread.is_alive():
+            thread.join(5.0)
+            print(hub.format_stats())
+    except KeyboardInterrupt:
+        print("\nStopping...")
+    finally:
+        hub.stop()
+        thread.join(2.0)
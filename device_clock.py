@@ -0,0 +1,106 @@
+"""Map a device's free-running microsecond counter onto the host clock.
+
+The trigger box can stamp every event with its micros() counter, which is
+read when the event happens, before any serial or USB delay. Each event gives
+offset = host arrival time - device time, which is the true clock offset plus
+the transfer delay. That delay is never negative, so the smallest offsets
+track the true one (the lower envelope). The counter's crystal or resonator
+runs off by up to a few 0.1 %, so the envelope is a line, fitted as the edge
+of the lower convex hull of the recent (device time, offset) points that
+spans their mean device time: the line below every point that is closest to
+them on average.
+"""
+import collections
+
+DEVICE_WRAP_US = 1 << 32
+
+
+class DeviceClock:
+    """Convert device microsecond ticks into perf_counter_ns() host times.
+
+    to_host() is a constant-time lookup on the current envelope line; it only
+    lowers the line when an event arrives faster than the line allows.
+    refit() fits the line to the recent events again, which is O(window):
+    call it off the latency path, on synchronisation events or once due.
+
+    window is the number of recent events the fit uses; refit_every (default
+    a quarter of window) is how many events make a refit due. A counter that
+    steps back by less than half of wrap_us is a device reset, not a wrap,
+    and restarts the estimate.
+    """
+
+    def __init__(self, window=32, wrap_us=DEVICE_WRAP_US, refit_every=None):
+        self.window = max(2, int(window))
+        self.refit_every = max(1, int(refit_every or self.window // 4))
+        self.wrap_us = wrap_us
+        self.reset()
+
+    def reset(self):
+        self._last_raw = None
+        self._wraps = 0
+        self._samples = collections.deque(maxlen=self.window)
+        # Envelope line: offset = _y + skew * (device - _x); None until the first event
+        self._x = None
+        self._y = 0.0
+        self.skew = 0.0
+        # Events since the last refit()
+        self.pending = 0
+
+    @property
+    def due(self):
+        return self.pending >= self.refit_every
+
+    def to_host(self, device_us, t_received):
+        """Return the host time in ns of device tick device_us, whose data arrived at t_received."""
+        device = self._unwrap(device_us)
+        offset = t_received - device * 1000.0
+        self._samples.append((device, offset))
+        self.pending += 1
+        if self._x is None or offset < self._y + self.skew * (device - self._x):
+            # Below the line: that much delay is impossible, so move the line through this event
+            self._x = device
+            self._y = offset
+        return int(device * 1000.0 + self._y + self.skew * (device - self._x))
+
+    def refit(self):
+        """Fit the envelope line to the recent events (see the module docstring)."""
+        self.pending = 0
+        samples = self._samples
+        if not samples:
+            return
+        if len(samples) < 4:
+            self._x, self._y = min(samples, key=lambda sample: sample[1])
+            self.skew = 0.0
+            return
+        # Lower convex hull; samples are in device time order
+        hull = []
+        for point in samples:
+            while len(hull) >= 2 and _cross(hull[-2], hull[-1], point) <= 0:
+                hull.pop()
+            hull.append(point)
+        mean = sum(sample[0] for sample in samples) / len(samples)
+        for (x0, y0), (x1, y1) in zip(hull, hull[1:]):
+            if x1 >= mean:
+                self._x, self._y = x0, y0
+                self.skew = (y1 - y0) / (x1 - x0) if x1 > x0 else 0.0
+                return
+        self._x, self._y = hull[-1]
+        self.skew = 0.0
+
+    def _unwrap(self, device_us):
+        last = self._last_raw
+        self._last_raw = device_us
+        if last is not None and device_us < last:
+            if last - device_us > self.wrap_us / 2:
+                self._wraps += 1
+            else:
+                # micros() never steps back otherwise, however little: the device restarted
+                self._samples.clear()
+                self._x = None
+                self.skew = 0.0
+                self._wraps = 0
+        return device_us + self._wraps * self.wrap_us
+
+
+def _cross(o, a, b):
+    return (a[0] - o[0]) * (b[1] - o[1]) - (a[1] - o[1]) * (b[0] - o[0])
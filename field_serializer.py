@@ -0,0 +1,60 @@
+"""Serializers compiled once from a list of attribute paths.
+
+A field is a (path, default) pair. The path is a dotted attribute chain on the
+source object, e.g. "left_closest_world_intersection.world_point.x"; a path
+ending in "?" yields 1 when the attribute is present and 0 otherwise. When any
+attribute along the chain is None, the default is used.
+
+The generated function reads every attribute in the chains exactly once, so
+shared prefixes such as "head_position" are resolved a single time per call.
+"""
+
+
+def _generate_body(fields):
+    """Generate the statements that load each field into a local f<i>."""
+    lines = []
+    objects = {"": "obj"}
+
+    def resolve(path):
+        # Return the local holding the object at path, loading its parents first
+        if path in objects:
+            return objects[path]
+        parent, _, attr = path.rpartition(".")
+        parent_var = resolve(parent)
+        var = f"o{len(objects)}"
+        objects[path] = var
+        if parent_var == "obj":
+            lines.append(f"    {var} = obj.{attr}")
+        else:
+            lines.append(f"    {var} = {parent_var}.{attr} if {parent_var} is not None else None")
+        return var
+
+    for i, (path, default) in enumerate(fields):
+        if path.endswith("?"):
+            var = resolve(path[:-1])
+            lines.append(f"    f{i} = 0 if {var} is None else 1")
+        else:
+            var = resolve(path)
+            lines.append(f"    f{i} = {default!r} if {var} is None else {var}")
+    return lines
+
+
+def _compile(name, fields, result):
+    source = "\n".join([f"def {name}(obj):", *_generate_body(fields), f"    return {result}"])
+    namespace = {}
+    exec(compile(source, f"<{name}>", "exec"), namespace)
+    function = namespace[name]
+    function.source = source
+    return function
+
+
+def compile_extractor(fields):
+    """Compile a function returning the tuple of field values of an object."""
+    values = ", ".join(f"f{i}" for i in range(len(fields)))
+    return _compile("extract", fields, f"({values},)")
+
+
+def compile_serializer(fields, separator=";"):
+    """Compile a function returning the field values of an object joined by separator."""
+    template = separator.join("{f%d}" % i for i in range(len(fields)))
+    return _compile("serialize", fields, f"f{template!r}")
@@ -1,15 +1,19 @@
 import serial
-import socket
-import keyboard
-import re
-import serial
-from datetime import datetime, timezone
+import asyncio
+import logging
+import time
+from nmea import GGA, GSA, GSV, KNOTS_TO_MPS, RMC, VTG, NMEAParser
+from gps_kalman import GPSKalmanFilter
+from gps_receiver import configure_receiver
 from utils import haversine_distance
 from sensor import Sensor
+from sensor_runtime import LineBuffer, SerialLineReader, read_available
+
+logger = logging.getLogger(__name__)
 
 
 class GPSListener(Sensor):
-    def __init__(self,serial_com,stream,callback=None):
+    def __init__(self,serial_com,stream,callback=None,simulated_rate_hz=None,kalman=None,baud=9600,receiver="none",rate_hz=None):
         super().__init__()
         self.stream = stream
         self.ser = None
@@ -17,6 +21,27 @@ class GPSListener(Sensor):
         self.is_debug = False
         self.callback = callback
         self.running = False
+        self.simulated_rate_hz = simulated_rate_hz
+        # Port baud rate; with receiver "ubx" or "pmtk" the receiver is switched to it and to rate_hz on connect
+        self.baud = baud
+        self.receiver = receiver
+        self.rate_hz = rate_hz
+        
+        self.nmea = NMEAParser()
+        # Sentence type -> handler; GGA fixes are sent with the speed of RMC or VTG, the others add information
+        self._handlers = {GGA: self._on_gga, RMC: self._on_rmc, VTG: self._on_vtg, GSA: self._on_gsa, GSV: self._on_gsv}
+        self.has_gga = False
+        # "RMC" or "VTG" once the receiver reported its speed over ground; until then speed is differenced
+        self.speed_source = None
+        # (utc or None for "the next fix", speed in m/s, course in degrees) not yet matched to a fix
+        self._speed = None
+        # Fix arguments waiting for the speed of its epoch
+        self._pending = None
+        # Optional GPSKalmanFilter; when set, the smoothed position, speed and acceleration are sent
+        self.kalman = kalman
+        self.last_rmc = None
+        self.last_gsa = None
+        self.satellites_in_view = None
         
         self.previous_position = None
         self.previous_speed = None
@@ -25,98 +50,170 @@ class GPSListener(Sensor):
 
     def connect(self):
         try:
-            self.ser = serial.Serial(self.serial_com, 9600, timeout=1)
+            if self.simulated_rate_hz:
+                from simulators import SimulatedSerial, nmea_chunks
+
+                self.ser = SimulatedSerial(nmea_chunks(self.simulated_rate_hz), self.simulated_rate_hz, timeout=1)
+                self.running = True
+                self._notify_status_change(True)
+                self._notify_message(f"GPS: Simulated receiver at {self.simulated_rate_hz} Hz", "Success")
+                return "simulated GPS connected"
+            self.ser = serial.Serial(self.serial_com, self.baud, timeout=1)
+            if self.receiver != "none":
+                if configure_receiver(self.ser, self.receiver, self.baud, self.rate_hz) is None:
+                    self._notify_message(f"GPS: No NMEA data on {self.serial_com}, receiver not configured", "Error")
             self.running = True
             self._notify_status_change(True)
-            self._notify_message(f"GPS: Connected on {self.serial_com}", "Success")
+            rate = f", {self.rate_hz} Hz" if self.receiver != "none" and self.rate_hz else ""
+            self._notify_message(f"GPS: Connected on {self.serial_com} at {self.ser.baudrate} baud{rate}", "Success")
             return f"serial port {self.serial_com} connected"
         except serial.SerialException as e:
             self._notify_status_change(False)
             self._notify_message(f"GPS: Error - {e}", "Error")
             return f"{e}"
     
-    def parse_nmea_sentence(self, nmea_sentence):
-        """
-        Parse an NMEA sentence to extract latitude, longitude, timestamp, and number of satellites.
-        Supports both GNGGA and GNRMC sentences for location data.
-        """
-        if nmea_sentence.startswith("$GNGGA") or nmea_sentence.startswith("$GNRMC"):
-            parts = nmea_sentence.split(",")
-            try:
-                raw_lat = parts[2]
-                lat_dir = parts[3]
-                raw_lon = parts[4]
-                lon_dir = parts[5]
-                raw_time = parts[1]
-                num_satellites = int(parts[7]) if nmea_sentence.startswith("$GNGGA") else None
-                altitude = float(parts[9]) if nmea_sentence.startswith("$GNGGA") else None
-
-                if raw_lat and raw_lon and raw_time:
-                    lat_deg = int(raw_lat[:2])
-                    lat_min = float(raw_lat[2:])
-                    latitude = lat_deg + (lat_min / 60.0)
-                    if lat_dir == "S":
-                        latitude = -latitude
-
-                    lon_deg = int(raw_lon[:3])
-                    lon_min = float(raw_lon[3:])
-                    longitude = lon_deg + (lon_min / 60.0)
-                    if lon_dir == "W":
-                        longitude = -longitude
-
-                    hours = int(raw_time[:2])
-                    minutes = int(raw_time[2:4])
-                    seconds = int(raw_time[4:6])
-                    timestamp = datetime.now(timezone.utc).replace(hour=hours, minute=minutes, second=seconds, microsecond=0)
-
-                    return raw_time, timestamp, num_satellites, latitude, longitude, altitude
-            except (ValueError, IndexError):
-                pass
-        return None, None, None, None, None, None
-    
     def start(self):
         """
         Read data from the GPS device, calculate speed, acceleration, and number of satellites.
         """
         if self.ser is None:
             return
+        lines = LineBuffer()
         while self.running:
-            line = self.ser.readline().decode("ascii", errors="ignore").strip()
-            if line:
-                raw_time, timestamp, num_satellites, latitude, longitude, altitude = self.parse_nmea_sentence(line)
-                if latitude is not None and longitude is not None and timestamp is not None:
-                    if self.previous_position and self.previous_time:
+            for line, t_received in lines.feed(*read_available(self.ser)):
+                self.process_line(line, t_received)
+    
+    async def run(self):
+        """Connect and read the GPS on the shared event loop (see sensor_runtime.py)."""
+        await asyncio.to_thread(self.connect)
+        if self.ser is None or not self.running:
+            return
+        reader = SerialLineReader(self.ser)
+        try:
+            while self.running:
+                for line, t_received in await reader.read_lines():
+                    self.process_line(line, t_received)
+        finally:
+            reader.close()
+            # Free the port, so that a reconnect can open it again
+            self.ser.close()
+    
+    def process_line(self, line, t_received):
+        """Handle one raw NMEA sentence (bytes) that arrived at perf_counter_ns() t_received."""
+        sentence = self.nmea.parse(line)
+        if sentence is not None:
+            handler = self._handlers.get(type(sentence))
+            if handler is not None:
+                handler(sentence, t_received)
+    
+    def _on_gga(self, gga, t_received):
+        self.has_gga = True
+        if not gga.quality:
+            return
+        # A fix whose speed sentence got lost goes out with the differenced speed
+        self._flush_pending()
+        fix = (gga.utc, gga.raw_time, gga.num_satellites, gga.latitude, gga.longitude, gga.altitude, t_received, gga.hdop)
+        if self.speed_source is None:
+            self._on_fix(*fix)
+        elif self._speed is not None and (self._speed[0] is None or self._speed[0] == gga.utc):
+            _, speed, course = self._speed
+            self._speed = None
+            self._on_fix(*fix, speed=speed, course=course)
+        else:
+            # The RMC/VTG of this epoch follows the GGA
+            self._pending = fix
+    
+    def _on_rmc(self, rmc, t_received):
+        self.last_rmc = rmc
+        if not rmc.valid:
+            return
+        speed = rmc.speed_knots * KNOTS_TO_MPS if rmc.speed_knots is not None else None
+        # Receivers configured for RMC only still produce fixes, without satellites and altitude
+        if not self.has_gga:
+            self._on_fix(rmc.utc, rmc.raw_time, None, rmc.latitude, rmc.longitude, None, t_received,
+                         speed=speed, course=rmc.course)
+        elif speed is not None:
+            self.speed_source = "RMC"
+            self._on_speed(rmc.utc, speed, rmc.course)
+    
+    def _on_vtg(self, vtg, t_received):
+        # VTG has no time: it belongs to the fix waiting for it, or else to the next one
+        if self.speed_source != "RMC" and vtg.speed_knots is not None:
+            self.speed_source = "VTG"
+            self._on_speed(None, vtg.speed_knots * KNOTS_TO_MPS, vtg.course)
+    
+    def _on_speed(self, utc, speed, course):
+        pending = self._pending
+        if pending is not None and (utc is None or utc == pending[0]):
+            self._pending = None
+            self._on_fix(*pending, speed=speed, course=course)
+        else:
+            self._speed = (utc, speed, course)
+    
+    def _flush_pending(self):
+        if self._pending is not None:
+            pending, self._pending = self._pending, None
+            self._on_fix(*pending)
+    
+    def _on_gsa(self, gsa, t_received):
+        self.last_gsa = gsa
+    
+    def _on_gsv(self, gsv, t_received):
+        self.satellites_in_view = gsv.satellites_in_view
+    
+    def _on_fix(self, utc, raw_time, num_satellites, latitude, longitude, altitude, t_received, hdop=None, speed=None,
+                course=None):
+        """Send a fix with its speed and acceleration; utc is seconds since midnight.
+
+        speed and course are the receiver's speed over ground in m/s and its
+        direction. Without them, speed is the distance to the previous fix
+        over the time between them. With a Kalman filter, the smoothed
+        values are sent instead.
+        """
+        if self.kalman is not None and latitude is not None and longitude is not None and utc is not None:
+            smoothed = self.kalman.update(utc, latitude, longitude, hdop, speed, course)
+            if smoothed is not None:
+                self._send_fix(raw_time, num_satellites, altitude, t_received, *smoothed)
+            return
+        if latitude is not None and longitude is not None and utc is not None:
+            if self.previous_position and self.previous_time is not None:
+                # Modulo a day, so the fix after midnight still follows the one before it
+                time_interval = (utc - self.previous_time) % 86400.0
+
+                if time_interval > 0:
+                    if speed is None:
                         distance = haversine_distance(
                             self.previous_position[0], self.previous_position[1],
                             latitude, longitude
                         )
-                        time_interval = (timestamp - self.previous_time).total_seconds()
+                        speed = distance / time_interval
+                    if self.previous_speed is not None:
+                        acceleration = (speed - self.previous_speed) / time_interval
+                        self._send_fix(raw_time, num_satellites, altitude, t_received, latitude, longitude, speed, acceleration)
 
-                        if time_interval > 0:
-                            speed = distance / time_interval
-                            if self.previous_speed is not None:
-                                acceleration = (speed - self.previous_speed) / time_interval
-                                #print(f"Time: {raw_time}, Satellites: {num_satellites}, Latitude: {'{0:.14f}'.format(latitude)}, Longitude: {'{0:.14f}'.format(longitude)}, Altitude: {'{0:.4f}'.format(altitude)}, Speed: {speed:.2f} m/s, Acceleration: {acceleration:.2f} m/s²")
-                                data = f"E;1;USB_GPS;1;;;;GPS;{raw_time};{num_satellites};{latitude};{longitude};{altitude};{speed:.2f};{acceleration:.2f}\r\n"
-                                # send the data to the UDP client
-                                try:
-                                    if self.stream:
-                                        self.stream.send(data.encode())
-                                        #self._imotions_Socket.sendto(data.encode(), (self._udp_ip, self._udp_port))
-                                except:
-                                    print("failed to send to imotions")
-                            #else:
-                                #print(f"Time: {raw_time}, Satellites: {num_satellites}, Latitude: {'{0:.14f}'.format(latitude)}, Longitude: {'{0:.14f}'.format(longitude)}, Speed: {speed:.2f} m/s, Acceleration: N/A")
+                    self.previous_speed = speed
 
-                            self.previous_speed = speed
-                    else:
-                        print(f"Time: {raw_time}, Satellites: {num_satellites}, Latitude: {'{0:.14f}'.format(latitude)}, Longitude: {'{0:.14f}'.format(longitude)}, Speed: N/A, Acceleration: N/A")
-
-                    self.previous_position = (latitude, longitude)
-                    self.previous_time = timestamp
+            self.previous_position = (latitude, longitude)
+            self.previous_time = utc
+    
+    def _send_fix(self, raw_time, num_satellites, altitude, t_received, latitude, longitude, speed, acceleration):
+        # send the sample to IMotions, it is encoded by the stream
+        try:
+            if self.stream:
+                self._record_parse_latency(t_received)
+                self.stream.send_sample("GPS", (raw_time, num_satellites, latitude, longitude, altitude, speed, acceleration),
+                                        t_received, self.latency)
+        except Exception as e:
+            logger.error(f"Failed to send GPS fix to IMotions: {e!r}")
     
     def stop(self):
         self.running = False
+        if self.ser:
+            # A stop, not a lost connection, for supervise() once the woken read loop ends
+            self._stop_requested = True
+            # Wake start() from a blocking read at once instead of at the port timeout
+            self.ser.cancel_read()
+        self._cancel_run()
         if self.ser:
             self.ser.close()
         self._notify_status_change(False)
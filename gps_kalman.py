@@ -0,0 +1,133 @@
+"""Constant-velocity Kalman filter smoothing GPS fixes.
+
+Positions are filtered in a local East-North frame centred on the first fix
+(an equirectangular projection, accurate to well under a metre within a few
+tens of km). East and north are independent axes, each with a position and
+velocity state and a 2x2 covariance. So every step is a handful of scalar
+operations on preallocated state: no matrices, no lists, constant time.
+
+A fix updates position with a variance from its HDOP. When the receiver
+reports speed over ground and course (RMC/VTG), the velocity is updated too.
+"""
+import math
+
+EARTH_RADIUS_M = 6371e3
+_DEG = math.pi / 180.0
+
+
+class _Axis:
+    """Position p and velocity v along one axis, with covariance [[a, b], [b, c]]."""
+
+    __slots__ = ("p", "v", "a", "b", "c")
+
+    def reset(self, position, position_var, velocity_var):
+        self.p = position
+        self.v = 0.0
+        self.a = position_var
+        self.b = 0.0
+        self.c = velocity_var
+
+    def predict(self, dt, q):
+        # White acceleration noise of spectral density q over dt
+        dt2 = dt * dt
+        self.p += self.v * dt
+        self.a += 2.0 * dt * self.b + dt2 * self.c + q * dt2 * dt / 3.0
+        self.b += dt * self.c + q * dt2 / 2.0
+        self.c += q * dt
+
+    def update_position(self, z, r):
+        s = self.a + r
+        k0 = self.a / s
+        k1 = self.b / s
+        y = z - self.p
+        self.p += k0 * y
+        self.v += k1 * y
+        self.c -= k1 * self.b
+        self.a -= k0 * self.a
+        self.b -= k0 * self.b
+
+    def update_velocity(self, z, r):
+        s = self.c + r
+        k0 = self.b / s
+        k1 = self.c / s
+        y = z - self.v
+        self.p += k0 * y
+        self.v += k1 * y
+        self.a -= k0 * self.b
+        self.b -= k0 * self.c
+        self.c -= k1 * self.c
+
+
+class GPSKalmanFilter:
+    """Smooth (utc, lat, lon) fixes into position, speed and acceleration.
+
+    accel_noise is the standard deviation in m/s^2 of the unmodelled
+    acceleration: larger follows manoeuvres faster, smaller smooths more.
+    position_sigma_m is the position error at HDOP 1 and velocity_sigma the
+    error of the receiver's speed over ground. A gap longer than max_gap_s
+    restarts the filter.
+    """
+
+    def __init__(self, accel_noise=1.0, position_sigma_m=2.5, velocity_sigma=0.3, max_gap_s=5.0):
+        self.q = accel_noise * accel_noise
+        self.position_sigma_m = position_sigma_m
+        self.velocity_var = velocity_sigma * velocity_sigma
+        self.max_gap_s = max_gap_s
+        self.east = _Axis()
+        self.north = _Axis()
+        self.reset()
+
+    def reset(self):
+        self._utc = None
+        self._lat0 = 0.0
+        self._lon0 = 0.0
+        self._m_per_deg_lat = EARTH_RADIUS_M * _DEG
+        self._m_per_deg_lon = self._m_per_deg_lat
+        self._speed = None
+
+    def update(self, utc, latitude, longitude, hdop=None, speed=None, course=None):
+        """Filter one fix; returns (latitude, longitude, speed, acceleration), or None for the first fix.
+
+        utc is seconds since midnight; speed (m/s) and course (degrees from
+        north) are the receiver's speed over ground, if it reports them. A
+        fix with the same time as the previous one is skipped (None). The
+        first fix after a (re)start without speed over ground reports no
+        acceleration (0.0), as there is no previous speed to compare with.
+        """
+        position_var = self.position_sigma_m * (hdop or 1.0)
+        position_var *= position_var
+        dt = (utc - self._utc) % 86400.0 if self._utc is not None else 0.0
+        if self._utc is not None and dt == 0.0:
+            return None
+        if self._utc is None or dt > self.max_gap_s:
+            # (Re)start centred on this fix
+            self._utc = utc
+            self._lat0 = latitude
+            self._lon0 = longitude
+            self._m_per_deg_lon = self._m_per_deg_lat * math.cos(latitude * _DEG)
+            self.east.reset(0.0, position_var, 100.0)
+            self.north.reset(0.0, position_var, 100.0)
+            # Without a measured speed the velocity starts at an unknown 0, not a speed to difference against
+            self._speed = None
+            if speed is not None and course is not None:
+                self._update_velocity(speed, course)
+                self._speed = math.hypot(self.east.v, self.north.v)
+            return None
+        self._utc = utc
+        east, north = self.east, self.north
+        east.predict(dt, self.q)
+        north.predict(dt, self.q)
+        east.update_position((longitude - self._lon0) * self._m_per_deg_lon, position_var)
+        north.update_position((latitude - self._lat0) * self._m_per_deg_lat, position_var)
+        if speed is not None and course is not None:
+            self._update_velocity(speed, course)
+        filtered_speed = math.hypot(east.v, north.v)
+        acceleration = (filtered_speed - self._speed) / dt if self._speed is not None else 0.0
+        self._speed = filtered_speed
+        return (self._lat0 + north.p / self._m_per_deg_lat, self._lon0 + east.p / self._m_per_deg_lon,
+                filtered_speed, acceleration)
+
+    def _update_velocity(self, speed, course):
+        course *= _DEG
+        self.east.update_velocity(speed * math.sin(course), self.velocity_var)
+        self.north.update_velocity(speed * math.cos(course), self.velocity_var)
@@ -0,0 +1,123 @@
+"""Startup configuration of the GPS receiver: baud rate and navigation rate.
+
+Most receivers start at 9600 baud and 1 Hz. 9600 baud carries about 960
+bytes/s, less than one second of the default u-blox NMEA output at 5 Hz.
+configure_receiver() finds the baud rate the receiver is talking at, switches
+it to the configured one and sets the navigation rate, using:
+
+- "ubx": u-blox UBX-CFG-PRT and UBX-CFG-RATE (u-blox 6/7/8; also accepted
+  by M9/M10 in legacy mode),
+- "pmtk": MediaTek PMTK251 and PMTK220 (MTK3339 and clones, up to 10 Hz).
+
+The settings are not saved to the receiver, so they are applied again on
+every connect.
+"""
+import logging
+import struct
+import time
+
+from nmea import NMEAParser, checksum
+
+logger = logging.getLogger(__name__)
+
+RECEIVERS = ("none", "ubx", "pmtk")
+COMMON_BAUDS = (9600, 38400, 57600, 115200, 230400, 4800, 19200)
+
+# Default NMEA output of one epoch (GGA, GLL, GSA, 3x GSV, RMC, VTG) in bytes
+EPOCH_BYTES = 500
+
+
+def ubx_message(msg_class, msg_id, payload):
+    """Frame a UBX message: sync chars, class, id, length, payload and 8-bit Fletcher checksum."""
+    body = struct.pack("<BBH", msg_class, msg_id, len(payload)) + payload
+    ck_a = ck_b = 0
+    for byte in body:
+        ck_a = (ck_a + byte) & 0xFF
+        ck_b = (ck_b + ck_a) & 0xFF
+    return b"\xb5\x62" + body + bytes((ck_a, ck_b))
+
+
+def ubx_set_baud(baud):
+    """UBX-CFG-PRT for UART1: 8N1 at baud, UBX + NMEA in and out."""
+    return ubx_message(0x06, 0x00, struct.pack("<BBHIIHHHH", 1, 0, 0, 0x000008D0, baud, 0x0003, 0x0003, 0, 0))
+
+
+def ubx_set_rate(rate_hz):
+    """UBX-CFG-RATE: one navigation solution per measurement, aligned to GPS time."""
+    return ubx_message(0x06, 0x08, struct.pack("<HHH", round(1000 / rate_hz), 1, 1))
+
+
+def pmtk_message(body):
+    return f"${body}*{checksum(body.encode('ascii')):02X}\r\n".encode("ascii")
+
+
+def pmtk_set_baud(baud):
+    return pmtk_message(f"PMTK251,{baud}")
+
+
+def pmtk_set_rate(rate_hz):
+    return pmtk_message(f"PMTK220,{round(1000 / rate_hz)}")
+
+
+_COMMANDS = {
+    "ubx": (ubx_set_baud, ubx_set_rate),
+    "pmtk": (pmtk_set_baud, pmtk_set_rate),
+}
+
+
+def required_baud(rate_hz, epoch_bytes=EPOCH_BYTES):
+    """Lowest baud rate that carries epoch_bytes rate_hz times a second with a 20 % margin (10 bits per byte)."""
+    return int(rate_hz * epoch_bytes * 10 * 1.2)
+
+
+def detect_baud(ser, candidates, listen_s=1.2):
+    """Return the first baud rate at which valid NMEA sentences arrive, or None.
+
+    Listens up to listen_s at each candidate; a receiver outputs at least
+    one epoch per second.
+    """
+    timeout = ser.timeout
+    ser.timeout = 0.1
+    try:
+        for baud in dict.fromkeys(candidates):
+            ser.baudrate = baud
+            ser.reset_input_buffer()
+            parser = NMEAParser()
+            deadline = time.monotonic() + listen_s
+            while time.monotonic() < deadline:
+                parser.feed(ser.read(ser.in_waiting or 1))
+                if parser.sentences:
+                    return baud
+        return None
+    finally:
+        ser.timeout = timeout
+
+
+def configure_receiver(ser, receiver, baud, rate_hz):
+    """Switch the receiver on the open port ser to baud and rate_hz; returns the baud rate in use, or None.
+
+    ser is left at the baud rate the receiver talks at afterwards.
+    """
+    if receiver not in _COMMANDS:
+        return ser.baudrate
+    set_baud, set_rate = _COMMANDS[receiver]
+    current = detect_baud(ser, (ser.baudrate, baud) + COMMON_BAUDS)
+    if current is None:
+        logger.warning("GPS: no NMEA output at any baud rate, receiver not configured")
+        return None
+    if current != baud:
+        logger.info(f"GPS: switching receiver from {current} to {baud} baud")
+        ser.write(set_baud(baud))
+        ser.flush()
+        # Let the command leave the UART before changing its speed
+        time.sleep(0.1)
+        ser.baudrate = baud
+        if detect_baud(ser, (baud,)) is None:
+            logger.warning(f"GPS: receiver did not switch to {baud} baud, staying at {current}")
+            ser.baudrate = current
+    if rate_hz:
+        if required_baud(rate_hz) > ser.baudrate:
+            logger.warning(f"GPS: {rate_hz} Hz needs about {required_baud(rate_hz)} baud, the port runs at {ser.baudrate}")
+        ser.write(set_rate(rate_hz))
+        ser.flush()
+    return ser.baudrate
@@ -0,0 +1,165 @@
+"""Decoder of the BLE Heart Rate Measurement characteristic (0x2A37).
+
+Layout: a flags byte, the heart rate as uint8 or uint16 (flag bit 0), the
+energy expended as uint16 if flag bit 3 is set, then any number of uint16 RR
+intervals in 1/1024 s if flag bit 4 is set. All fields are little-endian.
+
+decode_heart_rate() unpacks one notification with a single precompiled Struct;
+decode_heart_rate_batch() decodes many buffered notifications at once into
+NumPy arrays for offline processing. rr_samples() turns a decoded
+notification into the field values sent to IMotions.
+"""
+import struct
+
+from hrv import NO_HRV
+from rr_filter import NO_FILTER
+
+# Standard BLE Heart Rate Measurement characteristic UUID
+HR_CHAR_UUID = "00002a37-0000-1000-8000-00805f9b34fb"
+
+FLAG_HR_UINT16 = 0x01
+FLAG_ENERGY_EXPENDED = 0x08
+FLAG_RR_INTERVALS = 0x10
+
+RR_UNITS_PER_SECOND = 1024.0
+
+# What rr_samples() sends of a notification carrying several RR intervals
+RR_LAST = "last"  # one sample with the last interval
+RR_ALL = "all"  # one sample per interval
+RR_MODES = (RR_LAST, RR_ALL)
+
+_LAYOUT_FLAGS = FLAG_HR_UINT16 | FLAG_ENERGY_EXPENDED | FLAG_RR_INTERVALS
+
+
+class _Layout:
+    """Struct of a whole notification with given flags and length; struct is None if it is too short.
+
+    Only the flags and heart rate are required: an energy expended field cut
+    short is left out, and so are RR intervals that do not fit.
+    """
+
+    __slots__ = ("struct", "has_energy", "rr_start")
+
+    def __init__(self, flags, length):
+        header = "<B" + ("H" if flags & FLAG_HR_UINT16 else "B")
+        header_size = struct.calcsize(header)
+        rr_offset = header_size + (2 if flags & FLAG_ENERGY_EXPENDED else 0)
+        self.has_energy = bool(flags & FLAG_ENERGY_EXPENDED) and length >= rr_offset
+        rr_count = max(0, (length - rr_offset) >> 1) if flags & FLAG_RR_INTERVALS else 0
+        tail = ("H" if self.has_energy else "") + "H" * rr_count
+        self.struct = struct.Struct(header + tail) if length >= header_size else None
+        self.rr_start = 3 if self.has_energy else 2
+
+
+# _Layout by length << 8 | layout flags, filled on first use; real devices only ever use a handful
+_layouts = {}
+
+
+def _layout(key):
+    layout = _layouts[key] = _Layout(key & 0xFF, key >> 8)
+    return layout
+
+
+def decode_heart_rate(data):
+    """Decode one notification into (hr, energy_expended, rr_intervals).
+
+    energy_expended is None when absent or cut short and rr_intervals is a
+    list of seconds (empty when absent). Returns None for a notification too
+    short to hold its heart rate.
+    """
+    if not data:
+        return None
+    key = len(data) << 8 | (data[0] & _LAYOUT_FLAGS)
+    layout = _layouts.get(key) or _layout(key)
+    if layout.struct is None:
+        return None
+    values = layout.struct.unpack_from(data)
+    return (values[1], values[2] if layout.has_energy else None,
+            [rr / RR_UNITS_PER_SECOND for rr in values[layout.rr_start:]])
+
+
+def rr_samples(hr, rr_intervals, t_wall, rr_mode=RR_LAST, hrv=None, rr_filter=None):
+    """Return the field values to send for one notification.
+
+    Each sample is (hr, rr, beat_time, rmssd, sdnn, pnn50, mean_hr,
+    rr_corrected, artifact). beat_time is the Unix time at which the beat
+    closing the interval happened, back-computed from t_wall, the arrival
+    time of the notification: the last interval ends at t_wall and every
+    earlier one an interval before the next. rr is 0 when the notification
+    has no interval.
+
+    rr_filter, an RRArtifactFilter, checks every interval whatever rr_mode
+    is and gives rr_corrected and artifact; hrv, an HRVEngine, is fed the
+    corrected intervals and each sample carries its features as of that
+    beat. Without them those fields are empty and hrv gets the raw intervals.
+    """
+    if not rr_intervals:
+        return [(hr, 0, t_wall) + (NO_HRV if hrv is None else hrv.features()) + NO_FILTER]
+    every_beat = rr_mode == RR_ALL
+    samples = []
+    checked = NO_FILTER
+    features = NO_HRV
+    beat_time = t_wall - sum(rr_intervals)
+    for rr in rr_intervals:
+        beat_time += rr
+        if rr_filter is not None:
+            checked = rr_filter.check(rr)
+        if hrv is not None:
+            hrv.add(rr if rr_filter is None else checked[0])
+            if every_beat:
+                features = hrv.features()
+        if every_beat:
+            samples.append((hr, rr, beat_time) + features + checked)
+    if every_beat:
+        return samples
+    if hrv is not None:
+        features = hrv.features()
+    return [(hr, rr, t_wall) + features + checked]
+
+
+def decode_heart_rate_batch(notifications):
+    """Decode a sequence of notifications into NumPy arrays.
+
+    Returns a dict of:
+        hr               (n,) heart rate per notification
+        energy_expended  (n,) float, NaN where absent
+        rr               (m,) every RR interval in seconds, in arrival order
+        rr_notification  (m,) index of the notification each RR interval came from
+    Notifications too short to hold their heart rate get hr -1 and no RR.
+    Requires NumPy.
+    """
+    import numpy as np
+
+    n = len(notifications)
+    lengths = np.fromiter((len(data) for data in notifications), dtype=np.int64, count=n)
+    ends = np.cumsum(lengths)
+    starts = ends - lengths
+    buffer = np.frombuffer(b"".join(bytes(data) for data in notifications), dtype=np.uint8).astype(np.int64)
+    if n == 0 or buffer.size == 0:
+        empty = np.zeros(0)
+        return {"hr": np.zeros(0, dtype=np.int64), "energy_expended": empty, "rr": empty,
+                "rr_notification": np.zeros(0, dtype=np.int64)}
+    # Pad so that reads past the end of the last notification stay in bounds; they are masked out below
+    buffer = np.concatenate((buffer, np.zeros(4, dtype=np.int64)))
+
+    flags = np.where(lengths > 0, buffer[starts], 0)
+    hr_uint16 = (flags & FLAG_HR_UINT16) != 0
+    has_energy = (flags & FLAG_ENERGY_EXPENDED) != 0
+    has_rr = (flags & FLAG_RR_INTERVALS) != 0
+    header_sizes = 2 + hr_uint16 + 2 * has_energy
+    valid = lengths >= 2 + hr_uint16
+    has_energy &= lengths >= header_sizes
+
+    hr = buffer[starts + 1] | np.where(hr_uint16, buffer[starts + 2] << 8, 0)
+    hr = np.where(valid, hr, -1)
+    energy_at = starts + 2 + hr_uint16
+    energy_expended = np.where(has_energy & valid, buffer[energy_at] | (buffer[energy_at + 1] << 8), -1).astype(float)
+    energy_expended[~(has_energy & valid)] = np.nan
+
+    rr_counts = np.where(has_rr & valid, np.maximum(lengths - header_sizes, 0) >> 1, 0)
+    rr_notification = np.repeat(np.arange(n), rr_counts)
+    # Position of every RR interval: its notification's RR start plus 2 bytes per preceding interval
+    first_rr = np.cumsum(rr_counts) - rr_counts
+    rr_positions = (starts + header_sizes)[rr_notification] + 2 * (np.arange(rr_notification.size) - first_rr[rr_notification])
+    rr = (buffer[rr_positions] | (buffer[rr_positions + 1] << 8)) / RR_UNITS_PER_SECOND
+    return {"hr": hr, "energy_expended": energy_expended, "rr": rr, "rr_notification": rr_notification}
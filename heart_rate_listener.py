@@ -0,0 +1,236 @@
+"""Base class of the BLE heart-rate listeners (Polar H10, Garmin Vivosmart 5).
+
+Subclasses set SAMPLE_ID (the IMotions Sample they send) and LABEL and
+implement _scan_and_connect(); connecting, listening to Heart Rate
+Measurement notifications and sending them to the stream live here.
+"""
+import asyncio
+import logging
+import threading
+import time
+from abc import abstractmethod
+
+from bleak import BleakClient
+
+from ble_discovery import default_discovery
+from heart_rate import HR_CHAR_UUID, RR_LAST, decode_heart_rate, rr_samples
+from hrv import HRVEngine
+from rr_filter import RRArtifactFilter
+from sensor import Sensor
+
+logger = logging.getLogger(__name__)
+
+
+class HeartRateListener(Sensor):
+    SAMPLE_ID = None
+    LABEL = None
+
+    def __init__(self, stream, callback=None, simulated_rate_hz=None, discovery=None, rr_mode=RR_LAST, hrv_window_s=None,
+                 artifact_threshold=None):
+        super().__init__()
+        self.stream = stream
+        self.is_debug = False
+        self.callback = callback
+        self.running = False
+        # Connected to directly before any scan (see BLEDiscovery.known_target); subclasses may set it
+        self.address = None
+        # BLEDevice or address of the last connection, reused when reconnecting
+        self.device = None
+        self.client = None
+        self.bg_thread = None
+        self.event_loop = None
+        # Set by _listen(); stop() and BLE disconnects wake it instead of polling self.running
+        self._listen_loop = None
+        self._stop_event = None
+        self.simulated_rate_hz = simulated_rate_hz
+        self.discovery = discovery
+        # RR_ALL sends every RR interval of a notification as its own sample (see heart_rate.rr_samples)
+        self.rr_mode = rr_mode
+        # Rolling HRV features sent with every sample; None leaves those fields empty
+        self.hrv = HRVEngine(hrv_window_s) if hrv_window_s else None
+        # Median-based RR artifact correction ahead of the HRV engine; None sends raw intervals only
+        self.rr_filter = RRArtifactFilter(artifact_threshold) if artifact_threshold else None
+
+    def connect(self):
+        """Try to find the device via the BLE discovery."""
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self.event_loop = loop
+        loop.run_until_complete(self._find_device())
+
+    async def _find_device(self):
+        """Scan for the device, store it in self.device and report a failure."""
+        try:
+            device = await self._scan_and_connect()
+            self.device = device
+            if device:
+                logger.info(f"{self.LABEL} device found: {device.address} - {device.name}")
+            else:
+                self._notify_status_change(False)
+                self._notify_message(f"{self.SAMPLE_ID}: Device not found", "Error")
+        except Exception as e:
+            self._notify_status_change(False)
+            self._notify_message(f"{self.SAMPLE_ID}: Error connecting - {e}", "Error")
+            logger.error(f"Error connecting to {self.LABEL}: {e}")
+
+    @abstractmethod
+    async def _scan_and_connect(self):
+        """Return the BLE device to connect to, or None."""
+        pass
+
+    def start(self):
+        """Start listening to the data stream in a background thread."""
+        if not self.device:
+            logger.error("Not connected to device. Call connect() first.")
+            return
+
+        self.running = True
+        self.bg_thread = threading.Thread(target=self._run_listener, daemon=True)
+        self.bg_thread.start()
+        logger.info(f"{self.LABEL} listener started")
+
+    def _run_listener(self):
+        """Run the async event loop in background thread."""
+        try:
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            loop.run_until_complete(self._listen())
+        except Exception as e:
+            logger.error(f"Listener error: {e}")
+        finally:
+            self.running = False
+
+    async def run(self):
+        """Connect and listen on the shared event loop (see sensor_runtime.py).
+
+        The device of the last connection, else a known address, is connected
+        to directly; the discovery scan only runs when there is none or
+        connecting to it fails.
+        """
+        self.running = True
+        try:
+            discovery = self.discovery or default_discovery()
+            if self.device is None and not self.simulated_rate_hz:
+                self.device = discovery.known_target(self.SAMPLE_ID, self.address)
+            if self.device is not None:
+                if await self._listen(timeout=discovery.address_timeout_s) or not self.running:
+                    return
+            await self._find_device()
+            if self.device:
+                await self._listen()
+        finally:
+            self.running = False
+
+    async def _listen(self, timeout=10.0):
+        """Connect to self.device and subscribe to HR notifications until stopped or disconnected.
+
+        Returns whether the connection was made; if not, self.device is
+        cleared so the next attempt looks for the device again.
+        """
+        self._listen_loop = asyncio.get_running_loop()
+        self._stop_event = asyncio.Event()
+        if not self.running:
+            return False
+        address = getattr(self.device, "address", self.device)
+        connected = False
+        try:
+            if self.simulated_rate_hz:
+                from simulators import SimulatedBleakClient
+
+                ble_client = SimulatedBleakClient(self.device, self.simulated_rate_hz, disconnected_callback=self._on_disconnected)
+            else:
+                ble_client = BleakClient(self.device, disconnected_callback=self._on_disconnected, timeout=timeout)
+            async with ble_client as client:
+                connected = True
+                self.client = client
+                logger.info(f"Connected to {address}")
+                self._notify_status_change(True)
+                self._notify_message(f"{self.SAMPLE_ID}: Connected to {self.LABEL} ({address})", "Success")
+                # Beats missed while disconnected would show up as one huge successive difference
+                if self.hrv is not None:
+                    self.hrv.reset()
+                if self.rr_filter is not None:
+                    self.rr_filter.reset()
+
+                await client.start_notify(HR_CHAR_UUID, self._on_notification)
+                logger.info("Subscribed to HR notifications")
+
+                # Sleep until stop() or a disconnect; idle listeners cost no wakeups
+                await self._stop_event.wait()
+
+                if client.is_connected:
+                    await client.stop_notify(HR_CHAR_UUID)
+        except Exception as e:
+            logger.error(f"Connection error: {e}")
+            if not connected:
+                # Make the next connect look again instead of trusting the address or the background scanner
+                (self.discovery or default_discovery()).forget(address)
+                self.device = None
+        finally:
+            self._listen_loop = None
+            self._stop_event = None
+        return connected
+
+    def _on_notification(self, sender, data):
+        """Handle incoming HR data."""
+        t_received = time.perf_counter_ns()
+        t_wall = time.time()
+        try:
+            measurement = decode_heart_rate(data)
+            if measurement is not None:
+                self._send_to_stream(rr_samples(measurement[0], measurement[2], t_wall, self.rr_mode, self.hrv, self.rr_filter),
+                                     t_received)
+        except Exception as e:
+            logger.error(f"Error handling HR data: {e}")
+
+    def _on_disconnected(self, client):
+        """bleak disconnected_callback: end _listen() right away."""
+        logger.info(f"Disconnected from {self.device.address if self.device else 'device'}")
+        self._wake()
+
+    def _wake(self):
+        """Wake _listen() from any thread."""
+        loop, event = self._listen_loop, self._stop_event
+        if loop is not None and event is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(event.set)
+
+    def _send_to_stream(self, samples, t_received=None):
+        """Send the (hr, rr, beat_time) samples of one notification to the stream."""
+        try:
+            # send the samples to IMotions, they are encoded by the stream; several go as one batch
+            try:
+                if self.stream:
+                    if t_received is not None:
+                        self._record_parse_latency(t_received)
+                    if len(samples) == 1:
+                        self.stream.send_sample(self.SAMPLE_ID, samples[0], t_received, self.latency)
+                    else:
+                        self.stream.send_samples(self.SAMPLE_ID, samples, t_received, self.latency)
+            except Exception as e:
+                logger.error(f"Failed to send {self.SAMPLE_ID} samples to IMotions: {e!r}")
+
+            if self.is_debug:
+                logger.debug(f"{self.SAMPLE_ID}: {samples}")
+
+            if self.callback:
+                for values in samples:
+                    self.callback(values)
+        except Exception as e:
+            logger.error(f"Error sending to stream: {e}")
+
+    def stop(self):
+        """Stop the listener and close connection."""
+        self.running = False
+        # Before waking _listen(): supervise() must see a stop, not a lost connection, when run() returns
+        self._stop_requested = True
+        self._wake()
+        self._cancel_run()
+        if self.bg_thread:
+            self.bg_thread.join(timeout=2.0)
+        self._notify_status_change(False)
+        self._notify_message(f"{self.SAMPLE_ID}: Disconnected", "Info")
+        logger.info(f"{self.LABEL} listener stopped")
+
+    def status(self):
+        """Return the current status of the listener."""
+        return self.running
@@ -0,0 +1,98 @@
+"""Rolling heart-rate variability from the RR interval stream.
+
+HRVEngine keeps the RR intervals of the last window_s seconds in a
+preallocated ring buffer, together with running sums of the intervals, their
+squares and the squared successive differences. Adding a beat and reading the
+metrics are O(1) whatever the window length.
+
+RR intervals arrive as multiples of 1/1024 s, so every sum, square and
+difference is exact in floating point and the running sums never drift.
+"""
+import math
+
+# HRV field values sent while the window holds fewer than two beats, or without an engine
+NO_HRV = ("", "", "", "")
+
+
+class HRVEngine:
+    """RMSSD, SDNN, pNN50 and mean HR over the RR intervals of the last window_s seconds.
+
+    The window holds the latest beats whose intervals add up to at most
+    window_s. RMSSD and SDNN are in ms, pNN50 in % and mean HR in bpm.
+    """
+
+    # Shortest RR interval expected (240 bpm); bounds the beats held by a window
+    MIN_RR_S = 0.25
+    NN50_S = 0.05
+
+    def __init__(self, window_s=60.0):
+        self.window_s = float(window_s)
+        self.capacity = max(2, math.ceil(self.window_s / self.MIN_RR_S) + 1)
+        self._rr = [0.0] * self.capacity
+        # Squared difference to the previous beat and whether it is above 50 ms, per beat
+        self._diff_sq = [0.0] * self.capacity
+        self._nn50 = [False] * self.capacity
+        # Whether the difference of a beat is counted; never true for the oldest beat in the window
+        self._paired = [False] * self.capacity
+        self.reset()
+
+    def reset(self):
+        """Empty the window, e.g. after a reconnect broke the beat sequence."""
+        self._start = 0
+        self._count = 0
+        self._sum = 0.0
+        self._sum_sq = 0.0
+        self._diff_sum_sq = 0.0
+        self._diffs = 0
+        self._nn50_count = 0
+
+    def __len__(self):
+        return self._count
+
+    def add(self, rr):
+        """Add one RR interval in seconds, dropping the beats that leave the window."""
+        if rr <= 0:
+            return
+        while self._count and (self._count == self.capacity or self._sum + rr > self.window_s):
+            self._evict()
+        i = (self._start + self._count) % self.capacity
+        if self._count:
+            diff = rr - self._rr[i - 1]
+            diff_sq = diff * diff
+            nn50 = abs(diff) > self.NN50_S
+            self._diff_sum_sq += diff_sq
+            self._diffs += 1
+            self._nn50_count += nn50
+            self._diff_sq[i] = diff_sq
+            self._nn50[i] = nn50
+            self._paired[i] = True
+        else:
+            self._paired[i] = False
+        self._rr[i] = rr
+        self._count += 1
+        self._sum += rr
+        self._sum_sq += rr * rr
+
+    def _evict(self):
+        rr = self._rr[self._start]
+        self._sum -= rr
+        self._sum_sq -= rr * rr
+        self._start = (self._start + 1) % self.capacity
+        self._count -= 1
+        # The difference of the new oldest beat was to the evicted one
+        if self._count and self._paired[self._start]:
+            self._paired[self._start] = False
+            self._diff_sum_sq -= self._diff_sq[self._start]
+            self._diffs -= 1
+            self._nn50_count -= self._nn50[self._start]
+
+    def features(self):
+        """Return (rmssd, sdnn, pnn50, mean_hr) of the window, or NO_HRV below two beats."""
+        n = self._count
+        if n < 2:
+            return NO_HRV
+        mean = self._sum / n
+        sdnn = math.sqrt(max(self._sum_sq - self._sum * mean, 0.0) / (n - 1))
+        rmssd = math.sqrt(self._diff_sum_sq / self._diffs)
+        pnn50 = 100.0 * self._nn50_count / self._diffs
+        return round(rmssd * 1000.0, 1), round(sdnn * 1000.0, 1), round(pnn50, 1), round(60.0 / mean, 1)
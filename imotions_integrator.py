@@ -3,10 +3,17 @@ import tkinter as tk
 from tkinter import ttk
 
 from gps import GPSListener
+from gps_kalman import GPSKalmanFilter
 from smarteye import SEListener
 from trigger_box import TriggerBoxListener
 from h10 import H10Listener
 from vivosmart5 import Vivosmart5Listener
+from ble_hub import BLEHub
+from ble_discovery import BLEDiscovery
+from imotions_stream import IMotionsStream, DROP_OLDEST
+from recorder import SessionRecorder
+from latency import dump_latency
+from sensor_runtime import SensorRuntime
 
 import threading
 import configparser
@@ -60,8 +67,62 @@ class IMotionsIntegrator():
         self.config.read('config.ini')        
         
         self.gps_com = "COM9"
+        # Constant-velocity Kalman smoothing of the GPS fixes (see gps_kalman.py)
+        self.gps_kalman = False
+        self.gps_kalman_accel_noise = 1.0
+        self.gps_kalman_position_sigma_m = 2.5
+        # Receiver baud rate and navigation rate, set at connect for receiver "ubx" or "pmtk" (see gps_receiver.py)
+        self.gps_baud = 9600
+        self.gps_receiver = "none"
+        self.gps_rate_hz = 1.0
         self.triggerbox_com = "COM10"
+        # "ascii" lines at 9600 baud or "binary" frames, typically at 115200 (see trigger_frames.py)
+        self.triggerbox_protocol = "ascii"
+        self.triggerbox_baud = 9600
         self.vivosmart5_address = "EC:8B:36:92:28:93"
+        # BLE hub wearables: (sample id, address, IMotions instance) per device
+        self.blehub_devices = []
+        self.blehub_scan_timeout_s = 5.0
+        self.blehub_reconnect_delay_s = 1.0
+        # BLE discovery: cached addresses first, short filtered scan as fallback (see ble_discovery.py)
+        self.ble_cache_file = "ble_devices.json"
+        self.ble_background_scan = False
+        self.ble_address_timeout_s = 2.0
+        self.ble_scan_timeout_s = 3.0
+        self.ble_discovery = None
+        self.queue_size = 4096
+        self.overflow_policy = DROP_OLDEST
+        self.coalesce = False
+        self.coalesce_max_bytes = 8192
+        self.coalesce_max_latency_ms = 0.5
+        self.recorder_enabled = False
+        self.recorder_directory = "recordings"
+        self.recorder_segment_mb = 64
+        self.recorder_fsync_interval_s = 1.0
+        self.recorder = None
+        
+        # Sensor backends: real hardware or a simulated source (see simulators.py)
+        self.backends = {"SmartEye": "udp", "GPS": "serial", "TriggerBox": "serial", "H10": "ble", "Vivosmart5": "ble",
+                         "BLEHub": "ble"}
+        self.sim_rates_hz = {"SmartEye": 60.0, "GPS": 10.0, "TriggerBox": 0.5, "H10": 1.0, "Vivosmart5": 1.0,
+                             "BLEHub": 1.0}
+        # RR intervals sent per heart-rate notification: "last" or "all" (see heart_rate.rr_samples)
+        self.rr_modes = {"H10": "last", "Vivosmart5": "last", "BLEHub": "last"}
+        # Rolling HRV features (RMSSD, SDNN, pNN50, mean HR) sent with every heart-rate sample if enabled (see hrv.py)
+        self.hrv_enabled = False
+        self.hrv_window_s = 60.0
+        # If enabled, RR intervals further than this fraction from the running median are corrected (see rr_filter.py)
+        self.artifact_filter_enabled = False
+        self.artifact_threshold = 0.2
+        
+        # Listeners reconnect on their own with jittered exponential backoff (see Sensor.supervise)
+        self.reconnect_enabled = True
+        self.reconnect_initial_s = 0.5
+        self.reconnect_max_s = 30.0
+        
+        # Latency histograms are dumped every dump_interval_s (0 = only on demand with Ctrl+L and on close)
+        self.latency_dump_interval_s = 0.0
+        self.latency_dump_file = "latency.jsonl"
         
         #listeners
         self.smarteye_listener = None
@@ -69,6 +130,10 @@ class IMotionsIntegrator():
         self.triggerbox_listener = None
         self.h10_listener = None
         self.vivosmart5_listener = None
+        self.blehub_listener = None
+        # Every listener runs on this one event loop instead of a thread per module
+        self.runtime = SensorRuntime()
+        self.runtime.start()
         
         # Spinner state for modules
         self.spinner_frames = ["⠋", "⠙", "⠹", "⠸", "⠼", "⠴", "⠦", "⠧", "⠇", "⠏"]
@@ -79,12 +144,13 @@ class IMotionsIntegrator():
             "gps": False,
             "smarteye": False,
             "h10": False,
-            "vivosmart5": False
+            "vivosmart5": False,
+            "blehub": False
         }
         
         # Set window size
         self.window_width = 400
-        self.window_height = 580
+        self.window_height = 610
         self.screen_width = self.root.winfo_screenwidth()
         self.screen_height = self.root.winfo_screenheight()
         self.x_coordinate = int((self.screen_width / 2) - (self.window_width / 2))
@@ -222,6 +288,20 @@ class IMotionsIntegrator():
         vivosmart5_btn = tk.Button(vivosmart5_row, text="Connect", command=self.connectVivosmart5, width=8, bg="#E8F4E8", border=1)
         vivosmart5_btn.pack(side="right", padx=1)
 
+        # BLE hub (several wearables)
+        blehub_row = ttk.Frame(modules_frame)
+        blehub_row.pack(fill="x", padx=5, pady=2)
+        blehub_label = ttk.Label(blehub_row, text="BLE Hub", width=20)
+        blehub_label.pack(side="left", fill="x", expand=True)
+        self.blehub_status = ttk.Label(blehub_row, text="⚫", foreground="gray")
+        self.blehub_status.pack(side="right", padx=5)
+        blehub_disconnect_btn = tk.Button(blehub_row, text="Disconnect", command=self.disconnectBLEHub, width=10, bg="#FFE8E8", border=1)
+        blehub_disconnect_btn.pack(side="right", padx=1)
+        self.blehub_spinner = ttk.Label(blehub_row, text="", width=2, foreground="blue")
+        self.blehub_spinner.pack(side="right", padx=1)
+        blehub_btn = tk.Button(blehub_row, text="Connect", command=self.connectBLEHub, width=8, bg="#E8F4E8", border=1)
+        blehub_btn.pack(side="right", padx=1)
+
         # Multiline log textbox
         log_frame = ttk.LabelFrame(main_container, text="Log Messages")
         log_frame.pack(fill="both", expand=True, pady=(5, 5))
@@ -236,6 +316,16 @@ class IMotionsIntegrator():
         # Load config settings
         self.load_config()
         
+        self.ble_discovery = BLEDiscovery(self.ble_cache_file,
+                                          address_timeout_s=self.ble_address_timeout_s,
+                                          scan_timeout_s=self.ble_scan_timeout_s)
+        if self.ble_background_scan:
+            self.runtime.submit(self.ble_discovery.start_background_scan())
+        
+        self.root.bind("<Control-l>", lambda event: self.dump_latency(show=True))
+        if self.latency_dump_interval_s > 0:
+            self.root.after(int(self.latency_dump_interval_s * 1000), self._periodic_latency_dump)
+        
         self.root.mainloop()
     
     def load_config(self):
@@ -250,6 +340,18 @@ class IMotionsIntegrator():
                 self.protocol = self.config.get('IMotions', 'protocol')
             except:
                 self.protocol = "udp"
+            self.queue_size = self.config.getint('IMotions', 'queue_size', fallback=self.queue_size)
+            self.overflow_policy = self.config.get('IMotions', 'overflow_policy', fallback=self.overflow_policy)
+            self.coalesce = self.config.getboolean('IMotions', 'coalesce', fallback=self.coalesce)
+            self.coalesce_max_bytes = self.config.getint('IMotions', 'coalesce_max_bytes', fallback=self.coalesce_max_bytes)
+            self.coalesce_max_latency_ms = self.config.getfloat('IMotions', 'coalesce_max_latency_ms', fallback=self.coalesce_max_latency_ms)
+        
+        ################### Recorder settings ######################
+        if 'Recorder' in self.config:
+            self.recorder_enabled = self.config.getboolean('Recorder', 'enabled', fallback=self.recorder_enabled)
+            self.recorder_directory = self.config.get('Recorder', 'directory', fallback=self.recorder_directory)
+            self.recorder_segment_mb = self.config.getfloat('Recorder', 'segment_mb', fallback=self.recorder_segment_mb)
+            self.recorder_fsync_interval_s = self.config.getfloat('Recorder', 'fsync_interval_s', fallback=self.recorder_fsync_interval_s)
         
         ################### SmartEye settings ######################
         if 'SmartEye' in self.config:
@@ -259,15 +361,80 @@ class IMotionsIntegrator():
         ################### GPS settings ######################
         if 'GPS' in self.config:
             self.gps_com = self.config.get('GPS', 'com')
+            self.gps_kalman = self.config.getboolean('GPS', 'kalman', fallback=self.gps_kalman)
+            self.gps_kalman_accel_noise = self.config.getfloat('GPS', 'kalman_accel_noise', fallback=self.gps_kalman_accel_noise)
+            self.gps_kalman_position_sigma_m = self.config.getfloat('GPS', 'kalman_position_sigma_m',
+                                                                   fallback=self.gps_kalman_position_sigma_m)
+            self.gps_baud = self.config.getint('GPS', 'baud', fallback=self.gps_baud)
+            self.gps_receiver = self.config.get('GPS', 'receiver', fallback=self.gps_receiver).lower()
+            self.gps_rate_hz = self.config.getfloat('GPS', 'rate_hz', fallback=self.gps_rate_hz)
         
         ################### TriggerBox settings ######################
         if 'TriggerBox' in self.config:
             self.triggerbox_com = self.config.get('TriggerBox', 'com')
             self.triggerbox_triggers = ast.literal_eval(self.config.get('TriggerBox', 'triggers'))
+            self.triggerbox_protocol = self.config.get('TriggerBox', 'protocol', fallback=self.triggerbox_protocol).lower()
+            self.triggerbox_baud = self.config.getint('TriggerBox', 'baud', fallback=self.triggerbox_baud)
         
         ################### Vivosmart5 settings ######################
         if 'Vivosmart5' in self.config:
             self.vivosmart5_address = self.config.get('Vivosmart5', 'address')
+        
+        ################### BLE discovery settings ######################
+        if 'BLE' in self.config:
+            self.ble_cache_file = self.config.get('BLE', 'cache_file', fallback=self.ble_cache_file)
+            self.ble_background_scan = self.config.getboolean('BLE', 'background_scan', fallback=self.ble_background_scan)
+            self.ble_address_timeout_s = self.config.getfloat('BLE', 'address_timeout_s', fallback=self.ble_address_timeout_s)
+            self.ble_scan_timeout_s = self.config.getfloat('BLE', 'scan_timeout_s', fallback=self.ble_scan_timeout_s)
+        
+        ################### BLE hub settings ######################
+        if 'BLEHub' in self.config:
+            self.blehub_devices = ast.literal_eval(self.config.get('BLEHub', 'devices', fallback=str(self.blehub_devices)))
+            self.blehub_scan_timeout_s = self.config.getfloat('BLEHub', 'scan_timeout_s', fallback=self.blehub_scan_timeout_s)
+            self.blehub_reconnect_delay_s = self.config.getfloat('BLEHub', 'reconnect_delay_s', fallback=self.blehub_reconnect_delay_s)
+        
+        ################### HRV settings ######################
+        if 'HRV' in self.config:
+            self.hrv_enabled = self.config.getboolean('HRV', 'enabled', fallback=self.hrv_enabled)
+            self.hrv_window_s = self.config.getfloat('HRV', 'window_s', fallback=self.hrv_window_s)
+            self.artifact_filter_enabled = self.config.getboolean('HRV', 'artifact_filter', fallback=self.artifact_filter_enabled)
+            self.artifact_threshold = self.config.getfloat('HRV', 'artifact_threshold', fallback=self.artifact_threshold)
+        
+        ################### Reconnect settings ######################
+        if 'Reconnect' in self.config:
+            self.reconnect_enabled = self.config.getboolean('Reconnect', 'enabled', fallback=self.reconnect_enabled)
+            self.reconnect_initial_s = self.config.getfloat('Reconnect', 'initial_s', fallback=self.reconnect_initial_s)
+            self.reconnect_max_s = self.config.getfloat('Reconnect', 'max_s', fallback=self.reconnect_max_s)
+        
+        ################### Latency settings ######################
+        if 'Latency' in self.config:
+            self.latency_dump_interval_s = self.config.getfloat('Latency', 'dump_interval_s', fallback=self.latency_dump_interval_s)
+            self.latency_dump_file = self.config.get('Latency', 'dump_file', fallback=self.latency_dump_file)
+        
+        ################### Backend settings ######################
+        for section in self.backends:
+            if section in self.config:
+                self.backends[section] = self.config.get(section, 'backend', fallback=self.backends[section])
+                self.sim_rates_hz[section] = self.config.getfloat(section, 'sim_rate_hz', fallback=self.sim_rates_hz[section])
+        
+        ################### Heart-rate RR settings ######################
+        for section in self.rr_modes:
+            if section in self.config:
+                self.rr_modes[section] = self.config.get(section, 'rr_mode', fallback=self.rr_modes[section])
+    
+    def _hrv_window_s(self):
+        """Return the HRV window of the heart-rate listeners, or None when HRV is disabled."""
+        return self.hrv_window_s if self.hrv_enabled else None
+    
+    def _artifact_threshold(self):
+        """Return the RR artifact threshold of the heart-rate listeners, or None when the filter is disabled."""
+        return self.artifact_threshold if self.artifact_filter_enabled else None
+    
+    def _simulated_rate(self, section):
+        """Return the simulation rate of a module, or None when it uses real hardware."""
+        if self.backends[section] == "simulated":
+            return self.sim_rates_hz[section]
+        return None
     
     def open_config_in_notepad(self):
         import subprocess
@@ -289,30 +456,126 @@ class IMotionsIntegrator():
         config['IMotions'] = {
             'IMotions_IP': str(server_ip),
             'IMotions_Port': str(server_port),
-            'protocol': self.protocol
+            'protocol': self.protocol,
+            'queue_size': str(self.queue_size),
+            'overflow_policy': self.overflow_policy,
+            'coalesce': str(self.coalesce).lower(),
+            'coalesce_max_bytes': str(self.coalesce_max_bytes),
+            'coalesce_max_latency_ms': str(self.coalesce_max_latency_ms)
+        }
+        config['Recorder'] = {
+            'enabled': str(self.recorder_enabled).lower(),
+            'directory': self.recorder_directory,
+            'segment_mb': str(self.recorder_segment_mb),
+            'fsync_interval_s': str(self.recorder_fsync_interval_s)
+        }
+        config['HRV'] = {
+            'enabled': str(self.hrv_enabled).lower(),
+            'window_s': str(self.hrv_window_s),
+            'artifact_filter': str(self.artifact_filter_enabled).lower(),
+            'artifact_threshold': str(self.artifact_threshold)
+        }
+        config['Reconnect'] = {
+            'enabled': str(self.reconnect_enabled).lower(),
+            'initial_s': str(self.reconnect_initial_s),
+            'max_s': str(self.reconnect_max_s)
+        }
+        config['Latency'] = {
+            'dump_interval_s': str(self.latency_dump_interval_s),
+            'dump_file': self.latency_dump_file
         }
         config['SmartEye'] = {
             'smarteye_port': str(se_server_port)
         }
         config['GPS'] = {
-            'COM': str(self.gps_com)
+            'COM': str(self.gps_com),
+            'kalman': str(self.gps_kalman).lower(),
+            'kalman_accel_noise': str(self.gps_kalman_accel_noise),
+            'kalman_position_sigma_m': str(self.gps_kalman_position_sigma_m),
+            'baud': str(self.gps_baud),
+            'receiver': self.gps_receiver,
+            'rate_hz': str(self.gps_rate_hz)
         }
 
         config['TriggerBox'] = {
             'COM': str(self.triggerbox_com),
-            'Triggers': str(self.triggerbox_triggers)
+            'Triggers': str(self.triggerbox_triggers),
+            'protocol': self.triggerbox_protocol,
+            'baud': str(self.triggerbox_baud)
         }
         
+        config['H10'] = {}
         config['Vivosmart5'] = {
             'address': str(self.vivosmart5_address)
         }
+        config['BLE'] = {
+            'cache_file': self.ble_cache_file,
+            'background_scan': str(self.ble_background_scan).lower(),
+            'address_timeout_s': str(self.ble_address_timeout_s),
+            'scan_timeout_s': str(self.ble_scan_timeout_s)
+        }
+        config['BLEHub'] = {
+            'devices': str(self.blehub_devices),
+            'scan_timeout_s': str(self.blehub_scan_timeout_s),
+            'reconnect_delay_s': str(self.blehub_reconnect_delay_s)
+        }
+        
+        for section in self.backends:
+            config[section]['backend'] = self.backends[section]
+            config[section]['sim_rate_hz'] = str(self.sim_rates_hz[section])
+        for section in self.rr_modes:
+            config[section]['rr_mode'] = self.rr_modes[section]
 
         with open('config.ini', 'w') as configfile:
             config.write(configfile)
     
+    def _listeners(self):
+        return [listener for listener in (self.smarteye_listener, self.gps_listener, self.triggerbox_listener,
+                                          self.h10_listener, self.vivosmart5_listener, self.blehub_listener)
+                if listener is not None]
+    
+    def dump_latency(self, show=False):
+        """Append the latency histograms of all listeners to the dump file, optionally showing them in the log."""
+        listeners = self._listeners()
+        if not listeners:
+            return
+        try:
+            dump_latency([listener.latency for listener in listeners], self.latency_dump_file)
+        except OSError as e:
+            self.log_message(f"Latency: Failed to write {self.latency_dump_file} - {e}", "Error")
+            return
+        if show:
+            for listener in listeners:
+                self.log_message(listener.latency.format_report(), "Info")
+            for listener in listeners:
+                stats = listener.connection_stats.snapshot()
+                if stats["losses"]:
+                    last = stats["last_recover_s"]
+                    self.log_message(f"{type(listener).__name__} connection: lost {stats['losses']}x, "
+                                     f"recovered {stats['recoveries']}x, last recovery "
+                                     f"{'n/a' if last is None else f'{last:.1f} s'}, "
+                                     f"max {stats['max_recover_s']:.1f} s, down {stats['gap_total_s']:.1f} s in total", "Info")
+            if self.blehub_listener is not None:
+                self.log_message(self.blehub_listener.format_stats(), "Info")
+    
+    def _periodic_latency_dump(self):
+        self.dump_latency()
+        self.root.after(int(self.latency_dump_interval_s * 1000), self._periodic_latency_dump)
+    
     def on_close(self):
             self.save_config()
+            self.dump_latency()
             self.disconnect()
+            if self.ble_background_scan:
+                try:
+                    self.runtime.submit(self.ble_discovery.stop_background_scan()).result(2.0)
+                except Exception:
+                    pass
+            self.runtime.stop()
+            if self.stream is not None:
+                self.stream.close()
+            if self.recorder is not None:
+                self.recorder.close()
             self.root.destroy()  # Closes the window
 
     def _create_status_update_callback(self, update_method):
@@ -384,18 +647,43 @@ class IMotionsIntegrator():
         server_port = int(self.port_entry.get())
         self.root.after(0, lambda: self.log_message(f"IMotions Protocol: {self.protocol.upper()}"))
         self.save_config()
+        if self.stream is not None:
+            self.stream.close()
+            self.stream = None
         if self.protocol.upper() == '"TCP"':
-            self.stream = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            imotions_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         else:
-            self.stream = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            imotions_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         try:
-            self.stream.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+            imotions_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
             self.root.after(0, lambda: self.log_message(f"Connecting to IMotions Server: {server_ip}:{server_port}"))
-            self.stream.connect((server_ip, server_port))
+            imotions_socket.connect((server_ip, server_port))
+            # The recorder outlives reconnects so one session covers the whole run
+            if self.recorder_enabled and self.recorder is None:
+                self.recorder = SessionRecorder(self.recorder_directory,
+                                                segment_mb=self.recorder_segment_mb,
+                                                fsync_interval_s=self.recorder_fsync_interval_s,
+                                                error_callback=self._create_message_callback("imotions"))
+                self.recorder.open()
+                self.root.after(0, lambda: self.log_message(f"Recording to {self.recorder.segment_path(1)}", "Info"))
+            # A single writer thread owns the socket; listeners only enqueue records
+            self.stream = IMotionsStream(imotions_socket,
+                                         queue_size=self.queue_size,
+                                         overflow_policy=self.overflow_policy,
+                                         coalesce=self.coalesce,
+                                         coalesce_max_bytes=self.coalesce_max_bytes,
+                                         coalesce_max_latency_ms=self.coalesce_max_latency_ms,
+                                         recorder=self.recorder,
+                                         error_callback=self._create_message_callback("imotions"))
+            self.stream.start()
+            # Listeners connected before this (re)connect still hold the closed stream
+            for listener in self._listeners():
+                listener.stream = self.stream
             self.root.after(0, lambda: self._stop_spinner("imotions"))
             self.root.after(0, lambda: self.imotions_connect_btn.config(bg="#90EE90"))
             self.root.after(0, lambda: self.log_message(f"IMotions Server Connected", "Success"))
         except:
+            imotions_socket.close()
             self.root.after(0, lambda: self._stop_spinner("imotions"))
             self.root.after(0, lambda: self.imotions_connect_btn.config(bg="#FFB6C6"))
             self.root.after(0, lambda: self.log_message(f"Error connecting to IMotions Server", "Error"))
@@ -416,7 +704,8 @@ class IMotionsIntegrator():
             "gps": self.gps_spinner,
             "smarteye": self.se_spinner,
             "h10": self.h10_spinner,
-            "vivosmart5": self.vivosmart5_spinner
+            "vivosmart5": self.vivosmart5_spinner,
+            "blehub": self.blehub_spinner
         }
         spinner_widgets[module_name].config(text="")
 
@@ -431,7 +720,8 @@ class IMotionsIntegrator():
             "gps": self.gps_spinner,
             "smarteye": self.se_spinner,
             "h10": self.h10_spinner,
-            "vivosmart5": self.vivosmart5_spinner
+            "vivosmart5": self.vivosmart5_spinner,
+            "blehub": self.blehub_spinner
         }
         
         self.spinner_index = (self.spinner_index + 1) % len(self.spinner_frames)
@@ -449,13 +739,14 @@ class IMotionsIntegrator():
             self.h10_listener.stop()
         if self.vivosmart5_listener is not None:
             self.vivosmart5_listener.stop()
+        if self.blehub_listener is not None:
+            self.blehub_listener.stop()
 
 ################################ Module Connect/Disconnect Methods #################################
     def connectTriggerBox(self):
         """Connect to Trigger Box module."""
         self._start_spinner("triggerbox")
-        self.triggerbox_thread = threading.Thread(target=self.runTriggerBox)
-        self.triggerbox_thread.start()
+        self.runTriggerBox()
     
     def disconnectTriggerBox(self):
         """Disconnect from Trigger Box module."""
@@ -472,8 +763,7 @@ class IMotionsIntegrator():
     def connectGPS(self):
         """Connect to GPS module."""
         self._start_spinner("gps")
-        self.gps_thread = threading.Thread(target=self.runGPS)
-        self.gps_thread.start()
+        self.runGPS()
     
     def disconnectGPS(self):
         """Disconnect from GPS module."""
@@ -490,8 +780,7 @@ class IMotionsIntegrator():
     def connectSmartEye(self):
         """Connect to SmartEye module."""
         self._start_spinner("smarteye")
-        self.se_thread = threading.Thread(target=self.runSmartEye)
-        self.se_thread.start()
+        self.runSmartEye()
     
     def disconnectSmartEye(self):
         """Disconnect from SmartEye module."""
@@ -508,8 +797,7 @@ class IMotionsIntegrator():
     def connectH10(self):
         """Connect to Polar H10 module."""
         self._start_spinner("h10")
-        self.h10_thread = threading.Thread(target=self.runH10)
-        self.h10_thread.start()
+        self.runH10()
     
     def disconnectH10(self):
         """Disconnect from Polar H10 module."""
@@ -526,8 +814,7 @@ class IMotionsIntegrator():
     def connectVivosmart5(self):
         """Connect to Vivosmart 5 module."""
         self._start_spinner("vivosmart5")
-        self.vivosmart5_thread = threading.Thread(target=self.runVivosmart5)
-        self.vivosmart5_thread.start()
+        self.runVivosmart5()
     
     def disconnectVivosmart5(self):
         """Disconnect from Vivosmart 5 module."""
@@ -540,45 +827,84 @@ class IMotionsIntegrator():
             self.vivosmart5_status.config(text="🟢", foreground="green")
         else:
             self.vivosmart5_status.config(text="⚫", foreground="gray")
-
-################################ Runners #################################################################    
+    
+    def connectBLEHub(self):
+        """Connect to all wearables of the BLE hub."""
+        self._start_spinner("blehub")
+        self.runBLEHub()
+    
+    def disconnectBLEHub(self):
+        """Disconnect all wearables of the BLE hub."""
+        if self.blehub_listener is not None:
+            self.blehub_listener.stop()
+    
+    def updateBLEHubStatus(self):
+        """Update BLE hub status indicator based on listener state."""
+        if self.blehub_listener is not None and self.blehub_listener.is_connected():
+            self.blehub_status.config(text="🟢", foreground="green")
+        else:
+            self.blehub_status.config(text="⚫", foreground="gray")
+
+################################ Runners #################################################################
+    def _run_listener(self, listener):
+        """Apply the reconnect settings and start listener on the shared runtime."""
+        listener.reconnect_enabled = self.reconnect_enabled
+        listener.reconnect_initial_s = self.reconnect_initial_s
+        listener.reconnect_max_s = self.reconnect_max_s
+        self.runtime.run(listener)
+    
     def runSmartEye(self):
         se_server_port = int(self.se_port_entry.get())
-        self.smarteye_listener = SEListener(se_server_port, self.stream)
+        self.smarteye_listener = SEListener(se_server_port, self.stream, simulated_rate_hz=self._simulated_rate("SmartEye"))
         self.smarteye_listener.register_status_callback(self._create_status_update_callback(self.updateSmartEyeStatus))
         self.smarteye_listener.register_message_callback(self._create_message_callback("smarteye"))
-        self.smarteye_listener.connect()
-        self.smarteye_listener.start()
+        self._run_listener(self.smarteye_listener)
     
     def runGPS(self):
-        self.gps_listener = GPSListener(self.gps_com, self.stream)
+        kalman = GPSKalmanFilter(self.gps_kalman_accel_noise, self.gps_kalman_position_sigma_m) if self.gps_kalman else None
+        self.gps_listener = GPSListener(self.gps_com, self.stream, simulated_rate_hz=self._simulated_rate("GPS"), kalman=kalman,
+                                        baud=self.gps_baud, receiver=self.gps_receiver, rate_hz=self.gps_rate_hz)
         self.gps_listener.register_status_callback(self._create_status_update_callback(self.updateGPSStatus))
         self.gps_listener.register_message_callback(self._create_message_callback("gps"))
-        self.gps_listener.connect()
-        self.gps_listener.start()
+        self._run_listener(self.gps_listener)
     
     def runTriggerBox(self):
-        self.triggerbox_listener = TriggerBoxListener(self.triggerbox_triggers, self.triggerbox_com, self.stream)
+        self.triggerbox_listener = TriggerBoxListener(self.triggerbox_triggers, self.triggerbox_com, self.stream,
+                                                      simulated_rate_hz=self._simulated_rate("TriggerBox"),
+                                                      protocol=self.triggerbox_protocol, baud=self.triggerbox_baud)
         self.triggerbox_listener.register_status_callback(self._create_status_update_callback(self.updateTriggerBoxStatus))
         self.triggerbox_listener.register_message_callback(self._create_message_callback("triggerbox"))
-        self.triggerbox_listener.connect()
-        self.triggerbox_listener.start()
+        self._run_listener(self.triggerbox_listener)
     
     def runH10(self):
-        self.h10_listener = H10Listener(self.stream)
+        self.h10_listener = H10Listener(self.stream, simulated_rate_hz=self._simulated_rate("H10"), discovery=self.ble_discovery,
+                                        rr_mode=self.rr_modes["H10"], hrv_window_s=self._hrv_window_s(),
+                                        artifact_threshold=self._artifact_threshold())
         self.h10_listener.register_status_callback(self._create_status_update_callback(self.updateH10Status))
         self.h10_listener.register_message_callback(self._create_message_callback("h10"))
-        self.h10_listener.connect()
-        if self.h10_listener.device:
-            self.h10_listener.start()
+        self._run_listener(self.h10_listener)
     
     def runVivosmart5(self):
-        self.vivosmart5_listener = Vivosmart5Listener(self.stream, address=self.vivosmart5_address)
+        self.vivosmart5_listener = Vivosmart5Listener(self.stream, address=self.vivosmart5_address,
+                                                      simulated_rate_hz=self._simulated_rate("Vivosmart5"),
+                                                      discovery=self.ble_discovery, rr_mode=self.rr_modes["Vivosmart5"],
+                                                      hrv_window_s=self._hrv_window_s(),
+                                                      artifact_threshold=self._artifact_threshold())
         self.vivosmart5_listener.register_status_callback(self._create_status_update_callback(self.updateVivosmart5Status))
         self.vivosmart5_listener.register_message_callback(self._create_message_callback("vivosmart5"))
-        self.vivosmart5_listener.connect()
-        if self.vivosmart5_listener.device:
-            self.vivosmart5_listener.start()
+        self._run_listener(self.vivosmart5_listener)
+    
+    def runBLEHub(self):
+        self.blehub_listener = BLEHub(self.blehub_devices, self.stream,
+                                      scan_timeout_s=self.blehub_scan_timeout_s,
+                                      reconnect_delay_s=self.blehub_reconnect_delay_s,
+                                      simulated_rate_hz=self._simulated_rate("BLEHub"),
+                                      discovery=self.ble_discovery, rr_mode=self.rr_modes["BLEHub"],
+                                      hrv_window_s=self._hrv_window_s(),
+                                      artifact_threshold=self._artifact_threshold())
+        self.blehub_listener.register_status_callback(self._create_status_update_callback(self.updateBLEHubStatus))
+        self.blehub_listener.register_message_callback(self._create_message_callback("blehub"))
+        self._run_listener(self.blehub_listener)
 #####################################################################################################
 
 if __name__ == "__main__":
@@ -0,0 +1,103 @@
+"""IMotions EventSource/Sample definitions and the encoders built from them.
+
+The XML files in "IMotions API" are the single source of truth for the field
+list of every sample. They are parsed once; each Sample id gets a cached
+encoder that turns a tuple of field values into an "E;1;..." record, whose
+header carries the EventSource Version. Bump that Version whenever the
+fields of a sample change: IMotions must re-import the XML, and records of
+an old import are rejected or misaligned.
+"""
+import functools
+import os
+import xml.etree.ElementTree as ET
+
+SCHEMA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "IMotions API")
+
+# Format specs for fields whose wire format is not plain str(value), keyed by (sample id, field id)
+FIELD_FORMATS = {
+    ("GPS", "vel"): ".2f",
+    ("GPS", "acc"): ".2f",
+    ("H10", "beat_time"): ".3f",
+    ("Vivosmart5", "beat_time"): ".3f",
+    ("TriggerBox", "trigger_time"): ".6f",
+}
+
+
+class SampleSchema:
+    """Field layout of one Sample of an IMotions EventSource."""
+
+    def __init__(self, source_id, source_version, sample_id, fields):
+        self.source_id = source_id
+        self.source_version = source_version
+        self.sample_id = sample_id
+        self.fields = tuple(fields)
+
+    def __repr__(self):
+        return f"SampleSchema({self.source_id}/{self.sample_id}, {len(self.fields)} fields)"
+
+
+def parse_schema_file(path):
+    """Parse one EventSource XML file into its SampleSchema objects."""
+    source = ET.parse(path).getroot()
+    source_id = source.get("Id")
+    source_version = source.get("Version", "1")
+    return [
+        SampleSchema(source_id, source_version, sample.get("Id"), [field.get("Id") for field in sample.iter("Field")])
+        for sample in source.iter("Sample")
+    ]
+
+
+@functools.lru_cache(maxsize=None)
+def load_schemas(directory=SCHEMA_DIR):
+    """Return all samples defined in directory, keyed by Sample id."""
+    schemas = {}
+    for name in sorted(os.listdir(directory)):
+        if name.lower().endswith(".xml"):
+            for schema in parse_schema_file(os.path.join(directory, name)):
+                schemas[schema.sample_id] = schema
+    return schemas
+
+
+def get_schema(sample_id, directory=SCHEMA_DIR):
+    """Return the SampleSchema of sample_id, raising KeyError if it is not defined."""
+    try:
+        return load_schemas(directory)[sample_id]
+    except KeyError:
+        raise KeyError(f"Sample '{sample_id}' is not defined in {directory}") from None
+
+
+@functools.lru_cache(maxsize=None)
+def get_encoder(sample_id, directory=SCHEMA_DIR, instance=""):
+    """Return a function encoding a tuple of field values of sample_id into record bytes.
+
+    instance fills the Instance field of the record header, which tells
+    IMotions apart several devices of the same EventSource.
+    """
+    schema = get_schema(sample_id, directory)
+    placeholders = []
+    for field in schema.fields:
+        spec = FIELD_FORMATS.get((sample_id, field))
+        placeholders.append("{:" + spec + "}" if spec else "{}")
+    header = f"E;1;{schema.source_id};{schema.source_version};{instance};;;{schema.sample_id};"
+    template = (header.replace("{", "{{").replace("}", "}}") + ";".join(placeholders) + "\r\n").format
+
+    def encode(values):
+        return template(*values).encode()
+
+    encode.schema = schema
+    # Key of the record in the stream counters and recordings
+    encode.source = f"{schema.source_id}/{instance}" if instance else schema.source_id
+    return encode
+
+
+@functools.lru_cache(maxsize=None)
+def get_batch_encoder(sample_id, directory=SCHEMA_DIR, instance=""):
+    """Return a function encoding a sequence of value tuples of sample_id into one buffer of records."""
+    encode = get_encoder(sample_id, directory, instance)
+
+    def encode_batch(rows):
+        return b"".join([encode(values) for values in rows])
+
+    encode_batch.schema = encode.schema
+    encode_batch.source = encode.source
+    return encode_batch
@@ -0,0 +1,296 @@
+import collections
+import logging
+import socket
+import threading
+import time
+
+from imotions_schema import get_batch_encoder, get_encoder
+
+logger = logging.getLogger(__name__)
+
+# Overflow policies applied when the outgoing queue is full
+DROP_OLDEST = "drop_oldest"
+DROP_NEWEST = "drop_newest"
+BLOCK = "block"
+OVERFLOW_POLICIES = (DROP_OLDEST, DROP_NEWEST, BLOCK)
+
+
+class SourceCounters:
+    """Per-source counters of the IMotions output pipeline."""
+
+    __slots__ = ("queued", "sent", "dropped", "failed")
+
+    def __init__(self):
+        self.queued = 0
+        self.sent = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def as_dict(self):
+        return {"queued": self.queued, "sent": self.sent, "dropped": self.dropped, "failed": self.failed}
+
+
+class IMotionsStream:
+    """Single-writer output pipeline to the IMotions server.
+
+    Listeners call send() or send_sample() from their own threads. Records are
+    put on a bounded queue and one writer thread owns the socket, so a slow
+    IMotions peer never stalls the sensor read loops. Samples are queued as
+    value tuples and encoded by the writer thread.
+
+    If a recorder is given, every encoded record is also queued on it by the
+    writer thread, whether or not the socket write succeeds; the recorder
+    does its disk writes on its own thread.
+
+    With coalesce enabled (TCP only), records are gathered into one buffer and
+    written with a single sendall once coalesce_max_bytes is reached or the
+    first record has waited coalesce_max_latency_ms.
+    """
+
+    def __init__(self, sock, queue_size=4096, overflow_policy=DROP_OLDEST, block_timeout=None, error_callback=None,
+                 coalesce=False, coalesce_max_bytes=8192, coalesce_max_latency_ms=0.5, recorder=None):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy '{overflow_policy}', expected one of {OVERFLOW_POLICIES}")
+        self.sock = sock
+        self.queue_size = max(1, int(queue_size))
+        self.overflow_policy = overflow_policy
+        self.block_timeout = block_timeout
+        self.error_callback = error_callback
+        self.recorder = recorder
+        self.running = False
+        self.writer_thread = None
+
+        self._queue = collections.deque()
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = threading.Condition(self._lock)
+        self._counters = {}
+        self._stream_socket = sock.type == socket.SOCK_STREAM
+        self._failing = False
+
+        # Coalescing only makes sense on a byte stream; UDP keeps one record per datagram
+        self.coalesce = coalesce and self._stream_socket
+        self.coalesce_max_bytes = max(1, int(coalesce_max_bytes))
+        self.coalesce_max_latency = max(0.0, float(coalesce_max_latency_ms)) / 1000.0
+
+    def start(self):
+        """Start the writer thread."""
+        if self.running:
+            return
+        self.running = True
+        self.writer_thread = threading.Thread(target=self._run, name="IMotionsWriter", daemon=True)
+        self.writer_thread.start()
+
+    def send(self, data, source=None):
+        """Queue one encoded record for sending.
+
+        source defaults to the EventSource id of the record (third field of
+        an "E;1;<source>;..." line). Returns False if the record was dropped.
+        """
+        if source is None:
+            source = self._source_of(data)
+        return self._put((source, None, data, time.monotonic_ns(), None, 0, 0))
+
+    def send_sample(self, sample_id, values, t_received=None, latency=None, instance=""):
+        """Queue the field values of one sample, in the order of its schema.
+
+        With a LatencyStats and the perf_counter_ns() arrival time of the data,
+        the queue, format, send and total stages are recorded for it.
+        instance tells apart several devices sending the same sample.
+        Returns False if the sample was dropped.
+        """
+        encoder = get_encoder(sample_id, instance=instance) if instance else get_encoder(sample_id)
+        if latency is None or t_received is None:
+            return self._put((encoder.source, encoder, values, time.monotonic_ns(), None, 0, 0))
+        return self._put((encoder.source, encoder, values, time.monotonic_ns(),
+                          latency, t_received, time.perf_counter_ns()))
+
+    def send_samples(self, sample_id, rows, t_received=None, latency=None, instance=""):
+        """Queue several samples of sample_id as one record batch.
+
+        The rows are encoded together and written with a single send, so a
+        burst of samples from one event costs one queue entry and one
+        syscall. The counters count the batch as one record.
+        Returns False if the batch was dropped.
+        """
+        encoder = get_batch_encoder(sample_id, instance=instance) if instance else get_batch_encoder(sample_id)
+        if latency is None or t_received is None:
+            return self._put((encoder.source, encoder, rows, time.monotonic_ns(), None, 0, 0))
+        return self._put((encoder.source, encoder, rows, time.monotonic_ns(),
+                          latency, t_received, time.perf_counter_ns()))
+
+    def _put(self, entry):
+        # entry: (source, encoder, payload, t_ns, latency, t_received, t_enqueued)
+        source = entry[0]
+        with self._lock:
+            counters = self._counters.get(source)
+            if counters is None:
+                counters = self._counters[source] = SourceCounters()
+            if not self.running:
+                counters.dropped += 1
+                return False
+            if len(self._queue) >= self.queue_size:
+                if self.overflow_policy == DROP_NEWEST:
+                    counters.dropped += 1
+                    return False
+                if self.overflow_policy == DROP_OLDEST:
+                    old_source = self._queue.popleft()[0]
+                    self._counters[old_source].dropped += 1
+                else:
+                    self._not_full.wait_for(lambda: len(self._queue) < self.queue_size or not self.running,
+                                            timeout=self.block_timeout)
+                    if len(self._queue) >= self.queue_size or not self.running:
+                        counters.dropped += 1
+                        return False
+            self._queue.append(entry)
+            counters.queued += 1
+            self._not_empty.notify()
+        return True
+
+    def stats(self):
+        """Return a snapshot of the per-source counters."""
+        with self._lock:
+            return {source: counters.as_dict() for source, counters in self._counters.items()}
+
+    def pending(self):
+        """Return the number of records waiting to be written."""
+        return len(self._queue)
+
+    def close(self, timeout=1.0):
+        """Stop the writer thread, flushing what is queued, and close the socket."""
+        with self._lock:
+            self.running = False
+            self._not_empty.notify_all()
+            self._not_full.notify_all()
+        if self.writer_thread is not None and self.writer_thread is not threading.current_thread():
+            self.writer_thread.join(timeout=timeout)
+        try:
+            self.sock.close()
+        except OSError:
+            pass
+
+    @staticmethod
+    def _source_of(data):
+        parts = data.split(b";", 3)
+        return parts[2].decode("ascii", errors="replace") if len(parts) > 3 else ""
+
+    def _run(self):
+        """Writer loop: drain the queue in batches and write them to the socket."""
+        while True:
+            with self._lock:
+                while not self._queue and self.running:
+                    self._not_empty.wait()
+                if not self._queue:
+                    break
+                batch = list(self._queue)
+                self._queue.clear()
+                self._not_full.notify_all()
+            if self.coalesce:
+                self._write_coalesced(batch)
+            else:
+                for entry in batch:
+                    data = self._encode(entry)
+                    if data is not None:
+                        self._write(entry, data)
+
+    def _encode(self, entry):
+        """Return the record bytes of a queued entry, or None if it cannot be encoded."""
+        source, encoder, payload, t_ns, latency, _, t_enqueued = entry
+        if encoder is None:
+            data = payload
+        else:
+            t_start = time.perf_counter_ns() if latency is not None else 0
+            try:
+                data = encoder(payload)
+            except Exception as e:
+                # Any encoder error costs this record only; the writer thread serves every source
+                self._counters[source].failed += 1
+                logger.error(f"Failed to encode {encoder.schema.sample_id} sample {payload!r}: {e!r}")
+                return None
+            if latency is not None:
+                latency.record("queue", t_start - t_enqueued)
+                latency.record("format", time.perf_counter_ns() - t_start)
+        if self.recorder is not None:
+            self.recorder.write(t_ns, source, data)
+        return data
+
+    def _write_coalesced(self, batch):
+        """Gather records until the byte threshold or deadline, then write them at once.
+
+        The deadline runs from the time the oldest record of batch was queued.
+        """
+        deadline_ns = batch[0][3] + int(self.coalesce_max_latency * 1e9)
+        records = []
+        size = 0
+        for entry in batch:
+            data = self._encode(entry)
+            if data is not None:
+                records.append((entry, data))
+                size += len(data)
+        while size < self.coalesce_max_bytes:
+            remaining = (deadline_ns - time.monotonic_ns()) / 1e9
+            if remaining <= 0:
+                break
+            with self._lock:
+                if not self._queue and self.running:
+                    self._not_empty.wait(remaining)
+                if not self._queue:
+                    if not self.running:
+                        break
+                    continue
+                more = list(self._queue)
+                self._queue.clear()
+                self._not_full.notify_all()
+            for entry in more:
+                data = self._encode(entry)
+                if data is not None:
+                    records.append((entry, data))
+                    size += len(data)
+
+        if not records:
+            return
+        try:
+            t_start = time.perf_counter_ns()
+            self.sock.sendall(b"".join([data for _, data in records]))
+            t_done = time.perf_counter_ns()
+            for entry, _ in records:
+                self._record_sent(entry, t_start, t_done)
+            self._failing = False
+        except Exception as e:
+            for entry, _ in records:
+                self._counters[entry[0]].failed += 1
+            self._report_failure(e)
+
+    def _write(self, entry, data):
+        try:
+            t_start = time.perf_counter_ns()
+            if self._stream_socket:
+                self.sock.sendall(data)
+            else:
+                self.sock.send(data)
+            self._record_sent(entry, t_start, time.perf_counter_ns())
+            self._failing = False
+        except Exception as e:
+            self._counters[entry[0]].failed += 1
+            self._report_failure(e)
+
+    def _record_sent(self, entry, t_start, t_done):
+        self._counters[entry[0]].sent += 1
+        latency = entry[4]
+        if latency is not None:
+            latency.record("send", t_done - t_start)
+            latency.record("total", t_done - entry[5])
+
+    def _report_failure(self, error):
+        """Report the first failure of a run of failed writes."""
+        if not self._failing:
+            self._failing = True
+            logger.error(f"Failed to send to IMotions: {error}")
+            self._notify_error(f"IMotions: Failed to send - {error}")
+
+    def _notify_error(self, message):
+        if self.error_callback:
+            try:
+                self.error_callback(message, "Error")
+            except Exception as e:
+                print(f"Error in stream error callback: {e}")
@@ -0,0 +1,119 @@
+"""Latency histograms for the path from sensor arrival to the IMotions socket.
+
+Durations are time.perf_counter_ns() differences. Each source has one
+histogram per stage:
+
+    parse   arrival -> values ready (sensor thread)
+    queue   values queued -> picked up by the IMotions writer thread
+    format  encoding the record
+    send    writing to the socket
+    total   arrival -> written to the socket
+"""
+import json
+import math
+import time
+
+STAGES = ("parse", "queue", "format", "send", "total")
+
+# Log-linear buckets: 2**_SUB_BITS buckets per power of two, under 12.5% relative error
+_SUB_BITS = 3
+_SUB = 1 << _SUB_BITS
+_LINEAR = 2 * _SUB
+_MAX_EXPONENT = 40
+_BUCKETS = _SUB * (_MAX_EXPONENT + 2)
+
+
+def _bucket(value):
+    if value < _LINEAR:
+        return max(value, 0)
+    exponent = value.bit_length() - _SUB_BITS - 1
+    if exponent > _MAX_EXPONENT:
+        return _BUCKETS - 1
+    return _SUB * (exponent + 1) + (value >> exponent) - _SUB
+
+
+def _bucket_upper(index):
+    if index < _LINEAR:
+        return index
+    exponent = index // _SUB - 1
+    return ((index % _SUB + _SUB + 1) << exponent) - 1
+
+
+class LatencyHistogram:
+    """Fixed-size histogram of nanosecond durations; record() is O(1) and allocates nothing."""
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * _BUCKETS
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+    def record(self, ns):
+        self.counts[_bucket(ns)] += 1
+        self.count += 1
+        self.total += ns
+        if ns > self.max:
+            self.max = ns
+
+    def percentile(self, p):
+        """Return the upper bound of the bucket holding the p-th percentile, in ns."""
+        if not self.count:
+            return 0
+        target = max(1, math.ceil(self.count * p / 100.0))
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= target:
+                return min(_bucket_upper(index), self.max)
+        return self.max
+
+    def reset(self):
+        self.counts = [0] * _BUCKETS
+        self.count = 0
+        self.total = 0
+        self.max = 0
+
+
+class LatencyStats:
+    """Per-stage latency histograms of one source."""
+
+    def __init__(self, name):
+        self.name = name
+        self.stages = {stage: LatencyHistogram() for stage in STAGES}
+
+    def record(self, stage, ns):
+        self.stages[stage].record(ns)
+
+    def snapshot(self):
+        """Return {stage: {count, p50_us, p99_us, max_us, mean_us}} for stages with data."""
+        report = {}
+        for stage, histogram in self.stages.items():
+            if histogram.count:
+                report[stage] = {
+                    "count": histogram.count,
+                    "p50_us": histogram.percentile(50) / 1000.0,
+                    "p99_us": histogram.percentile(99) / 1000.0,
+                    "max_us": histogram.max / 1000.0,
+                    "mean_us": histogram.total / histogram.count / 1000.0,
+                }
+        return report
+
+    def format_report(self):
+        lines = [f"{self.name} latency (us):"]
+        for stage, values in self.snapshot().items():
+            lines.append(f"  {stage:<6} n={values['count']:<8} p50={values['p50_us']:.1f} "
+                         f"p99={values['p99_us']:.1f} max={values['max_us']:.1f}")
+        return "\n".join(lines)
+
+    def reset(self):
+        for histogram in self.stages.values():
+            histogram.reset()
+
+
+def dump_latency(stats, path):
+    """Append one JSON line with the snapshot of every LatencyStats in stats."""
+    entry = {"time": time.time(), "sources": {s.name: s.snapshot() for s in stats}}
+    with open(path, "a") as f:
+        f.write(json.dumps(entry) + "\n")
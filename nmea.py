@@ -0,0 +1,233 @@
+"""Streaming NMEA 0183 parser working on the raw bytes of the serial port.
+
+NMEAParser.feed() takes whatever bytes the port delivered and returns the
+sentences they completed; NMEAParser.parse() decodes a single line. Every
+sentence must carry a valid "*hh" checksum. The sentence type (the three
+letters after the talker id, so "$GPGGA", "$GNGGA" and "$GLGGA" alike) picks
+the decoder from _DECODERS. Each decoder is one precompiled regular
+expression matched in place on the line, so only the fields that are used
+are ever copied out of it.
+
+Times are UTC seconds since midnight, with the fraction the receiver sends
+(10 Hz receivers send "hhmmss.ss").
+"""
+import collections
+import functools
+import operator
+import re
+import struct
+
+# $<talker><type>,<fields>*<hh>: talker is 2 letters, type 3 (proprietary $P sentences are not decoded)
+GGA = collections.namedtuple("GGA", "talker utc raw_time latitude longitude quality num_satellites hdop altitude")
+RMC = collections.namedtuple("RMC", "talker utc raw_time valid latitude longitude speed_knots course date")
+VTG = collections.namedtuple("VTG", "talker course speed_knots speed_kmh")
+GSA = collections.namedtuple("GSA", "talker mode fix_type prns pdop hdop vdop")
+GSV = collections.namedtuple("GSV", "talker message_count message_number satellites_in_view satellites")
+# One satellite of a GSV sentence; elevation/azimuth/snr are None when not reported
+Satellite = collections.namedtuple("Satellite", "prn elevation azimuth snr")
+# Builds a namedtuple from a tuple in C, skipping the Python-level __new__ of the hot GGA/RMC path
+_make = tuple.__new__
+
+KNOTS_TO_MPS = 1852.0 / 3600.0
+
+_FIELD = rb"([^,*]*)"
+
+
+def _fields(count):
+    return rb",".join([_FIELD] * count)
+
+
+# "*hh" checksum digits -> value, upper and lower case
+_HEX = {**{b"%02X" % value: value for value in range(256)}, **{b"%02x" % value: value for value in range(256)}}
+
+# Struct unpacking a body padded to n 64-bit words, by n
+_WORDS = {}
+_xor = operator.xor
+
+
+def checksum(body):
+    """XOR of the bytes of a sentence body (between '$' and '*').
+
+    The body is XOR-ed as 64-bit words, which are then folded to one byte,
+    instead of XOR-ing its bytes one by one in Python.
+    """
+    count = (len(body) + 7) >> 3
+    words = _WORDS.get(count)
+    if words is None:
+        words = _WORDS[count] = struct.Struct(f"<{count}Q")
+    value = functools.reduce(_xor, words.unpack(body.ljust(count << 3, b"\0")), 0)
+    value ^= value >> 32
+    value ^= value >> 16
+    value ^= value >> 8
+    return value & 0xFF
+
+
+def _float(field):
+    return float(field) if field else None
+
+
+def _int(field):
+    return int(field) if field else None
+
+
+def _utc(field):
+    """hhmmss[.ss] as seconds since midnight, or None."""
+    if len(field) < 6:
+        return None
+    value = float(field)
+    minutes = value // 100
+    hours = minutes // 100
+    return hours * 3600 + (minutes - hours * 100) * 60 + (value - minutes * 100)
+
+
+def _coordinate(field, hemisphere):
+    """(d)ddmm.mmmm and N/S/E/W as signed degrees, or None."""
+    if not field:
+        return None
+    value = float(field)
+    degrees = value // 100
+    degrees += (value - degrees * 100) / 60.0
+    return -degrees if hemisphere == b"S" or hemisphere == b"W" else degrees
+
+
+# time, lat, N/S, lon, E/W, quality, satellites, HDOP, altitude
+_GGA = re.compile(_fields(9))
+
+
+def _decode_gga(talker, line, pos):
+    match = _GGA.match(line, pos)
+    if match is None:
+        return None
+    raw_time, lat, ns, lon, ew, quality, satellites, hdop, altitude = match.groups()
+    return _make(GGA, (talker, _utc(raw_time), raw_time.decode("ascii"), _coordinate(lat, ns), _coordinate(lon, ew),
+                       int(quality) if quality else None, int(satellites) if satellites else None,
+                       float(hdop) if hdop else None, float(altitude) if altitude else None))
+
+
+# time, status, lat, N/S, lon, E/W, speed (knots), course, date
+_RMC = re.compile(_fields(9))
+
+
+def _decode_rmc(talker, line, pos):
+    match = _RMC.match(line, pos)
+    if match is None:
+        return None
+    raw_time, status, lat, ns, lon, ew, speed, course, date = match.groups()
+    return _make(RMC, (talker, _utc(raw_time), raw_time.decode("ascii"), status == b"A", _coordinate(lat, ns),
+                       _coordinate(lon, ew), float(speed) if speed else None, float(course) if course else None,
+                       date.decode("ascii")))
+
+
+# course (true), T, course (magnetic), M, speed (knots), N, speed (km/h), K
+_VTG = re.compile(_fields(8))
+
+
+def _decode_vtg(talker, line, pos):
+    match = _VTG.match(line, pos)
+    if match is None:
+        return None
+    course, _, _, _, speed_knots, _, speed_kmh, _ = match.groups()
+    return VTG(talker, _float(course), _float(speed_knots), _float(speed_kmh))
+
+
+# mode, fix type, 12 satellite PRNs, PDOP, HDOP, VDOP
+_GSA = re.compile(_fields(17))
+
+
+def _decode_gsa(talker, line, pos):
+    match = _GSA.match(line, pos)
+    if match is None:
+        return None
+    fields = match.groups()
+    return GSA(talker, fields[0].decode("ascii"), _int(fields[1]), tuple(int(prn) for prn in fields[2:14] if prn),
+               _float(fields[14]), _float(fields[15]), _float(fields[16]))
+
+
+# message count, message number, satellites in view, then up to 4 x (PRN, elevation, azimuth, SNR)
+_GSV = re.compile(_fields(3))
+_GSV_SATELLITE = re.compile(rb"," + _fields(4))
+
+
+def _decode_gsv(talker, line, pos):
+    match = _GSV.match(line, pos)
+    if match is None:
+        return None
+    count, number, in_view = match.groups()
+    satellites = tuple(Satellite(int(prn), _int(elevation), _int(azimuth), _int(snr))
+                       for prn, elevation, azimuth, snr in
+                       (sat.groups() for sat in _GSV_SATELLITE.finditer(line, match.end(), line.find(b"*", pos)))
+                       if prn)
+    return GSV(talker, _int(count), _int(number), _int(in_view), satellites)
+
+
+# Sentence type -> decoder(talker, line, position of the first field)
+_DECODERS = {
+    b"GGA": _decode_gga,
+    b"RMC": _decode_rmc,
+    b"VTG": _decode_vtg,
+    b"GSA": _decode_gsa,
+    b"GSV": _decode_gsv,
+}
+
+
+class NMEAParser:
+    """Split raw serial bytes into NMEA sentences and decode the supported ones.
+
+    The counters tell apart sentences that were decoded, failed their
+    checksum, are of a type without decoder or could not be decoded.
+    """
+
+    def __init__(self, max_line=256):
+        self.max_line = max_line
+        self._buffer = bytearray()
+        self.sentences = 0
+        self.checksum_errors = 0
+        self.unsupported = 0
+        self.malformed = 0
+
+    def feed(self, data):
+        """Add bytes read from the port; return the decoded sentences they completed, in order."""
+        buffer = self._buffer
+        buffer += data
+        decoded = []
+        start = 0
+        while True:
+            end = buffer.find(b"\n", start)
+            if end < 0:
+                break
+            sentence = self.parse(bytes(buffer[start:end]))
+            if sentence is not None:
+                decoded.append(sentence)
+            start = end + 1
+        del buffer[:start]
+        if len(buffer) > self.max_line:
+            # No line end in sight: noise or a wrong baud rate
+            self.malformed += 1
+            buffer.clear()
+        return decoded
+
+    def parse(self, line):
+        """Decode one sentence (bytes, line ending optional); None if it is invalid or unsupported."""
+        start = line.find(b"$")
+        star = line.find(b"*", start + 1)
+        expected = _HEX.get(line[star + 1:star + 3])
+        if start < 0 or star < 0 or expected is None or star - start < 6:
+            self.malformed += 1
+            return None
+        # Sentences nobody decodes (most of GSV/GSA traffic on some receivers) skip the checksum too
+        decoder = _DECODERS.get(line[start + 3:start + 6])
+        if decoder is None or line[start + 6] != 0x2C:
+            self.unsupported += 1
+            return None
+        if checksum(line[start + 1:star]) != expected:
+            self.checksum_errors += 1
+            return None
+        try:
+            sentence = decoder(line[start + 1:start + 3].decode("ascii"), line, start + 7)
+        except ValueError:
+            sentence = None
+        if sentence is None:
+            self.malformed += 1
+            return None
+        self.sentences += 1
+        return sentence
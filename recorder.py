@@ -0,0 +1,233 @@
+"""Append-only binary recording of the records sent to IMotions.
+
+A session is a sequence of segment files "<session>_<n>.imrec". Each segment
+starts with MAGIC followed by records of RECORD_HEADER + payload:
+
+    kind     u8    KIND_SOURCE (payload is the source name) or KIND_RECORD
+    t_ns     i64   time.monotonic_ns() when the record was queued
+    source   u16   source id, defined by a KIND_SOURCE record in the same segment
+    length   u32   payload length
+
+Segments are self-contained, so any one of them can be replayed on its own.
+"""
+import collections
+import glob
+import logging
+import mmap
+import os
+import struct
+import threading
+import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"IMREC01\n"
+RECORD_HEADER = struct.Struct("<BqHI")
+KIND_SOURCE = 0
+KIND_RECORD = 1
+SEGMENT_SUFFIX = ".imrec"
+
+
+class SessionRecorder:
+    """Write every outgoing record to rotating segment files.
+
+    write() only queues the record; a recorder thread appends the queued
+    records, rotates segments and fsyncs, so a slow disk never delays the
+    IMotions writer thread. At most queue_size records wait; more are
+    dropped and counted in dropped.
+    """
+
+    def __init__(self, directory, segment_mb=64, fsync_interval_s=1.0, buffer_kb=1024, queue_size=65536,
+                 error_callback=None):
+        self.directory = directory
+        self.segment_bytes = max(1, int(segment_mb * 1024 * 1024))
+        self.fsync_interval_ns = int(fsync_interval_s * 1e9)
+        self.buffer_bytes = int(buffer_kb * 1024)
+        self.queue_size = max(1, int(queue_size))
+        self.error_callback = error_callback
+        self.session = datetime.now().strftime("session_%Y%m%d_%H%M%S")
+        self.segment_index = 0
+        self.records = 0
+        self.dropped = 0
+        self.running = False
+        self.thread = None
+
+        self._file = None
+        self._segment_size = 0
+        self._source_ids = {}
+        self._segment_sources = set()
+        self._last_sync_ns = 0
+        self._unsynced = False
+        self._failed = False
+        self._queue = collections.deque()
+        self._not_empty = threading.Condition()
+
+    def open(self):
+        """Create the session directory and the first segment, and start the recorder thread."""
+        os.makedirs(self.directory, exist_ok=True)
+        self._open_segment()
+        self._last_sync_ns = time.monotonic_ns()
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="SessionRecorder", daemon=True)
+        self.thread.start()
+        logger.info(f"Recording session to {self.segment_path(1)}")
+
+    def segment_path(self, index):
+        return os.path.join(self.directory, f"{self.session}_{index:04d}{SEGMENT_SUFFIX}")
+
+    def write(self, t_ns, source, data):
+        """Queue one record; returns False if it was dropped."""
+        with self._not_empty:
+            if not self.running or len(self._queue) >= self.queue_size:
+                self.dropped += 1
+                return False
+            self._queue.append((t_ns, source, data))
+            self._not_empty.notify()
+        return True
+
+    def sync(self):
+        """Flush buffered records and fsync the current segment."""
+        if self._file is not None:
+            # Set first, so a failing fsync is retried an interval later rather than at once
+            self._last_sync_ns = time.monotonic_ns()
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._unsynced = False
+
+    def close(self, timeout=5.0):
+        """Stop the recorder thread, writing what is queued, and close the segment."""
+        with self._not_empty:
+            self.running = False
+            self._not_empty.notify()
+        if self.thread is not None:
+            self.thread.join(timeout=timeout)
+        if self._file is not None:
+            try:
+                self.sync()
+            finally:
+                self._file.close()
+                self._file = None
+
+    def _run(self):
+        """Recorder loop: append queued records and fsync every fsync_interval_s."""
+        while True:
+            with self._not_empty:
+                if not self._queue and self.running:
+                    if self._unsynced:
+                        timeout = (self._last_sync_ns + self.fsync_interval_ns - time.monotonic_ns()) / 1e9
+                        self._not_empty.wait(max(timeout, 0.0))
+                    else:
+                        self._not_empty.wait()
+                if not self._queue and not self.running:
+                    break
+                batch = list(self._queue)
+                self._queue.clear()
+            try:
+                for t_ns, source, data in batch:
+                    self._append_record(t_ns, source, data)
+                    self._unsynced = True
+                if self._unsynced and time.monotonic_ns() - self._last_sync_ns >= self.fsync_interval_ns:
+                    self.sync()
+                self._failed = False
+            except OSError as e:
+                # Recording carries on with the next records; report the first failure of a run only
+                if not self._failed:
+                    self._failed = True
+                    logger.error(f"Recorder write failed: {e}")
+                    self._notify_error(f"Recorder: Failed to write - {e}")
+
+    def _append_record(self, t_ns, source, data):
+        if self._segment_size >= self.segment_bytes:
+            self._rotate()
+        source_id = self._source_id(source)
+        if source_id not in self._segment_sources:
+            name = source.encode()
+            self._append(RECORD_HEADER.pack(KIND_SOURCE, t_ns, source_id, len(name)) + name)
+            self._segment_sources.add(source_id)
+        self._append(RECORD_HEADER.pack(KIND_RECORD, t_ns, source_id, len(data)))
+        self._append(data)
+        self.records += 1
+
+    def _notify_error(self, message):
+        if self.error_callback:
+            try:
+                self.error_callback(message, "Error")
+            except Exception as e:
+                print(f"Error in recorder error callback: {e}")
+
+    def _source_id(self, source):
+        source_id = self._source_ids.get(source)
+        if source_id is None:
+            source_id = self._source_ids[source] = len(self._source_ids)
+        return source_id
+
+    def _append(self, data):
+        self._file.write(data)
+        self._segment_size += len(data)
+
+    def _open_segment(self):
+        self.segment_index += 1
+        self._file = open(self.segment_path(self.segment_index), "ab", buffering=self.buffer_bytes)
+        self._segment_size = 0
+        self._segment_sources = set()
+        self._append(MAGIC)
+
+    def _rotate(self):
+        self.sync()
+        self._file.close()
+        self._open_segment()
+
+
+def session_segments(path):
+    """Return the segment files that path refers to, as one list per session.
+
+    A segment file is replayed on its own, a session prefix gives the
+    segments of that session and a directory those of every session in it.
+    """
+    if path.endswith(SEGMENT_SUFFIX) and not os.path.isdir(path):
+        return [[path]]
+    if os.path.isdir(path):
+        segments = glob.glob(os.path.join(glob.escape(path), "*" + SEGMENT_SUFFIX))
+    else:
+        segments = glob.glob(glob.escape(path) + "_[0-9][0-9][0-9][0-9]" + SEGMENT_SUFFIX)
+    sessions = {}
+    for segment in sorted(segments):
+        sessions.setdefault(segment[:-len(SEGMENT_SUFFIX)].rpartition("_")[0], []).append(segment)
+    return list(sessions.values())
+
+
+def iter_segment(path):
+    """Yield (t_ns, source, payload) for every record of one segment.
+
+    The file is memory-mapped, so only the records being replayed are paged
+    in. A record cut short by a crash ends the segment.
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size <= len(MAGIC):
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if mm[:len(MAGIC)] != MAGIC:
+                raise ValueError(f"{path} is not a recording segment")
+            sources = {}
+            offset = len(MAGIC)
+            end = len(mm)
+            unpack_from = RECORD_HEADER.unpack_from
+            header_size = RECORD_HEADER.size
+            while offset + header_size <= end:
+                kind, t_ns, source_id, length = unpack_from(mm, offset)
+                offset += header_size
+                if offset + length > end:
+                    logger.warning(f"{path}: truncated record at offset {offset - header_size}")
+                    break
+                if kind == KIND_SOURCE:
+                    sources[source_id] = mm[offset:offset + length].decode()
+                else:
+                    yield t_ns, sources.get(source_id, ""), mm[offset:offset + length]
+                offset += length
+
+
+def iter_session(segments):
+    """Yield (t_ns, source, payload) for every record of segments (one session), segment by segment."""
+    for segment in segments:
+        yield from iter_segment(segment)
@@ -0,0 +1,129 @@
+"""Replay a recorded session into IMotions (or anything listening like it).
+
+Examples, from the repository root:
+    python replay.py recordings/session_20250101_120000_0001.imrec
+    python replay.py recordings --ip 127.0.0.1 --port 8090 --protocol tcp --speed 4
+    python replay.py recordings --speed max
+"""
+import argparse
+import logging
+import socket
+import time
+
+from recorder import iter_session, session_segments
+
+logger = logging.getLogger(__name__)
+
+
+class SessionReplayer:
+    """Stream recorded records to a UDP/TCP target.
+
+    speed is the playback rate relative to the recording (1.0 is real time);
+    None replays as fast as possible. On TCP, records that are due together are
+    written with one sendall of up to batch_bytes; UDP keeps one record per
+    datagram, as the listeners send them.
+    """
+
+    def __init__(self, sock, speed=1.0, batch_bytes=65536, sources=None):
+        self.sock = sock
+        self.speed = speed
+        self.batch_bytes = batch_bytes
+        self.sources = set(sources) if sources else None
+        self.records = 0
+        self.bytes = 0
+        self._stream_socket = sock.type == socket.SOCK_STREAM
+
+    def replay(self, path):
+        """Replay the segment, session or directory of sessions at path; returns the elapsed seconds.
+
+        Sessions are replayed one after another, each paced on its own clock.
+        """
+        start_ns = time.perf_counter_ns()
+        for segments in session_segments(path):
+            self._replay_session(segments)
+        return (time.perf_counter_ns() - start_ns) / 1e9
+
+    def _replay_session(self, segments):
+        batch = []
+        batch_size = 0
+        start_ns = time.perf_counter_ns()
+        first_t_ns = None
+        for t_ns, source, payload in iter_session(segments):
+            if self.sources is not None and source not in self.sources:
+                continue
+            if self.speed is not None:
+                if first_t_ns is None:
+                    first_t_ns = t_ns
+                due_ns = start_ns + int((t_ns - first_t_ns) / self.speed)
+                wait_ns = due_ns - time.perf_counter_ns()
+                if wait_ns > 0:
+                    # Everything gathered so far is due now; send it before waiting
+                    self._flush(batch)
+                    batch = []
+                    batch_size = 0
+                    time.sleep(wait_ns / 1e9)
+            if not self._stream_socket:
+                self._send(payload)
+                continue
+            batch.append(payload)
+            batch_size += len(payload)
+            if batch_size >= self.batch_bytes:
+                self._flush(batch)
+                batch = []
+                batch_size = 0
+        self._flush(batch)
+
+    def _flush(self, batch):
+        if batch:
+            self._send(b"".join(batch), len(batch))
+
+    def _send(self, data, count=1):
+        if self._stream_socket:
+            self.sock.sendall(data)
+        else:
+            self.sock.send(data)
+        self.records += count
+        self.bytes += len(data)
+
+
+def parse_speed(value):
+    """Parse --speed: a positive factor, or "max" for as fast as possible."""
+    if value.lower() in ("max", "0"):
+        return None
+    speed = float(value)
+    if speed <= 0:
+        raise argparse.ArgumentTypeError("speed must be positive or 'max'")
+    return speed
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(levelname)s: %(message)s"
+    )
+
+    parser = argparse.ArgumentParser(description="Replay a recorded IMotions session")
+    parser.add_argument("path", help="segment file, session prefix or recordings directory")
+    parser.add_argument("--ip", default="127.0.0.1", help="target IP address")
+    parser.add_argument("--port", type=int, default=8090, help="target port")
+    parser.add_argument("--protocol", choices=("tcp", "udp"), default="tcp", help="transport to the target")
+    parser.add_argument("--speed", type=parse_speed, default=1.0, help="playback speed factor (1 = real time) or 'max'")
+    parser.add_argument("--batch-bytes", type=int, default=65536, help="max bytes per TCP write")
+    parser.add_argument("--source", action="append", dest="sources", help="only replay this EventSource id (repeatable)")
+    args = parser.parse_args()
+
+    if args.protocol == "tcp":
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    else:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.connect((args.ip, args.port))
+
+    replayer = SessionReplayer(sock, speed=args.speed, batch_bytes=args.batch_bytes, sources=args.sources)
+    try:
+        elapsed = replayer.replay(args.path)
+        rate = replayer.records / elapsed if elapsed > 0 else 0
+        logger.info(f"Replayed {replayer.records} records ({replayer.bytes} bytes) in {elapsed:.3f} s, {rate:.0f} records/s")
+    except KeyboardInterrupt:
+        logger.info(f"Stopped after {replayer.records} records")
+    finally:
+        sock.close()
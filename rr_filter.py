@@ -0,0 +1,69 @@
+"""Streaming artifact filter for RR intervals.
+
+Chest straps and wrist sensors miss beats (an interval about twice as long
+as its neighbours) and pick up ectopic beats (one short interval followed by
+a long one). A single such interval dominates RMSSD and pNN50, so
+RRArtifactFilter checks every interval against the median of the last few
+beats before it reaches the HRV engine. The window has a fixed size, so
+memory and the work per beat are constant.
+"""
+import bisect
+import collections
+
+# rr_corrected and artifact field values sent without a filter
+NO_FILTER = ("", "")
+
+
+class RRArtifactFilter:
+    """Replace RR intervals that deviate from the running median by more than threshold.
+
+    check() returns (rr_corrected, artifact): the interval itself and 0 for a
+    normal beat, the running median and 1 for an artifact. Intervals outside
+    min_rr_s..max_rr_s are always artifacts. The first min_beats intervals
+    after a reset are only checked against those bounds.
+    """
+
+    def __init__(self, threshold=0.2, window=11, min_beats=5, min_rr_s=0.25, max_rr_s=2.0):
+        self.threshold = threshold
+        self.window = max(3, int(window))
+        self.min_beats = min(max(1, int(min_beats)), self.window)
+        self.min_rr_s = min_rr_s
+        self.max_rr_s = max_rr_s
+        self.corrected = 0
+        self.reset()
+
+    def reset(self):
+        """Forget the recent beats, e.g. after a reconnect."""
+        self._recent = collections.deque()
+        self._sorted = []
+
+    def median(self):
+        """Return the (lower) median of the recent beats, or None before any beat.
+
+        It is always one of the intervals, so corrected intervals stay
+        multiples of 1/1024 s like the measured ones.
+        """
+        if not self._sorted:
+            return None
+        return self._sorted[(len(self._sorted) - 1) // 2]
+
+    def check(self, rr):
+        """Return (rr_corrected, artifact) for the next interval in seconds."""
+        if not self.min_rr_s <= rr <= self.max_rr_s:
+            median = self.median()
+            self.corrected += 1
+            return (median if median is not None else min(max(rr, self.min_rr_s), self.max_rr_s)), 1
+        median = self.median() if len(self._sorted) >= self.min_beats else None
+        # Every plausible beat enters the window, so a real change of heart rate takes over within half a window
+        self._push(rr)
+        if median is not None and abs(rr - median) > self.threshold * median:
+            self.corrected += 1
+            return median, 1
+        return rr, 0
+
+    def _push(self, rr):
+        if len(self._recent) == self.window:
+            old = self._recent.popleft()
+            del self._sorted[bisect.bisect_left(self._sorted, old)]
+        self._recent.append(rr)
+        bisect.insort(self._sorted, rr)
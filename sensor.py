@@ -1,4 +1,59 @@
 from abc import ABC, abstractmethod
+import asyncio
+import random
+import time
+
+from latency import LatencyStats
+
+
+def backoff_delay(attempt, initial_s, max_s, jitter=0.5):
+    """Exponential backoff for retry number attempt (0-based), randomly shortened by up to jitter.
+
+    The jitter keeps devices that dropped out together from retrying in lockstep.
+    """
+    delay = min(max_s, initial_s * (2 ** min(attempt, 30)))
+    return delay * (1.0 - jitter * random.random())
+
+
+class ConnectionStats:
+    """Connection gaps of a sensor: how often it was lost and how long it took to recover."""
+
+    def __init__(self):
+        self.attempts = 0
+        self.losses = 0
+        self.recoveries = 0
+        self.gap_total_s = 0.0
+        self.last_gap_s = None
+        self.max_gap_s = 0.0
+        self.lost_at = None
+
+    def lost(self, now):
+        self.losses += 1
+        self.lost_at = now
+
+    def recovered(self, now):
+        """Close the open gap, if any; the gap length is the time to recover."""
+        if self.lost_at is None:
+            return
+        gap = now - self.lost_at
+        self.lost_at = None
+        self.recoveries += 1
+        self.gap_total_s += gap
+        self.last_gap_s = gap
+        self.max_gap_s = max(self.max_gap_s, gap)
+
+    def snapshot(self, now=None):
+        now = time.monotonic() if now is None else now
+        return {
+            "attempts": self.attempts,
+            "losses": self.losses,
+            "recoveries": self.recoveries,
+            "gap_total_s": self.gap_total_s + (now - self.lost_at if self.lost_at is not None else 0.0),
+            "last_recover_s": self.last_gap_s,
+            "max_recover_s": self.max_gap_s,
+            "down_s": now - self.lost_at if self.lost_at is not None else 0.0,
+        }
+
 
 class Sensor(ABC):
     """Abstract base class for all sensors."""
@@ -7,6 +62,17 @@ class Sensor(ABC):
         self.connected = False
         self._status_callbacks = []
         self._message_callbacks = []
+        # Per-stage latency from data arrival to the IMotions socket (see latency.py)
+        self.latency = LatencyStats(type(self).__name__)
+        # Set by SensorRuntime.run() when run() is hosted on the shared event loop
+        self.runtime = None
+        # Supervised reconnect of run() (see supervise())
+        self.reconnect_enabled = True
+        self.reconnect_initial_s = 0.5
+        self.reconnect_max_s = 30.0
+        self.connection_stats = ConnectionStats()
+        self._stop_requested = False
+        self._connected_this_attempt = False
 
     @abstractmethod
     def connect(self):
@@ -28,10 +94,61 @@ class Sensor(ABC):
         """Return the current status of the sensor."""
         pass
     
+    async def run(self):
+        """Connect and stream on the shared event loop until cancelled (see sensor_runtime.py).
+
+        Sensors without a native asyncio implementation run their blocking
+        connect() and start() in the loop's default executor.
+        """
+        await asyncio.to_thread(self.connect)
+        await asyncio.to_thread(self.start)
+    
+    async def supervise(self):
+        """Run run() until stop(), starting it again whenever the connection ends.
+
+        Retries back off exponentially with jitter, from reconnect_initial_s up
+        to reconnect_max_s, and start over from the initial delay once a
+        connection was made. Gaps between losing and regaining the connection
+        are recorded in connection_stats.
+        """
+        self._stop_requested = False
+        attempt = 0
+        while True:
+            self._connected_this_attempt = False
+            self.connection_stats.attempts += 1
+            try:
+                await self.run()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._notify_message(f"{type(self).__name__}: Error - {e}", "Error")
+            if self._stop_requested or not self.reconnect_enabled:
+                return
+            if self.connected:
+                self._notify_status_change(False)
+            elif self.connection_stats.lost_at is None:
+                # Never connected in the first place: the gap starts now
+                self.connection_stats.lost(time.monotonic())
+            attempt = 0 if self._connected_this_attempt else attempt + 1
+            delay = backoff_delay(attempt, self.reconnect_initial_s, self.reconnect_max_s)
+            self._notify_message(f"{type(self).__name__}: Reconnecting in {delay:.1f} s", "Info")
+            await asyncio.sleep(delay)
+    
+    def _cancel_run(self, timeout=2.0):
+        """Cancel run() on the shared runtime, if it runs there, and wait for its cleanup."""
+        self._stop_requested = True
+        self.connection_stats.lost_at = None
+        if self.runtime is not None:
+            self.runtime.cancel(self, timeout)
+    
     def is_connected(self):
         """Return whether the sensor is currently connected."""
         return self.connected
     
+    def _record_parse_latency(self, t_received):
+        """Record the parse stage for data that arrived at perf_counter_ns() t_received."""
+        self.latency.record("parse", time.perf_counter_ns() - t_received)
+    
     def register_status_callback(self, callback):
         """Register a callback to be called when connection status changes.
         
@@ -48,6 +165,11 @@ class Sensor(ABC):
     
     def _notify_status_change(self, connected):
         """Notify all registered callbacks of a status change."""
+        if connected and not self.connected:
+            self._connected_this_attempt = True
+            self.connection_stats.recovered(time.monotonic())
+        elif not connected and self.connected and not self._stop_requested:
+            self.connection_stats.lost(time.monotonic())
         self.connected = connected
         for callback in self._status_callbacks:
             try:
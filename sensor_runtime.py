@@ -0,0 +1,245 @@
+"""One asyncio event loop, in one thread, hosting every sensor.
+
+Sensors implement Sensor.run(), a coroutine that connects and streams until
+the connection ends; Sensor.supervise() runs it again until the sensor is
+stopped. SmartEye uses a datagram endpoint, the serial sensors use
+SerialLineReader and the BLE sensors share this loop with bleak, so the
+integrator needs one sensor thread instead of one per module.
+"""
+import asyncio
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class SensorRuntime:
+    """Run Sensor.run() coroutines on a shared event loop in a background thread.
+
+    run(), cancel() and stop() may be called from any thread; cancel() and
+    stop() wait for the sensors' cleanup to finish, so a sensor is fully shut
+    down when they return.
+    """
+
+    def __init__(self, name="sensor-runtime"):
+        self.name = name
+        self.loop = None
+        self._thread = None
+        self._tasks = {}
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self.loop = asyncio.new_event_loop()
+        ready = threading.Event()
+        self._thread = threading.Thread(target=self._run_loop, args=(ready,), name=self.name, daemon=True)
+        self._thread.start()
+        ready.wait()
+
+    def run(self, sensor):
+        """Schedule sensor.run() on the loop; a sensor already running is cancelled first."""
+        sensor.runtime = self
+        return asyncio.run_coroutine_threadsafe(self._spawn(sensor), self.loop)
+
+    def submit(self, coro):
+        """Run a coroutine that is not a sensor on the loop; returns a concurrent.futures.Future."""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def cancel(self, sensor, timeout=2.0):
+        """Cancel sensor.run() and wait up to timeout seconds for it to finish."""
+        if self.loop is None or self.loop.is_closed():
+            return
+        if self._in_loop():
+            task = self._tasks.get(sensor)
+            if task is not None:
+                task.cancel()
+            return
+        future = asyncio.run_coroutine_threadsafe(self._cancel(sensor), self.loop)
+        try:
+            future.result(timeout)
+        except Exception as e:
+            logger.warning(f"{type(sensor).__name__} did not stop cleanly: {e!r}")
+
+    def stop(self, timeout=5.0):
+        """Cancel every sensor, then stop the loop and join its thread."""
+        if self._thread is None:
+            return
+        future = asyncio.run_coroutine_threadsafe(self._cancel_all(), self.loop)
+        try:
+            future.result(timeout)
+        except Exception as e:
+            logger.warning(f"Sensors did not stop cleanly: {e!r}")
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join(timeout)
+        self._thread = None
+
+    def _run_loop(self, ready):
+        asyncio.set_event_loop(self.loop)
+        self.loop.call_soon(ready.set)
+        try:
+            self.loop.run_forever()
+        finally:
+            self.loop.run_until_complete(self.loop.shutdown_asyncgens())
+            self.loop.close()
+
+    def _in_loop(self):
+        return self._thread is not None and threading.get_ident() == self._thread.ident
+
+    async def _spawn(self, sensor):
+        await self._cancel(sensor)
+        task = self.loop.create_task(self._supervise(sensor), name=type(sensor).__name__)
+        self._tasks[sensor] = task
+
+    async def _supervise(self, sensor):
+        try:
+            await sensor.supervise()
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"{type(sensor).__name__} stopped: {e}")
+            sensor._notify_status_change(False)
+            sensor._notify_message(f"{type(sensor).__name__}: Error - {e}", "Error")
+        finally:
+            if self._tasks.get(sensor) is asyncio.current_task():
+                del self._tasks[sensor]
+
+    async def _cancel(self, sensor):
+        task = self._tasks.get(sensor)
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    async def _cancel_all(self):
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+
+def read_available(ser):
+    """Block until bytes arrive on ser, then return (everything waiting, perf_counter_ns() of the first byte).
+
+    The data is b"" when the port's timeout expires or cancel_read() is
+    called. The time is taken as soon as the first read returns, before
+    the rest is read.
+    """
+    data = ser.read(ser.in_waiting or 1)
+    t_received = time.perf_counter_ns()
+    if data:
+        waiting = ser.in_waiting
+        if waiting:
+            data += ser.read(waiting)
+    return data, t_received
+
+
+class LineBuffer:
+    """Split a byte stream into lines, each returned with its terminator and arrival time.
+
+    The bytes are kept in one bytearray that is compacted once per feed();
+    lines are cut from a memoryview of it, so each is copied exactly once.
+    A partial line longer than max_line (noise, wrong baud rate) is dropped.
+    """
+
+    def __init__(self, max_line=1024):
+        self.max_line = max_line
+        self._buffer = bytearray()
+        self._t_line = 0
+
+    def feed(self, data, t_received=0):
+        """Add bytes read from the port at t_received; return the (line, time) pairs they completed.
+
+        The time of a line is that of the read that delivered its first byte.
+        """
+        buffer = self._buffer
+        t_line = self._t_line if buffer else t_received
+        buffer += data
+        end = buffer.find(b"\n")
+        lines = []
+        if end >= 0:
+            start = 0
+            with memoryview(buffer) as view:
+                while end >= 0:
+                    lines.append((bytes(view[start:end + 1]), t_line))
+                    t_line = t_received
+                    start = end + 1
+                    end = buffer.find(b"\n", start)
+            del buffer[:start]
+        self._t_line = t_line
+        if len(buffer) > self.max_line:
+            buffer.clear()
+        return lines
+
+    def clear(self):
+        self._buffer.clear()
+
+
+class SerialLineReader:
+    """Read lines from a pyserial port without blocking the event loop.
+
+    POSIX ports are watched with loop.add_reader() and only read what is
+    waiting. The Windows Proactor loop has no add_reader() for COM ports and
+    the simulated ports have no file descriptor, so for those a blocking
+    read_available() runs in the loop's default executor instead; close()
+    interrupts it with cancel_read().
+
+    splitter cuts the bytes into items, LineBuffer by default; anything with
+    the same feed(data, t_received) works, e.g. trigger_frames.FrameDecoder.
+    """
+
+    def __init__(self, ser, loop=None, splitter=None):
+        self.ser = ser
+        self.loop = loop or asyncio.get_running_loop()
+        self._lines = splitter if splitter is not None else LineBuffer()
+        self._pending = []
+        self._waiter = None
+        self._fd = None
+        try:
+            fd = ser.fileno()
+            self.loop.add_reader(fd, self._on_readable)
+            self._fd = fd
+        except (AttributeError, NotImplementedError, OSError, ValueError):
+            pass
+
+    async def read_lines(self):
+        """Return (line, time) for every complete line received so far, waiting for at least one.
+
+        Lines are bytes including their terminator; the time is the
+        perf_counter_ns() at which the first byte of the line was read. In
+        executor mode the list is empty when the port timed out.
+        """
+        if self._fd is None:
+            return self._lines.feed(*await self.loop.run_in_executor(None, read_available, self.ser))
+        while not self._pending:
+            self._waiter = self.loop.create_future()
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+        lines = self._pending
+        self._pending = []
+        return lines
+
+    def _on_readable(self):
+        t_received = time.perf_counter_ns()
+        try:
+            data = self.ser.read(self.ser.in_waiting or 1)
+        except Exception as e:
+            # Unplugged device: stop watching and hand the error to read_lines()
+            self.close()
+            if self._waiter is not None and not self._waiter.done():
+                self._waiter.set_exception(e)
+            return
+        lines = self._lines.feed(data, t_received)
+        if lines:
+            self._pending += lines
+            if self._waiter is not None and not self._waiter.done():
+                self._waiter.set_result(None)
+
+    def close(self):
+        """Stop watching the port and wake a pending executor read; the port itself is left open."""
+        if self._fd is not None:
+            self.loop.remove_reader(self._fd)
+            self._fd = None
+        else:
+            self.ser.cancel_read()
@@ -0,0 +1,352 @@
+"""Simulated sensor backends for running the pipeline without hardware.
+
+- SimulatedSerial stands in for serial.Serial and is fed by nmea_chunks()
+  (GPS) or trigger_chunks()/trigger_frame_chunks() (Trigger Box).
+- SEPPacketGenerator sends sepd-encoded packets over UDP to the SmartEye port,
+  so SEListener runs its normal UDPClient/Parser path.
+- SimulatedBLEDevice/SimulatedBleakClient replace the bleak scan and client and
+  notify Heart Rate Measurement values like a chest strap or wristband.
+
+Every generator produces data at a configurable rate.
+"""
+import asyncio
+import math
+import random
+import socket
+import struct
+import threading
+import time
+from datetime import datetime, timezone
+
+from nmea import checksum
+from trigger_frames import encode_frame
+
+
+class SimulatedSerial:
+    """Stand-in for serial.Serial that produces generated bytes at a fixed rate.
+
+    chunks yields the bytes produced on each tick, e.g. one NMEA epoch.
+    """
+
+    def __init__(self, chunks, rate_hz, timeout=1.0):
+        self.port = "SIMULATED"
+        self.timeout = timeout
+        self.is_open = True
+        self._chunks = iter(chunks)
+        self._period = 1.0 / rate_hz
+        self._next_due = time.monotonic()
+        self._buffer = bytearray()
+        self._cancelled = threading.Event()
+
+    def _pump(self):
+        now = time.monotonic()
+        while self._next_due <= now:
+            self._buffer += next(self._chunks)
+            self._next_due += self._period
+
+    @property
+    def in_waiting(self):
+        self._pump()
+        return len(self._buffer)
+
+    def _wait_for(self, ready):
+        """Pump until ready(buffer) is true, the timeout expires or the port is closed."""
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout
+        self._cancelled.clear()
+        while self.is_open:
+            self._pump()
+            if ready(self._buffer):
+                return True
+            now = time.monotonic()
+            if deadline is not None and now >= deadline:
+                return False
+            wait = self._next_due - now
+            if deadline is not None:
+                wait = min(wait, deadline - now)
+            if self._cancelled.wait(max(wait, 0)):
+                return False
+        return False
+
+    def read(self, size=1):
+        self._wait_for(lambda buffer: len(buffer) >= size)
+        data = bytes(self._buffer[:size])
+        del self._buffer[:size]
+        return data
+
+    def readline(self):
+        self._wait_for(lambda buffer: b"\n" in buffer)
+        end = self._buffer.find(b"\n") + 1 or len(self._buffer)
+        data = bytes(self._buffer[:end])
+        del self._buffer[:end]
+        return data
+
+    def write(self, data):
+        return len(data)
+
+    def cancel_read(self):
+        self._cancelled.set()
+
+    def close(self):
+        self.is_open = False
+        self._cancelled.set()
+
+
+def _nmea(body):
+    return f"${body}*{checksum(body.encode('ascii')):02X}\r\n".encode("ascii")
+
+
+def _nmea_coordinate(value, degree_digits):
+    degrees = int(abs(value))
+    minutes = (abs(value) - degrees) * 60.0
+    return f"{degrees:0{degree_digits}d}{minutes:07.4f}"
+
+
+def nmea_chunks(rate_hz, latitude=32.0853, longitude=34.7818, speed_mps=12.0, talker="GN"):
+    """Yield one GGA + RMC epoch per tick for a receiver driving a slow circle."""
+    period = 1.0 / rate_hz
+    heading = 0.0
+    epoch = datetime.now(timezone.utc)
+    tick = 0
+    while True:
+        stamp = epoch.timestamp() + tick * period
+        now = datetime.fromtimestamp(stamp, timezone.utc)
+        utc = now.strftime("%H%M%S.") + f"{now.microsecond // 10000:02d}"
+        speed = max(0.0, speed_mps + random.gauss(0.0, 0.2))
+        heading = (heading + 3.0 * period) % 360.0
+        distance = speed * period
+        latitude += distance * math.cos(math.radians(heading)) / 111320.0
+        longitude += distance * math.sin(math.radians(heading)) / (111320.0 * math.cos(math.radians(latitude)))
+        lat = _nmea_coordinate(latitude, 2)
+        lon = _nmea_coordinate(longitude, 3)
+        ns = "N" if latitude >= 0 else "S"
+        ew = "E" if longitude >= 0 else "W"
+        altitude = 35.0 + random.gauss(0.0, 0.3)
+        yield (_nmea(f"{talker}GGA,{utc},{lat},{ns},{lon},{ew},1,12,0.8,{altitude:.1f},M,17.9,M,,")
+               + _nmea(f"{talker}RMC,{utc},A,{lat},{ns},{lon},{ew},{speed * 1.943844:.3f},{heading:.2f},"
+                       f"{now.strftime('%d%m%y')},,,A"))
+        tick += 1
+
+
+def trigger_chunks(trigger_count):
+    """Yield the trigger indices 1..trigger_count in turn, one line per tick."""
+    index = 0
+    while True:
+        yield f"{index + 1}\r\n".encode("ascii")
+        index = (index + 1) % trigger_count
+
+
+def trigger_frame_chunks(trigger_count):
+    """Yield one binary trigger frame per tick, ids 1..trigger_count in turn, stamped with a micros() counter."""
+    index = 0
+    while True:
+        yield encode_frame(index + 1, int(time.monotonic() * 1e6))
+        index = (index + 1) % trigger_count
+
+
+# sepd is big endian: packet header (sync id, packet type 4, length) then subpackets (id, length, data)
+SEPD_SYNC_ID = 0x53455044
+SEPD_PACKET_TYPE = 4
+
+
+def _sepd_point(value):
+    return struct.pack(">ddd", value.x, value.y, value.z)
+
+
+def _sepd_string(value):
+    data = value.encode("ascii")
+    return struct.pack(">H", len(data)) + data
+
+
+def _sepd_world_intersection(value):
+    if value is None:
+        return struct.pack(">H", 0)
+    return (struct.pack(">H", 1) + _sepd_point(value.world_point) + _sepd_point(value.object_point)
+            + _sepd_string(value.object_name))
+
+
+def encode_sepd_packet(values):
+    """Encode a packet from {SEOutputDataId name: value}, e.g. {"SEFrameNumber": 1}."""
+    from sep.se_type_id import SETypeId
+    from sep.sepd.se_output_data import SEOutputDataId, output_data_type
+
+    encoders = {
+        SETypeId.SEType_u8: lambda v: struct.pack(">B", v),
+        SETypeId.SEType_u16: lambda v: struct.pack(">H", v),
+        SETypeId.SEType_u32: lambda v: struct.pack(">I", v),
+        SETypeId.SEType_s32: lambda v: struct.pack(">i", v),
+        SETypeId.SEType_u64: lambda v: struct.pack(">Q", v),
+        SETypeId.SEType_f64: lambda v: struct.pack(">d", v),
+        SETypeId.SEType_Point3D: _sepd_point,
+        SETypeId.SEType_Vect3D: _sepd_point,
+        SETypeId.SEType_Quaternion: lambda v: struct.pack(">dddd", v.w, v.x, v.y, v.z),
+        SETypeId.SEType_String: _sepd_string,
+        SETypeId.SEType_WorldIntersection: _sepd_world_intersection,
+    }
+    body = bytearray()
+    for name, value in values.items():
+        output_id = SEOutputDataId[name]
+        data = encoders[output_data_type(output_id)](value)
+        body += struct.pack(">HH", output_id.value, len(data)) + data
+    return struct.pack(">IHH", SEPD_SYNC_ID, SEPD_PACKET_TYPE, len(body)) + bytes(body)
+
+
+def sepd_packets(rate_hz):
+    """Yield sepd packets of a driver looking around, with every SEP_DX field populated."""
+    from sep.se_types import SEType_Point3D, SEType_Quaternion, SEType_Vect3D, SEType_WorldIntersectionItem
+
+    frame = 0
+    start = time.time()
+    blink = 0
+    while True:
+        t = frame / rate_hz
+        yaw = 0.3 * math.sin(0.4 * t)
+        pitch = 0.1 * math.sin(0.25 * t)
+        gaze = SEType_Vect3D(math.sin(yaw), math.sin(pitch), math.cos(yaw))
+        head = SEType_Point3D(0.01 * math.sin(t), 0.02, 0.65)
+        on_windshield = abs(yaw) < 0.2
+        if frame % int(rate_hz * 4) == 0:
+            blink += 1
+        intersection = SEType_WorldIntersectionItem(
+            world_point=SEType_Point3D(gaze.x * 2.0, gaze.y * 2.0, 2.0),
+            object_point=SEType_Point3D(gaze.x, gaze.y, 0.0),
+            object_name="Windshield",
+        ) if on_windshield else None
+        yield encode_sepd_packet({
+            "SEFrameNumber": frame,
+            "SEEstimatedDelay": 20000,
+            "SETimeStamp": int(t * 1e7),
+            "SEUserTimeStamp": 0,
+            "SERealTimeClock": int((start + t) * 1e7),
+            "SEFrameRate": float(rate_hz),
+            "SELeftGazeDirection": gaze,
+            "SERightGazeDirection": gaze,
+            "SELeftEyePosition": SEType_Point3D(head.x - 0.032, head.y, head.z),
+            "SERightEyePosition": SEType_Point3D(head.x + 0.032, head.y, head.z),
+            "SEHeadRotationQ": 0.9,
+            "SEHeadRoll": 0.0,
+            "SEHeadPitch": pitch,
+            "SEHeadHeading": yaw,
+            "SEHeadPosition": head,
+            "SEHeadPositionQ": 0.95,
+            "SEHeadRotationRodrigues": SEType_Vect3D(pitch, yaw, 0.0),
+            "SEHeadRotationQuaternion": SEType_Quaternion(w=math.cos(yaw / 2), x=0.0, y=math.sin(yaw / 2), z=0.0),
+            "SEFixation": frame // int(rate_hz / 4 or 1),
+            "SEBlink": blink if frame % int(rate_hz * 4) < rate_hz / 10 else 0,
+            "SESaccade": 0,
+            "SELeftClosestWorldIntersection": intersection,
+            "SERightClosestWorldIntersection": intersection,
+        })
+        frame += 1
+
+
+class SEPPacketGenerator:
+    """Send generated sepd packets over UDP at a fixed rate, like Smart Eye Pro does."""
+
+    def __init__(self, port, rate_hz=60.0, host="127.0.0.1"):
+        self.address = (host, port)
+        self.rate_hz = rate_hz
+        self.running = False
+        self.thread = None
+        self.sent = 0
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self._run, name="SEPPacketGenerator", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        period = 1.0 / self.rate_hz
+        packets = sepd_packets(self.rate_hz)
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            next_due = time.monotonic()
+            while self.running:
+                sock.sendto(next(packets), self.address)
+                self.sent += 1
+                next_due += period
+                delay = next_due - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+        finally:
+            sock.close()
+
+    def stop(self):
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=1.0)
+
+
+def heart_rate_measurement(hr, rr_intervals=(), energy_expended=None):
+    """Encode a BLE Heart Rate Measurement value; rr_intervals are in seconds."""
+    flags = 0x10 if rr_intervals else 0
+    if hr > 255:
+        flags |= 0x01
+    if energy_expended is not None:
+        flags |= 0x08
+    data = bytearray([flags])
+    data += struct.pack("<H" if hr > 255 else "<B", hr)
+    if energy_expended is not None:
+        data += struct.pack("<H", energy_expended)
+    for rr in rr_intervals:
+        data += struct.pack("<H", int(round(rr * 1024)))
+    return data
+
+
+class SimulatedBLEDevice:
+    """Result of a simulated BLE scan."""
+
+    def __init__(self, address, name):
+        self.address = address
+        self.name = name
+
+
+class SimulatedBleakClient:
+    """Stand-in for bleak.BleakClient that notifies simulated heart rate values."""
+
+    def __init__(self, device, rate_hz=1.0, resting_hr=70.0, disconnected_callback=None):
+        self.device = device
+        self.rate_hz = rate_hz
+        self.resting_hr = resting_hr
+        self.disconnected_callback = disconnected_callback
+        self.is_connected = False
+        self._tasks = {}
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.disconnect()
+
+    async def connect(self):
+        self.is_connected = True
+        return True
+
+    async def disconnect(self):
+        for task in self._tasks.values():
+            task.cancel()
+        self._tasks.clear()
+        was_connected, self.is_connected = self.is_connected, False
+        if was_connected and self.disconnected_callback is not None:
+            self.disconnected_callback(self)
+        return True
+
+    async def start_notify(self, char_uuid, callback):
+        self._tasks[char_uuid] = asyncio.ensure_future(self._notify(callback))
+
+    async def stop_notify(self, char_uuid):
+        task = self._tasks.pop(char_uuid, None)
+        if task is not None:
+            task.cancel()
+
+    async def _notify(self, callback):
+        period = 1.0 / self.rate_hz
+        t = 0.0
+        while True:
+            await asyncio.sleep(period)
+            t += period
+            hr = self.resting_hr + 8.0 * math.sin(2 * math.pi * t / 60.0) + random.gauss(0.0, 1.0)
+            # A notification carries the beats completed since the previous one
+            beats = max(1, int(round(hr * period / 60.0)))
+            rr = [60.0 / hr + random.gauss(0.0, 0.02) for _ in range(beats)]
+            callback(None, heart_rate_measurement(int(round(hr)), rr))
@@ -1,17 +1,81 @@
+import asyncio
 import logging
 import time
 from sensor import Sensor
 
-from sep.sepd import Packet
+from field_serializer import compile_extractor, compile_serializer
+from imotions_schema import get_schema
+
+from sep.sepd import Packet, Parser
 from sep.socket import EndOfStreamError, TCPClient, UDPClient
 
+# Packet attribute (and default) of every SEP_DX field id in "IMotions API/SE_API_HEIM.xml".
+# The SE*GazeOrigin fields have always carried the gaze direction vectors.
+SEP_DX_FIELDS = {
+    "SEFrameNumber": ("frame_number", 0),
+    "SEEstimatedDelay": ("estimated_delay", 0),
+    "SETimeStamp": ("time_stamp", 0),
+    "SEUserTimeStamp": ("user_time_stamp", 0),
+    "SERealTimeClock": ("real_time_clock", 0),
+    "SEFrameRate": ("frame_rate", 0),
+    "SELeftGazeOrigin.x": ("left_gaze_direction.x", 0),
+    "SELeftGazeOrigin.y": ("left_gaze_direction.y", 0),
+    "SELeftGazeOrigin.z": ("left_gaze_direction.z", 0),
+    "SERightGazeOrigin.x": ("right_gaze_direction.x", 0),
+    "SERightGazeOrigin.y": ("right_gaze_direction.y", 0),
+    "SERightGazeOrigin.z": ("right_gaze_direction.z", 0),
+    "SELeftEyePosition.x": ("left_eye_position.x", 0),
+    "SELeftEyePosition.y": ("left_eye_position.y", 0),
+    "SELeftEyePosition.z": ("left_eye_position.z", 0),
+    "SERightEyePosition.x": ("right_eye_position.x", 0),
+    "SERightEyePosition.y": ("right_eye_position.y", 0),
+    "SERightEyePosition.z": ("right_eye_position.z", 0),
+    "SSEHeadRotationQ": ("head_rotation_quality", 0),
+    "SEHeadRoll": ("head_roll", 0),
+    "SEHeadPitch": ("head_pitch", 0),
+    "SEHeadHeading": ("head_heading", 0),
+    "SEHeadPosition.x": ("head_position.x", 0),
+    "SEHeadPosition.y": ("head_position.y", 0),
+    "SEHeadPosition.z": ("head_position.z", 0),
+    "SEHeadPositionQ": ("head_position_quality", 0),
+    "SEHeadRotationRodrigues.x": ("head_rotation_rodrigues.x", 0),
+    "SEHeadRotationRodrigues.y": ("head_rotation_rodrigues.y", 0),
+    "SEHeadRotationRodrigues.z": ("head_rotation_rodrigues.z", 0),
+    "SEHeadRotationQuaternion.x": ("head_rotation_quaternion.x", 0),
+    "SEHeadRotationQuaternion.y": ("head_rotation_quaternion.y", 0),
+    "SEHeadRotationQuaternion.z": ("head_rotation_quaternion.z", 0),
+    "SEHeadRotationQuaternion.w": ("head_rotation_quaternion.w", 0),
+    "SEFixation": ("fixation", 0),
+    "SEBlink": ("blink", 0),
+    "SESaccade": ("saccade", 0),
+    "SELeftClosestWorldIntersection.intersection": ("left_closest_world_intersection?", 0),
+    "SELeftClosestWorldIntersection.worldPoint.x": ("left_closest_world_intersection.world_point.x", 0),
+    "SELeftClosestWorldIntersection.worldPoint.y": ("left_closest_world_intersection.world_point.y", 0),
+    "SELeftClosestWorldIntersection.worldPoint.z": ("left_closest_world_intersection.world_point.z", 0),
+    "SERightClosestWorldIntersection.intersection": ("right_closest_world_intersection?", 0),
+    "SERightClosestWorldIntersection.worldPoint.x": ("right_closest_world_intersection.world_point.x", 0),
+    "SERightClosestWorldIntersection.worldPoint.y": ("right_closest_world_intersection.world_point.y", 0),
+    "SERightClosestWorldIntersection.worldPoint.z": ("right_closest_world_intersection.world_point.z", 0),
+    "SELeftClosestWorldIntersection.objectName": ("left_closest_world_intersection.object_name", ""),
+    "SERightClosestWorldIntersection.objectName": ("right_closest_world_intersection.object_name", ""),
+}
+
+# Compiled once in schema order: every packet attribute is read a single time per packet
+_SEP_DX_LAYOUT = [SEP_DX_FIELDS[field] for field in get_schema("SEP_DX").fields]
+_extract_sep_dx = compile_extractor(_SEP_DX_LAYOUT)
+_serialize_sep_dx = compile_serializer(_SEP_DX_LAYOUT)
+
 class SEListener(Sensor):
-    def __init__(self, port, stream=None):
+    def __init__(self, port, stream=None, simulated_rate_hz=None):
         super().__init__()
         self.stream = stream
         self.port = port
         self.running = False
         self.client = None
+        self.simulated_rate_hz = simulated_rate_hz
+        self.generator = None
+        # run() gives up on the port after this long without packets, like the blocking client's timeout
+        self.receive_timeout_s = 50.0
     
     def print_packet(self, packet: Packet) -> None:
         print("** PACKET **")
@@ -679,66 +743,23 @@ class SEListener(Sensor):
             print(f"dominant_emotion_quality: {packet.dominant_emotion_quality}")
 
     def prepare_data(self, packet: Packet):
-        # Placeholder for sending data to connected clients
-        #data = f'{packet.frame_number if packet.frame_number is not None else 0 };{packet.estimated_delay if packet.estimated_delay is not None else 0 };{packet.time_stamp if packet.time_stamp is not None else 0 };{packet.user_time_stamp if packet.user_time_stamp is not None else 0 };{packet.real_time_clock if packet.real_time_clock is not None else 0 };{packet.frame_rate if packet.frame_rate is not None else 0 };{packet.left_gaze_direction.x if packet.left_gaze_direction and packet.left_gaze_direction.x is not None else 0 };{packet.left_gaze_direction.y if packet.left_gaze_direction and packet.left_gaze_direction.y is not None else 0 };{packet.left_gaze_direction.z if packet.left_gaze_direction and packet.left_gaze_direction.z is not None else 0 };{packet.right_gaze_direction.x if packet.right_gaze_direction and packet.right_gaze_direction.x is not None else 0 };{packet.right_gaze_direction.y if packet.right_gaze_direction and packet.right_gaze_direction.y is not None else 0 };{packet.right_gaze_direction.z if packet.right_gaze_direction and packet.right_gaze_direction.z is not None else 0 };{packet.left_eye_position.x if packet.left_eye_position and packet.left_eye_position.x is not None else 0 };{packet.left_eye_position.y if packet.left_eye_position and packet.left_eye_position.y is not None else 0 };{packet.left_eye_position.z if packet.left_eye_position and packet.left_eye_position.z is not None else 0 };{packet.right_eye_position.x if packet.right_eye_position and packet.right_eye_position.x is not None else 0 };{packet.right_eye_position.y if packet.right_eye_position and packet.right_eye_position.y is not None else 0 };{packet.right_eye_position.z if packet.right_eye_position and packet.right_eye_position.z is not None else 0 };{packet.head_rotation_quality if packet.head_rotation_quality is not None else 0 };{packet.head_roll if packet.head_roll is not None else 0 };{packet.head_pitch if packet.head_pitch is not None else 0 };{packet.head_heading if packet.head_heading is not None else 0 };{packet.head_position.x if packet.head_position and packet.head_position.x is not None else 0 };{packet.head_position.y if packet.head_position and packet.head_position.y is not None else 0 };{packet.head_position.z if packet.head_position and packet.head_position.z is not None else 0 };{packet.head_position_quality if packet.head_position_quality is not None else 0 };{packet.head_rotation_rodrigues.x if packet.head_rotation_rodrigues and packet.head_rotation_rodrigues.x is not None else 0 };{packet.head_rotation_rodrigues.y if packet.head_rotation_rodrigues and packet.head_rotation_rodrigues.y is not None else 0 };{packet.head_rotation_rodrigues.z if packet.head_rotation_rodrigues and packet.head_rotation_rodrigues.z is not None else 0 };{packet.head_rotation_quaternion.x if packet.head_rotation_quaternion and packet.head_rotation_quaternion.x is not None else 0 };{packet.head_rotation_quaternion.y if packet.head_rotation_quaternion and packet.head_rotation_quaternion.y is not None else 0 };{packet.head_rotation_quaternion.z if packet.head_rotation_quaternion and packet.head_rotation_quaternion.z is not None else 0 };{packet.head_rotation_quaternion.w if packet.head_rotation_quaternion and packet.head_rotation_quaternion.w is not None else 0 };{packet.fixation if packet.fixation is not None else 0 };{packet.blink if packet.blink is not None else 0 };{packet.saccade if packet.saccade is not None else 0 };{1 if packet.left_closest_world_intersection is not None else 0 };{packet.left_closest_world_intersection.world_point.x if packet.left_closest_world_intersection and packet.left_closest_world_intersection.world_point and packet.left_closest_world_intersection.world_point.x is not None else 0 };{packet.left_closest_world_intersection.world_point.y if packet.left_closest_world_intersection and  packet.left_closest_world_intersection.world_point and packet.left_closest_world_intersection.world_point.y is not None else 0 };{packet.left_closest_world_intersection.world_point.z if packet.left_closest_world_intersection and  packet.left_closest_world_intersection.world_point and packet.left_closest_world_intersection.world_point.z is not None else 0 };{1 if packet.right_closest_world_intersection is not None else 0 };{packet.right_closest_world_intersection.world_point.x if packet.right_closest_world_intersection and  packet.right_closest_world_intersection.world_point and packet.right_closest_world_intersection.world_point.x is not None else 0 };{packet.right_closest_world_intersection.world_point.y if packet.right_closest_world_intersection and  packet.right_closest_world_intersection.world_point and packet.right_closest_world_intersection.world_point.y is not None else 0 };{packet.right_closest_world_intersection.world_point.z if packet.right_closest_world_intersection and  packet.right_closest_world_intersection.world_point and packet.right_closest_world_intersection.world_point.z is not None else 0 }'
-        
-        # include object name if available
-        data = f'{packet.frame_number if packet.frame_number is not None else 0 };\
-{packet.estimated_delay if packet.estimated_delay is not None else 0 };\
-{packet.time_stamp if packet.time_stamp is not None else 0 };\
-{packet.user_time_stamp if packet.user_time_stamp is not None else 0 };\
-{packet.real_time_clock if packet.real_time_clock is not None else 0 };\
-{packet.frame_rate if packet.frame_rate is not None else 0 };\
-{packet.left_gaze_direction.x if packet.left_gaze_direction and packet.left_gaze_direction.x is not None else 0 };\
-{packet.left_gaze_direction.y if packet.left_gaze_direction and packet.left_gaze_direction.y is not None else 0 };\
-{packet.left_gaze_direction.z if packet.left_gaze_direction and packet.left_gaze_direction.z is not None else 0 };\
-{packet.right_gaze_direction.x if packet.right_gaze_direction and packet.right_gaze_direction.x is not None else 0 };\
-{packet.right_gaze_direction.y if packet.right_gaze_direction and packet.right_gaze_direction.y is not None else 0 };\
-{packet.right_gaze_direction.z if packet.right_gaze_direction and packet.right_gaze_direction.z is not None else 0 };\
-{packet.left_eye_position.x if packet.left_eye_position and packet.left_eye_position.x is not None else 0 };\
-{packet.left_eye_position.y if packet.left_eye_position and packet.left_eye_position.y is not None else 0 };\
-{packet.left_eye_position.z if packet.left_eye_position and packet.left_eye_position.z is not None else 0 };\
-{packet.right_eye_position.x if packet.right_eye_position and packet.right_eye_position.x is not None else 0 };\
-{packet.right_eye_position.y if packet.right_eye_position and packet.right_eye_position.y is not None else 0 };\
-{packet.right_eye_position.z if packet.right_eye_position and packet.right_eye_position.z is not None else 0 };\
-{packet.head_rotation_quality if packet.head_rotation_quality is not None else 0 };\
-{packet.head_roll if packet.head_roll is not None else 0 };\
-{packet.head_pitch if packet.head_pitch is not None else 0 };\
-{packet.head_heading if packet.head_heading is not None else 0 };\
-{packet.head_position.x if packet.head_position and packet.head_position.x is not None else 0 };\
-{packet.head_position.y if packet.head_position and packet.head_position.y is not None else 0 };\
-{packet.head_position.z if packet.head_position and packet.head_position.z is not None else 0 };\
-{packet.head_position_quality if packet.head_position_quality is not None else 0 };\
-{packet.head_rotation_rodrigues.x if packet.head_rotation_rodrigues and packet.head_rotation_rodrigues.x is not None else 0 };\
-{packet.head_rotation_rodrigues.y if packet.head_rotation_rodrigues and packet.head_rotation_rodrigues.y is not None else 0 };\
-{packet.head_rotation_rodrigues.z if packet.head_rotation_rodrigues and packet.head_rotation_rodrigues.z is not None else 0 };\
-{packet.head_rotation_quaternion.x if packet.head_rotation_quaternion and packet.head_rotation_quaternion.x is not None else 0 };\
-{packet.head_rotation_quaternion.y if packet.head_rotation_quaternion and packet.head_rotation_quaternion.y is not None else 0 };\
-{packet.head_rotation_quaternion.z if packet.head_rotation_quaternion and packet.head_rotation_quaternion.z is not None else 0 };\
-{packet.head_rotation_quaternion.w if packet.head_rotation_quaternion and packet.head_rotation_quaternion.w is not None else 0 };\
-{packet.fixation if packet.fixation is not None else 0 };\
-{packet.blink if packet.blink is not None else 0 };\
-{packet.saccade if packet.saccade is not None else 0 };\
-{1 if packet.left_closest_world_intersection is not None else 0 };\
-{packet.left_closest_world_intersection.world_point.x if packet.left_closest_world_intersection and packet.left_closest_world_intersection.world_point and packet.left_closest_world_intersection.world_point.x is not None else 0 };\
-{packet.left_closest_world_intersection.world_point.y if packet.left_closest_world_intersection and  packet.left_closest_world_intersection.world_point and packet.left_closest_world_intersection.world_point.y is not None else 0 };\
-{packet.left_closest_world_intersection.world_point.z if packet.left_closest_world_intersection and  packet.left_closest_world_intersection.world_point and packet.left_closest_world_intersection.world_point.z is not None else 0 };\
-{1 if packet.right_closest_world_intersection is not None else 0 };\
-{packet.right_closest_world_intersection.world_point.x if packet.right_closest_world_intersection and  packet.right_closest_world_intersection.world_point and packet.right_closest_world_intersection.world_point.x is not None else 0 };\
-{packet.right_closest_world_intersection.world_point.y if packet.right_closest_world_intersection and  packet.right_closest_world_intersection.world_point and packet.right_closest_world_intersection.world_point.y is not None else 0 };\
-{packet.right_closest_world_intersection.world_point.z if packet.right_closest_world_intersection and  packet.right_closest_world_intersection.world_point and packet.right_closest_world_intersection.world_point.z is not None else 0 };\
-{packet.left_closest_world_intersection.object_name if packet.left_closest_world_intersection and packet.left_closest_world_intersection.object_name is not None else "" };\
-{packet.right_closest_world_intersection.object_name if packet.right_closest_world_intersection and packet.right_closest_world_intersection.object_name is not None else "" }'
-        return data
+        """Serialize the SEP_DX fields of a packet (see SEP_DX_FIELDS)."""
+        return _serialize_sep_dx(packet)
     
     def connect(self):
         try:
             self.client = UDPClient("0.0.0.0", self.port, timeout=50.0)        
             # Connect client to start receiving packets.
             self.client.connect()
+            if self.simulated_rate_hz:
+                from simulators import SEPPacketGenerator
+
+                # Feed our own port with generated sepd packets
+                self.generator = SEPPacketGenerator(self.port, self.simulated_rate_hz)
+                self.generator.start()
             self.running = True
             self._notify_status_change(True)
-            self._notify_message(f"SmartEye: Listening on port {self.port}", "Success")
+            self._notify_message(f"SmartEye: Listening on port {self.port}" + (" (simulated)" if self.generator else ""), "Success")
             return f"Listening for SEP on port {self.port}"
         except Exception as e:
             self._notify_status_change(False)
@@ -750,12 +771,7 @@ class SEListener(Sensor):
         try:
             while self.running == True:
                 packet = self.client.receive()
-                se_data = self.prepare_data(packet)
-                data = f"E;1;SEP;1;;;;SEP_DX;{se_data}\r\n"
-                #print(data)
-                if self.stream:
-                    self.stream.send(data.encode())
-                    #time.sleep(0.1)  # Slight delay to prevent CPU overload
+                self.handle_packet(packet, time.perf_counter_ns())
         except EndOfStreamError:
             logging.info("Remote end closed the stream, shutting down.")
         except TimeoutError:
@@ -768,6 +784,44 @@ class SEListener(Sensor):
             if self.client is not None:
                 self.client.disconnect()
     
+    async def run(self):
+        """Receive SEP packets on the shared event loop (see sensor_runtime.py)."""
+        loop = asyncio.get_running_loop()
+        try:
+            transport, protocol = await loop.create_datagram_endpoint(lambda: _SEPProtocol(self), local_addr=("0.0.0.0", self.port))
+        except OSError as e:
+            self._notify_status_change(False)
+            self._notify_message(f"SmartEye: Error connecting to port {self.port} - {e}", "Error")
+            return
+        try:
+            if self.simulated_rate_hz:
+                from simulators import SEPPacketGenerator
+
+                self.generator = SEPPacketGenerator(self.port, self.simulated_rate_hz)
+                self.generator.start()
+            self.running = True
+            self._notify_status_change(True)
+            self._notify_message(f"SmartEye: Listening on port {self.port}" + (" (simulated)" if self.generator else ""), "Success")
+            while not protocol.closed.done():
+                protocol.activity.clear()
+                try:
+                    await asyncio.wait_for(protocol.activity.wait(), self.receive_timeout_s)
+                except asyncio.TimeoutError:
+                    self._notify_message(f"SmartEye: No packets for {self.receive_timeout_s:.0f} s", "Error")
+                    return
+        finally:
+            transport.close()
+            if self.generator is not None:
+                self.generator.stop()
+                self.generator = None
+    
+    def handle_packet(self, packet, t_received):
+        """Send one packet that arrived at perf_counter_ns() t_received to the stream."""
+        if self.stream:
+            values = _extract_sep_dx(packet)
+            self._record_parse_latency(t_received)
+            self.stream.send_sample("SEP_DX", values, t_received, self.latency)
+    
     def test(self):
         try:
             while self.running == True:
@@ -778,6 +832,10 @@ class SEListener(Sensor):
     
     def stop(self):
         self.running = False
+        self._cancel_run()
+        if self.generator is not None:
+            self.generator.stop()
+            self.generator = None
         # Close the client connection
         if self.client is not None:
             try:
@@ -792,6 +850,31 @@ class SEListener(Sensor):
     def status(self):
         return self.running
 
+class _SEPProtocol(asyncio.DatagramProtocol):
+    """Parse each datagram as one SEP packet and hand it to the listener."""
+
+    def __init__(self, listener):
+        self.listener = listener
+        self.parser = Parser()
+        self.closed = asyncio.get_running_loop().create_future()
+        # Set on every datagram; run() uses it as an idle watchdog
+        self.activity = asyncio.Event()
+
+    def datagram_received(self, data, addr):
+        t_received = time.perf_counter_ns()
+        self.activity.set()
+        try:
+            packet = self.parser.parse_packet(data)
+        except Exception as e:
+            logging.warning(f"SmartEye: dropped malformed packet from {addr}: {e}")
+            return
+        self.listener.handle_packet(packet, t_received)
+
+    def connection_lost(self, exc):
+        if not self.closed.done():
+            self.closed.set_result(exc)
+        self.activity.set()
+
 if __name__ == "__main__":
     smarteye = SEListener(port=8089)
     smarteye.connect()
@@ -0,0 +1,49 @@
+"""Shared fixtures of the test suite."""
+import socket
+import threading
+
+import pytest
+
+
+class RecordingStream:
+    """Stand-in for IMotionsStream that keeps the samples a listener sends."""
+
+    def __init__(self):
+        self.samples = []
+        self.received = threading.Event()
+
+    def send_sample(self, sample_id, values, t_received=None, latency=None, instance=""):
+        self.samples.append((sample_id, instance, tuple(values)))
+        self.received.set()
+        return True
+
+    def send_samples(self, sample_id, rows, t_received=None, latency=None, instance=""):
+        for values in rows:
+            self.send_sample(sample_id, values, t_received, latency, instance)
+        return True
+
+
+class FakeSocket:
+    """Socket that keeps every write; type is SOCK_STREAM or SOCK_DGRAM."""
+
+    def __init__(self, type=socket.SOCK_STREAM, error=None):
+        self.type = type
+        self.error = error
+        self.writes = []
+        self.written = threading.Event()
+
+    def sendall(self, data):
+        if self.error is not None:
+            raise self.error
+        self.writes.append(bytes(data))
+        self.written.set()
+
+    send = sendall
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def stream():
+    return RecordingStream()
@@ -0,0 +1,29 @@
+import os
+import sys
+
+BENCHMARKS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "benchmarks")
+sys.path.insert(0, BENCHMARKS)
+
+from harness import BenchmarkResult, load_results, regressions, save_results  # noqa: E402
+import run_benchmarks  # noqa: E402
+
+
+def test_regressions_against_a_saved_baseline(tmp_path):
+    path = str(tmp_path / "baseline.json")
+    save_results([BenchmarkResult("a", 100.0, 0, 0.0), BenchmarkResult("b", 100.0, 0, 0.0)], path)
+    baseline = load_results(path)
+    results = [BenchmarkResult("a", 119.0, 0, 0.0), BenchmarkResult("b", 121.0, 0, 0.0),
+               BenchmarkResult("new", 1e6, 0, 0.0)]
+    assert [result.name for result in regressions(results, baseline, 0.2)] == ["b"]
+
+
+def test_every_case_runs():
+    cases = run_benchmarks.collect_cases()
+    assert cases
+    for name, function, args in cases:
+        function(*args)
+
+
+def test_keyword_selects_cases():
+    names = [name for name, _, _ in run_benchmarks.collect_cases("kalman")]
+    assert names and all("kalman" in name.lower() for name in names)
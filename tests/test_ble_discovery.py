@@ -0,0 +1,60 @@
+from types import SimpleNamespace
+
+from ble_discovery import BLEDiscovery, DeviceCache
+
+
+def device(address, name="Polar H10 1234"):
+    return SimpleNamespace(address=address, name=name)
+
+
+def advertisement(name="", rssi=-60):
+    return SimpleNamespace(local_name=name, rssi=rssi)
+
+
+def test_cache_round_trip(tmp_path):
+    path = str(tmp_path / "devices.json")
+    cache = DeviceCache(path)
+    assert cache.update("H10", "AA:BB", "Polar H10", rssi=-50)
+    assert not cache.update("H10", "AA:BB")
+    cache.save()
+    entry = DeviceCache(path).get("H10")
+    assert (entry["address"], entry["name"], entry["rssi"]) == ("AA:BB", "Polar H10", -50)
+
+
+def test_unreadable_cache_is_ignored(tmp_path):
+    path = tmp_path / "devices.json"
+    path.write_text("{not json")
+    assert DeviceCache(str(path)).entries == {}
+
+
+def test_known_target_order(tmp_path):
+    discovery = BLEDiscovery(str(tmp_path / "devices.json"))
+    assert discovery.known_target("H10") is None
+    discovery.cache.update("H10", "CA:CH:ED")
+    assert discovery.known_target("H10") == "CA:CH:ED"
+    assert discovery.known_target("H10", "CO:NF:IG") == "CO:NF:IG"
+    # A recent sighting of the cached address beats the bare configured address
+    cached = device("ca:ch:ed")
+    discovery._on_advertisement(cached, advertisement())
+    assert discovery.known_target("H10", "CO:NF:IG") is cached
+    configured = device("CO:NF:IG")
+    discovery._on_advertisement(configured, advertisement())
+    assert discovery.known_target("H10", "CO:NF:IG") is configured
+    discovery.forget("co:nf:ig")
+    assert discovery.known_target("H10", "CO:NF:IG") is cached
+
+
+def test_stale_sighting_is_not_used(tmp_path):
+    discovery = BLEDiscovery(str(tmp_path / "devices.json"), warm_max_age_s=0.0)
+    discovery._on_advertisement(device("AA:BB"), advertisement())
+    discovery._seen["AA:BB"] = (discovery._seen["AA:BB"][0], discovery._seen["AA:BB"][1] - 1.0)
+    assert discovery.warm_device("AA:BB") is None
+
+
+def test_background_sighting_fills_the_cache(tmp_path):
+    path = str(tmp_path / "devices.json")
+    discovery = BLEDiscovery(path)
+    discovery.register("H10", lambda name: "polar" in name.lower())
+    discovery._on_advertisement(device("11:22", None), advertisement("Garmin"))
+    discovery._on_advertisement(device("AA:BB", None), advertisement("Polar H10"))
+    assert DeviceCache(path).get("H10")["address"] == "AA:BB"
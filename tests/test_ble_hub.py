@@ -0,0 +1,27 @@
+import threading
+import time
+
+from ble_hub import BLEHub
+
+
+def test_hub_streams_every_device_and_reports_status_once(stream):
+    hub = BLEHub([("H10", "SIM:01", "P1"), ("H10", "SIM:02", "P2")], stream, simulated_rate_hz=20)
+    statuses = []
+    hub.register_status_callback(statuses.append)
+    thread = threading.Thread(target=hub.start, daemon=True)
+    thread.start()
+    deadline = time.monotonic() + 3.0
+    while {instance for _, instance, _ in stream.samples} != {"P1", "P2"} and time.monotonic() < deadline:
+        time.sleep(0.01)
+    hub.stop()
+    thread.join(2.0)
+    assert not thread.is_alive()
+    assert {instance for _, instance, _ in stream.samples} == {"P1", "P2"}
+    assert statuses == [True, False]
+    assert all(stats["samples_sent"] > 0 for stats in hub.stats().values())
+
+
+def test_device_retry_delay_is_separate_from_the_hub_backoff():
+    hub = BLEHub([("H10", "SIM:01", "P1")], None, reconnect_delay_s=2.5)
+    assert hub.reconnect_delay_s == 2.5
+    assert hub.reconnect_initial_s == 0.5
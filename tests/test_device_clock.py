@@ -0,0 +1,60 @@
+import random
+
+from device_clock import DEVICE_WRAP_US, DeviceClock
+
+OFFSET_NS = 5_000_000_000_000
+DELAY_NS = 1_000_000
+
+
+def test_constant_delay_maps_onto_the_arrival_time():
+    clock = DeviceClock()
+    for device_us in range(0, 1_000_000, 10_000):
+        t_received = OFFSET_NS + device_us * 1000 + DELAY_NS
+        assert clock.to_host(device_us, t_received) == t_received
+
+
+def test_envelope_follows_a_skewed_clock_through_jitter():
+    rng = random.Random(11)
+    clock = DeviceClock(window=128)
+    errors = []
+    for n in range(2000):
+        device_us = n * 20_000
+        t_true = OFFSET_NS + int(device_us * 1000 * 1.001)
+        t_received = t_true + DELAY_NS + rng.randrange(0, 5_000_000)
+        estimate = clock.to_host(device_us, t_received)
+        if clock.due:
+            clock.refit()
+        if n >= 100:
+            errors.append(abs(estimate - (t_true + DELAY_NS)))
+    errors.sort()
+    # Raw arrival times are off by 2.5 ms on average; the envelope by well under one
+    assert errors[int(len(errors) * 0.95)] < 500_000
+    # ns of offset per us of device time
+    assert abs(clock.skew - 1.0) < 0.1
+
+
+def test_counter_wrap_keeps_the_mapping_continuous():
+    clock = DeviceClock()
+    before = DEVICE_WRAP_US - 1000
+    t_before = clock.to_host(before, OFFSET_NS)
+    after = clock.to_host(1000, OFFSET_NS + 2_000_000)
+    assert after - t_before == 2_000_000
+
+
+def test_small_backward_step_restarts_the_estimate():
+    clock = DeviceClock()
+    for device_us in range(10_000_000, 11_000_000, 100_000):
+        clock.to_host(device_us, OFFSET_NS + device_us * 1000)
+    clock.refit()
+    # The device restarted: its counter is back near zero, and the old offset no longer holds
+    t_received = OFFSET_NS + 20_000_000_000
+    assert clock.to_host(0, t_received) == t_received
+
+
+def test_refit_is_due_every_quarter_window():
+    clock = DeviceClock(window=8)
+    for device_us in range(2):
+        clock.to_host(device_us, OFFSET_NS)
+    assert clock.pending == 2 and clock.due
+    clock.refit()
+    assert clock.pending == 0 and not clock.due
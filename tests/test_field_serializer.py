@@ -0,0 +1,33 @@
+from types import SimpleNamespace
+
+from field_serializer import compile_extractor, compile_serializer
+
+FIELDS = [("a", 0), ("b.x", -1), ("b.y", -1), ("c?", None), ("b?", None)]
+
+
+def test_values_and_defaults():
+    extract = compile_extractor(FIELDS)
+    assert extract(SimpleNamespace(a=1, b=SimpleNamespace(x=2, y=None), c=None)) == (1, 2, -1, 0, 1)
+    assert extract(SimpleNamespace(a=None, b=None, c="here")) == (0, -1, -1, 1, 0)
+
+
+def test_serializer_joins_the_extracted_values():
+    extract = compile_extractor(FIELDS)
+    serialize = compile_serializer(FIELDS, separator=",")
+    obj = SimpleNamespace(a=1.5, b=SimpleNamespace(x="s", y=3), c=0)
+    assert serialize(obj) == ",".join(map(str, extract(obj)))
+
+
+def test_shared_prefix_is_read_once():
+    class Counting:
+        reads = 0
+
+        @property
+        def b(self):
+            Counting.reads += 1
+            return SimpleNamespace(x=1, y=2)
+
+    obj = Counting()
+    obj.a = obj.c = 0
+    compile_extractor(FIELDS)(obj)
+    assert Counting.reads == 1
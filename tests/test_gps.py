@@ -0,0 +1,76 @@
+import pytest
+
+from gps import GPSListener
+from gps_kalman import GPSKalmanFilter
+from nmea import KNOTS_TO_MPS, checksum
+from utils import haversine_distance
+
+
+def sentence(text):
+    body = text.encode("ascii")
+    return b"$%s*%02X\r\n" % (body, checksum(body))
+
+
+def gga(utc, lat="4807.000", lon="01131.000"):
+    return sentence(f"GPGGA,{utc},{lat},N,{lon},E,1,08,0.9,545.4,M,46.9,M,,")
+
+
+def rmc(utc, knots, lat="4807.000", lon="01131.000"):
+    return sentence(f"GPRMC,{utc},A,{lat},N,{lon},E,{knots},090.0,230394,,")
+
+
+def feed(listener, *lines):
+    for line in lines:
+        listener.process_line(line, 0)
+
+
+def test_receiver_speed_is_sent_with_its_fix(stream):
+    listener = GPSListener(None, stream)
+    # The speed of the first epoch is differenced against nothing; the second gives the first acceleration
+    feed(listener, gga("120000"), rmc("120000", 10.0), gga("120001", lon="01131.010"), rmc("120001", 12.0),
+         gga("120002", lon="01131.020"), rmc("120002", 14.0))
+    [(sample_id, _, values)] = stream.samples
+    assert sample_id == "GPS"
+    raw_time, satellites, lat, lon, altitude, speed, acceleration = values
+    assert (raw_time, satellites, altitude) == ("120002", 8, 545.4)
+    assert speed == pytest.approx(14.0 * KNOTS_TO_MPS)
+    assert acceleration == pytest.approx(2.0 * KNOTS_TO_MPS)
+
+
+def test_speed_is_differenced_without_rmc(stream):
+    listener = GPSListener(None, stream)
+    feed(listener, gga("120000"), gga("120001", lon="01131.010"), gga("120002", lon="01131.020"))
+    [(_, _, values)] = stream.samples
+    distance = haversine_distance(48 + 7.0 / 60, 11 + 31.010 / 60, 48 + 7.0 / 60, 11 + 31.020 / 60)
+    assert values[5] == pytest.approx(distance)
+
+
+def test_rmc_before_gga_of_the_same_epoch(stream):
+    listener = GPSListener(None, stream)
+    feed(listener, gga("120000"), rmc("120000", 10.0))
+    feed(listener, rmc("120001", 10.0), gga("120001"), rmc("120002", 11.0), gga("120002"))
+    [(_, _, values)] = stream.samples
+    assert values[5:] == pytest.approx((11.0 * KNOTS_TO_MPS, 1.0 * KNOTS_TO_MPS))
+
+
+def test_fix_after_midnight_follows_the_one_before(stream):
+    listener = GPSListener(None, stream)
+    feed(listener, gga("235959"), gga("000000", lon="01131.010"), gga("000001", lon="01131.020"))
+    assert len(stream.samples) == 1
+
+
+def test_kalman_smoothed_fixes_are_sent(stream):
+    listener = GPSListener(None, stream, kalman=GPSKalmanFilter())
+    feed(listener, gga("120000"), rmc("120000", 10.0), gga("120001"), rmc("120001", 10.0))
+    [(_, _, values)] = stream.samples
+    assert values[5] == pytest.approx(10.0 * KNOTS_TO_MPS, rel=0.2)
+
+
+def test_send_errors_do_not_stop_the_listener():
+    class FailingStream:
+        def send_sample(self, *args):
+            raise RuntimeError("queue gone")
+
+    listener = GPSListener(None, FailingStream())
+    feed(listener, gga("120000"), gga("120001"), gga("120002"))
+    assert listener.previous_time == 12 * 3600 + 2
@@ -0,0 +1,47 @@
+import math
+
+import pytest
+
+from gps_kalman import EARTH_RADIUS_M, GPSKalmanFilter
+
+M_PER_DEG = EARTH_RADIUS_M * math.pi / 180.0
+
+
+def drive_east(kalman, seconds, speed=10.0, with_speed=True, start=0.0):
+    result = None
+    for t in range(seconds + 1):
+        lon = speed * t / (M_PER_DEG * math.cos(math.radians(48.0)))
+        args = (speed, 90.0) if with_speed else ()
+        result = kalman.update(start + t, 48.0, 11.0 + lon, 1.0, *args)
+    return result
+
+
+def test_first_fix_and_repeated_time():
+    kalman = GPSKalmanFilter()
+    assert kalman.update(100.0, 48.0, 11.0) is None
+    assert kalman.update(100.0, 48.0, 11.0) is None
+    assert kalman.update(101.0, 48.0, 11.0)[3] == 0.0
+
+
+def test_constant_velocity_is_tracked():
+    lat, lon, speed, acceleration = drive_east(GPSKalmanFilter(), 20)
+    assert speed == pytest.approx(10.0, abs=0.2)
+    assert acceleration == pytest.approx(0.0, abs=0.2)
+    assert lat == pytest.approx(48.0, abs=1e-5)
+
+
+def test_velocity_is_learned_from_positions_alone():
+    _, _, speed, _ = drive_east(GPSKalmanFilter(), 30, with_speed=False)
+    assert speed == pytest.approx(10.0, abs=0.5)
+
+
+def test_gap_restarts_the_filter():
+    kalman = GPSKalmanFilter(max_gap_s=5.0)
+    drive_east(kalman, 5)
+    assert kalman.update(100.0, 48.0, 11.0) is None
+
+
+def test_time_wraps_at_midnight():
+    kalman = GPSKalmanFilter()
+    kalman.update(86399.0, 48.0, 11.0, 1.0, 0.0, 0.0)
+    assert kalman.update(0.0, 48.0, 11.0, 1.0, 0.0, 0.0) is not None
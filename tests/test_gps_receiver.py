@@ -0,0 +1,64 @@
+from gps_receiver import (configure_receiver, detect_baud, pmtk_set_baud, pmtk_set_rate, required_baud, ubx_set_baud,
+                          ubx_set_rate)
+
+GGA_LINE = b"$GPGGA,123519,4807.038,N,01131.000,E,1,08,0.9,545.4,M,46.9,M,,*47\r\n"
+
+
+class FakeReceiver:
+    """Port whose receiver talks NMEA at one baud rate and noise at any other."""
+
+    def __init__(self, talking, baudrate=9600, commands=None):
+        self.talking = talking
+        self.baudrate = baudrate
+        self.timeout = 1.0
+        self.commands = commands or {}
+        self.written = []
+
+    in_waiting = 0
+
+    def read(self, size=1):
+        return GGA_LINE if self.baudrate == self.talking else b"\xff"
+
+    def write(self, data):
+        self.written.append(data)
+        self.talking = self.commands.get(data, self.talking)
+
+    def reset_input_buffer(self):
+        pass
+
+    def flush(self):
+        pass
+
+
+def test_ubx_frames():
+    # UBX-CFG-RATE at 5 Hz as listed in the u-blox protocol description
+    assert ubx_set_rate(5) == bytes.fromhex("b562060806 00c800010001 00de6a".replace(" ", ""))
+    assert len(ubx_set_baud(115200)) == 8 + 20
+
+
+def test_pmtk_sentences():
+    assert pmtk_set_baud(115200) == b"$PMTK251,115200*1F\r\n"
+    assert pmtk_set_rate(5) == b"$PMTK220,200*2C\r\n"
+
+
+def test_required_baud():
+    assert required_baud(1) < 9600 < required_baud(5) == 30000
+
+
+def test_detect_baud():
+    receiver = FakeReceiver(talking=38400)
+    assert detect_baud(receiver, (9600, 38400), listen_s=0.05) == 38400
+    assert receiver.timeout == 1.0
+    assert detect_baud(FakeReceiver(talking=None), (9600, 38400), listen_s=0.05) is None
+
+
+def test_configure_switches_baud_and_rate():
+    receiver = FakeReceiver(talking=9600, commands={ubx_set_baud(115200): 115200})
+    assert configure_receiver(receiver, "ubx", 115200, 10) == 115200
+    assert receiver.written == [ubx_set_baud(115200), ubx_set_rate(10)]
+
+
+def test_configure_stays_when_the_receiver_does_not_switch():
+    receiver = FakeReceiver(talking=9600)
+    assert configure_receiver(receiver, "pmtk", 9600, 5) == 9600
+    assert receiver.written == [pmtk_set_rate(5)]
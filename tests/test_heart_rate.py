@@ -0,0 +1,78 @@
+import random
+
+import pytest
+
+from heart_rate import RR_ALL, RR_LAST, decode_heart_rate, decode_heart_rate_batch, rr_samples
+from hrv import NO_HRV, HRVEngine
+from rr_filter import NO_FILTER, RRArtifactFilter
+from simulators import heart_rate_measurement
+
+
+def test_uint8_heart_rate_without_rr():
+    assert decode_heart_rate(bytes([0x00, 72])) == (72, None, [])
+
+
+def test_uint16_heart_rate():
+    assert decode_heart_rate(bytes([0x01, 0x2C, 0x01])) == (300, None, [])
+
+
+def test_energy_and_rr_intervals():
+    data = heart_rate_measurement(65, rr_intervals=[1.0, 0.5], energy_expended=120)
+    assert decode_heart_rate(data) == (65, 120, [1.0, 0.5])
+
+
+@pytest.mark.parametrize("data, decoded", [
+    # Energy expended flagged but cut short: the heart rate is kept
+    ("5ea3", (163, None, [])),
+    ("3808", (8, None, [])),
+    ("1848", (72, None, [])),
+    # An odd trailing byte of an RR interval is ignored
+    ("104800040c", (72, None, [1.0])),
+])
+def test_truncated_notifications_keep_the_heart_rate(data, decoded):
+    assert decode_heart_rate(bytes.fromhex(data)) == decoded
+
+
+@pytest.mark.parametrize("data", ["", "00", "01ff"])
+def test_too_short_for_the_heart_rate(data):
+    assert decode_heart_rate(bytes.fromhex(data)) is None
+
+
+def test_batch_decoder_matches_the_single_decoder():
+    np = pytest.importorskip("numpy")
+    rng = random.Random(3)
+    notifications = [bytes(rng.randrange(256) for _ in range(rng.randrange(0, 12))) for _ in range(2000)]
+    notifications.append(heart_rate_measurement(65, rr_intervals=[1.0, 0.5], energy_expended=120))
+    batch = decode_heart_rate_batch(notifications)
+    rr_at = 0
+    for i, data in enumerate(notifications):
+        decoded = decode_heart_rate(data)
+        if decoded is None:
+            assert batch["hr"][i] == -1
+            continue
+        hr, energy, rr = decoded
+        assert batch["hr"][i] == hr
+        assert (np.isnan(batch["energy_expended"][i]) if energy is None else batch["energy_expended"][i] == energy)
+        assert list(batch["rr"][rr_at:rr_at + len(rr)]) == rr
+        assert list(batch["rr_notification"][rr_at:rr_at + len(rr)]) == [i] * len(rr)
+        rr_at += len(rr)
+    assert rr_at == len(batch["rr"])
+
+
+def test_rr_samples_without_intervals():
+    assert rr_samples(70, [], 1000.0) == [(70, 0, 1000.0) + NO_HRV + NO_FILTER]
+
+
+def test_rr_all_back_computes_the_beat_times():
+    samples = rr_samples(70, [0.75, 1.0, 0.5], 1000.0, rr_mode=RR_ALL)
+    assert [(rr, beat_time) for _, rr, beat_time, *_ in samples] == [(0.75, 998.5), (1.0, 999.5), (0.5, 1000.0)]
+
+
+def test_rr_last_sends_one_sample_with_every_beat_fed():
+    hrv = HRVEngine()
+    [sample] = rr_samples(70, [0.75, 1.0, 0.5], 1000.0, rr_mode=RR_LAST, hrv=hrv, rr_filter=RRArtifactFilter())
+    assert len(sample) == 9
+    assert sample[:3] == (70, 0.5, 1000.0)
+    assert len(hrv) == 3
+    assert sample[3:7] == hrv.features()
+    assert sample[7:] == (0.5, 0)
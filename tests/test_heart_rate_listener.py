@@ -0,0 +1,95 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+import heart_rate_listener
+from ble_discovery import BLEDiscovery
+from h10 import H10Listener
+from sensor_runtime import SensorRuntime
+
+
+class FakeClient:
+    """BleakClient stand-in recording connects; addresses in failing refuse."""
+
+    log = []
+    failing = set()
+
+    def __init__(self, device, disconnected_callback=None, timeout=10.0):
+        self.device = device
+        self.is_connected = False
+
+    async def __aenter__(self):
+        address = getattr(self.device, "address", self.device)
+        FakeClient.log.append(("connect", address))
+        if address in FakeClient.failing:
+            raise OSError("not found")
+        self.is_connected = True
+        return self
+
+    async def __aexit__(self, *exc):
+        self.is_connected = False
+
+    async def start_notify(self, char_uuid, callback):
+        pass
+
+    async def stop_notify(self, char_uuid):
+        pass
+
+
+@pytest.fixture
+def listener(tmp_path, monkeypatch):
+    FakeClient.log = []
+    FakeClient.failing = set()
+    monkeypatch.setattr(heart_rate_listener, "BleakClient", FakeClient)
+    discovery = BLEDiscovery(str(tmp_path / "devices.json"))
+
+    async def find(key, matcher):
+        FakeClient.log.append(("scan", key))
+        return SimpleNamespace(address="NE:W0", name="Polar H10")
+
+    discovery.find = find
+    discovery.cache.update("H10", "CA:CH:ED")
+    return H10Listener(None, discovery=discovery)
+
+
+def run_once(listener):
+    async def once():
+        task = asyncio.create_task(listener.run())
+        await asyncio.sleep(0.05)
+        listener._wake()
+        await task
+
+    asyncio.run(once())
+    log, FakeClient.log = FakeClient.log, []
+    return log
+
+
+def test_known_address_is_connected_without_a_scan(listener):
+    assert run_once(listener) == [("connect", "CA:CH:ED")]
+    assert run_once(listener) == [("connect", "CA:CH:ED")]
+
+
+def test_scan_only_after_the_direct_connect_fails(listener):
+    FakeClient.failing = {"CA:CH:ED"}
+    assert run_once(listener) == [("connect", "CA:CH:ED"), ("scan", "H10"), ("connect", "NE:W0")]
+    # The device found by the scan is reused
+    assert run_once(listener) == [("connect", "NE:W0")]
+
+
+def test_simulated_listener_streams_and_stops(stream):
+    h10 = H10Listener(stream, simulated_rate_hz=20, hrv_window_s=30, artifact_threshold=0.2)
+    runtime = SensorRuntime()
+    runtime.start()
+    try:
+        runtime.run(h10)
+        assert stream.received.wait(3.0)
+        t_stop = time.monotonic()
+        h10.stop()
+        assert time.monotonic() - t_stop < 1.0
+    finally:
+        runtime.stop()
+    sample_id, _, values = stream.samples[0]
+    assert sample_id == "H10"
+    assert len(values) == 9
@@ -0,0 +1,49 @@
+import math
+import random
+
+import pytest
+
+from hrv import NO_HRV, HRVEngine
+
+
+def direct(rr):
+    n = len(rr)
+    mean = sum(rr) / n
+    sdnn = math.sqrt(sum((x - mean) ** 2 for x in rr) / (n - 1))
+    diffs = [b - a for a, b in zip(rr, rr[1:])]
+    rmssd = math.sqrt(sum(d * d for d in diffs) / len(diffs))
+    pnn50 = 100.0 * sum(abs(d) > 0.05 for d in diffs) / len(diffs)
+    return rmssd * 1000.0, sdnn * 1000.0, pnn50, 60.0 / mean
+
+
+def test_fewer_than_two_beats():
+    hrv = HRVEngine()
+    assert hrv.features() == NO_HRV
+    hrv.add(0.8)
+    assert hrv.features() == NO_HRV
+
+
+def test_matches_a_direct_computation_over_the_window():
+    rng = random.Random(5)
+    hrv = HRVEngine(window_s=10.0)
+    beats = []
+    for _ in range(500):
+        rr = rng.randrange(600, 1200) / 1024.0
+        hrv.add(rr)
+        beats.append(rr)
+        while sum(beats) > 10.0:
+            beats.pop(0)
+        assert len(hrv) == len(beats)
+        if len(beats) >= 2:
+            assert hrv.features() == pytest.approx(direct(beats), abs=0.051)
+
+
+def test_invalid_intervals_are_ignored_and_reset_empties():
+    hrv = HRVEngine()
+    hrv.add(0.0)
+    hrv.add(-1.0)
+    assert len(hrv) == 0
+    hrv.add(0.8)
+    hrv.add(0.9)
+    hrv.reset()
+    assert hrv.features() == NO_HRV
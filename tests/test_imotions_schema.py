@@ -0,0 +1,46 @@
+import pytest
+
+from imotions_schema import get_batch_encoder, get_encoder, get_schema, parse_schema_file, SCHEMA_DIR
+
+SOURCE = """<EventSource Id="Test" Version="3" Name="Test">
+  <Sample Id="Pair">
+    <Field Id="left" />
+    <Field Id="right" />
+  </Sample>
+</EventSource>
+"""
+
+
+@pytest.fixture
+def schema_dir(tmp_path):
+    (tmp_path / "API_TEST.xml").write_text(SOURCE)
+    return str(tmp_path)
+
+
+def test_parse_schema_file(schema_dir):
+    [schema] = parse_schema_file(f"{schema_dir}/API_TEST.xml")
+    assert (schema.source_id, schema.source_version, schema.sample_id) == ("Test", "3", "Pair")
+    assert schema.fields == ("left", "right")
+
+
+def test_unknown_sample(schema_dir):
+    with pytest.raises(KeyError):
+        get_schema("Missing", schema_dir)
+
+
+def test_encoder_header_and_instance(schema_dir):
+    assert get_encoder("Pair", schema_dir)((1, "x")) == b"E;1;Test;3;;;;Pair;1;x\r\n"
+    encode = get_encoder("Pair", schema_dir, instance="B")
+    assert encode((1, 2)) == b"E;1;Test;3;B;;;Pair;1;2\r\n"
+    assert encode.source == "Test/B"
+    assert get_batch_encoder("Pair", schema_dir)([(1, 2), (3, 4)]) == b"E;1;Test;3;;;;Pair;1;2\r\nE;1;Test;3;;;;Pair;3;4\r\n"
+
+
+def test_field_formats():
+    record = get_encoder("GPS")((1.0, 8, 48.1, 11.5, 545.4, 1.23456, 0.5))
+    assert record.endswith(b";1.23;0.50\r\n")
+
+
+@pytest.mark.parametrize("sample_id", ["H10", "Vivosmart5", "TriggerBox"])
+def test_changed_sources_carry_the_new_version(sample_id):
+    assert get_schema(sample_id, SCHEMA_DIR).source_version == "2"
@@ -0,0 +1,150 @@
+import socket
+import time
+
+import pytest
+
+from imotions_schema import get_encoder
+from imotions_stream import BLOCK, DROP_NEWEST, DROP_OLDEST, IMotionsStream
+from latency import LatencyStats
+from tests.conftest import FakeSocket
+
+
+def record(source, n):
+    return f"E;1;{source};1;;;;Sample;{n}\r\n".encode("ascii")
+
+
+def filled(policy, queue_size=2, **kwargs):
+    # running without a writer thread, so the queue only fills up
+    stream = IMotionsStream(FakeSocket(), queue_size=queue_size, overflow_policy=policy, **kwargs)
+    stream.running = True
+    return stream
+
+
+def test_unknown_overflow_policy_is_rejected():
+    with pytest.raises(ValueError):
+        IMotionsStream(FakeSocket(), overflow_policy="spill")
+
+
+def test_drop_newest_keeps_the_queued_records():
+    stream = filled(DROP_NEWEST)
+    assert stream.send(record("A", 1))
+    assert stream.send(record("A", 2))
+    assert not stream.send(record("B", 3))
+    assert [entry[2] for entry in stream._queue] == [record("A", 1), record("A", 2)]
+    assert stream.stats()["B"]["dropped"] == 1
+
+
+def test_drop_oldest_counts_the_drop_against_the_evicted_source():
+    stream = filled(DROP_OLDEST)
+    stream.send(record("A", 1))
+    stream.send(record("B", 2))
+    assert stream.send(record("B", 3))
+    assert [entry[2] for entry in stream._queue] == [record("B", 2), record("B", 3)]
+    stats = stream.stats()
+    assert stats["A"]["dropped"] == 1
+    assert stats["B"]["dropped"] == 0
+
+
+def test_block_gives_up_after_the_timeout():
+    stream = filled(BLOCK, queue_size=1, block_timeout=0.05)
+    stream.send(record("A", 1))
+    t_start = time.monotonic()
+    assert not stream.send(record("A", 2))
+    assert time.monotonic() - t_start >= 0.04
+    assert stream.stats()["A"]["dropped"] == 1
+
+
+def test_send_before_start_and_after_close_is_dropped():
+    stream = IMotionsStream(FakeSocket())
+    assert not stream.send(record("A", 1))
+    stream.start()
+    stream.close()
+    assert not stream.send(record("A", 2))
+    assert stream.stats()["A"] == {"queued": 0, "sent": 0, "dropped": 2, "failed": 0}
+
+
+def test_samples_are_encoded_by_the_writer_thread():
+    sock = FakeSocket()
+    stream = IMotionsStream(sock)
+    stream.start()
+    assert stream.send_sample("GPS", (1.0, 8, 48.1, 11.5, 545.4, 1.234, 0.5))
+    stream.close()
+    assert sock.writes == [get_encoder("GPS")((1.0, 8, 48.1, 11.5, 545.4, 1.234, 0.5))]
+    assert stream.stats()["USB_GPS"]["sent"] == 1
+
+
+def test_latency_stages_are_recorded_per_sample():
+    latency = LatencyStats("GPS")
+    stream = IMotionsStream(FakeSocket())
+    stream.start()
+    stream.send_sample("GPS", (1.0, 8, 48.1, 11.5, 545.4, 1.0, 0.0), time.perf_counter_ns(), latency)
+    stream.close()
+    snapshot = latency.snapshot()
+    assert set(snapshot) == {"queue", "format", "send", "total"}
+    assert snapshot["total"]["max_us"] >= snapshot["send"]["max_us"]
+
+
+def test_an_encoder_error_costs_only_its_record():
+    sock = FakeSocket()
+    stream = IMotionsStream(sock)
+    stream.start()
+    stream.send_sample("GPS", ("not", "enough"))
+    stream.send_sample("GPS", (1.0, 8, 48.1, 11.5, 545.4, 1.0, 0.0))
+    stream.close()
+    assert len(sock.writes) == 1
+    assert stream.stats()["USB_GPS"]["failed"] == 1
+    assert stream.stats()["USB_GPS"]["sent"] == 1
+
+
+def test_failed_writes_are_reported_once_and_still_recorded():
+    class Recorder:
+        def __init__(self):
+            self.records = []
+
+        def write(self, t_ns, source, data):
+            self.records.append((source, data))
+            return True
+
+    errors = []
+    recorder = Recorder()
+    stream = IMotionsStream(FakeSocket(error=OSError("gone")), recorder=recorder,
+                            error_callback=lambda message, level: errors.append(message))
+    stream.start()
+    stream.send(record("A", 1))
+    stream.send(record("A", 2))
+    stream.close()
+    assert stream.stats()["A"]["failed"] == 2
+    assert len(errors) == 1
+    assert recorder.records == [("A", record("A", 1)), ("A", record("A", 2))]
+
+
+def test_coalescing_writes_the_queued_records_at_once():
+    sock = FakeSocket()
+    stream = IMotionsStream(sock, coalesce=True, coalesce_max_bytes=1 << 20, coalesce_max_latency_ms=20)
+    stream.running = True
+    for n in range(5):
+        stream.send(record("A", n))
+    stream.running = False
+    stream.start()
+    stream.close()
+    assert sock.writes == [b"".join(record("A", n) for n in range(5))]
+
+
+def test_coalescing_is_off_for_udp():
+    stream = IMotionsStream(FakeSocket(type=socket.SOCK_DGRAM), coalesce=True)
+    assert not stream.coalesce
+
+
+def test_coalescing_deadline_runs_from_the_enqueue_time():
+    sock = FakeSocket()
+    stream = IMotionsStream(sock, coalesce=True, coalesce_max_bytes=1 << 20, coalesce_max_latency_ms=50)
+    stream.running = True
+    t_queued = time.monotonic()
+    stream.send(record("A", 1))
+    stream.running = False
+    time.sleep(0.04)
+    stream.start()
+    assert sock.written.wait(1.0)
+    # Held 40 ms before the writer saw it: written at 50 ms, not 90 ms
+    assert time.monotonic() - t_queued < 0.08
+    stream.close()
@@ -0,0 +1,43 @@
+import json
+import random
+
+from latency import LatencyHistogram, LatencyStats, _bucket, _bucket_upper, dump_latency
+
+
+def test_bucket_upper_bound_within_an_eighth():
+    for value in [0, 1, 15, 16, 17, 100, 1000, 123_456, 10 ** 9, 2 ** 40]:
+        upper = _bucket_upper(_bucket(value))
+        assert value <= upper <= max(value * 1.125, value)
+
+
+def test_buckets_are_monotonic():
+    values = list(range(0, 5000))
+    indexes = [_bucket(value) for value in values]
+    assert indexes == sorted(indexes)
+
+
+def test_percentiles():
+    rng = random.Random(1)
+    values = [rng.randrange(1_000, 1_000_000) for _ in range(10_000)]
+    histogram = LatencyHistogram()
+    for value in values:
+        histogram.record(value)
+    values.sort()
+    for p in (50, 90, 99):
+        exact = values[int(len(values) * p / 100) - 1]
+        assert exact <= histogram.percentile(p) <= exact * 1.125
+    assert histogram.percentile(100) == values[-1]
+
+
+def test_snapshot_and_dump(tmp_path):
+    stats = LatencyStats("GPS")
+    stats.record("total", 2_000)
+    snapshot = stats.snapshot()
+    assert list(snapshot) == ["total"]
+    assert snapshot["total"]["count"] == 1
+    path = tmp_path / "latency.jsonl"
+    dump_latency([stats], str(path))
+    dump_latency([stats], str(path))
+    lines = path.read_text().splitlines()
+    assert len(lines) == 2
+    assert json.loads(lines[0])["sources"]["GPS"]["total"]["max_us"] == 2.0
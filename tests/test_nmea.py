@@ -0,0 +1,91 @@
+import functools
+import operator
+import random
+
+import pytest
+
+from nmea import GGA, GSA, GSV, RMC, VTG, NMEAParser, checksum
+
+GGA_LINE = b"$GPGGA,123519,4807.038,N,01131.000,E,1,08,0.9,545.4,M,46.9,M,,*47\r\n"
+RMC_LINE = b"$GPRMC,123519,A,4807.038,N,01131.000,E,022.4,084.4,230394,003.1,W*6A\r\n"
+
+
+def sentence(body):
+    return b"$%s*%02X\r\n" % (body, checksum(body))
+
+
+def test_checksum_matches_a_bytewise_xor():
+    rng = random.Random(7)
+    for length in range(0, 100):
+        body = bytes(rng.randrange(32, 127) for _ in range(length))
+        assert checksum(body) == functools.reduce(operator.xor, body, 0)
+
+
+def test_gga():
+    gga = NMEAParser().parse(GGA_LINE)
+    assert isinstance(gga, GGA)
+    assert gga.talker == "GP"
+    assert gga.utc == 12 * 3600 + 35 * 60 + 19
+    assert gga.raw_time == "123519"
+    assert gga.latitude == pytest.approx(48 + 7.038 / 60)
+    assert gga.longitude == pytest.approx(11 + 31.0 / 60)
+    assert (gga.quality, gga.num_satellites, gga.hdop, gga.altitude) == (1, 8, 0.9, 545.4)
+
+
+def test_rmc():
+    rmc = NMEAParser().parse(RMC_LINE)
+    assert isinstance(rmc, RMC)
+    assert rmc.valid
+    assert (rmc.speed_knots, rmc.course, rmc.date) == (22.4, 84.4, "230394")
+
+
+def test_southern_and_western_hemispheres_are_negative():
+    gga = NMEAParser().parse(sentence(b"GNGGA,000000.50,3345.000,S,07030.000,W,1,10,1.0,10.0,M,,M,,"))
+    assert gga.talker == "GN"
+    assert gga.utc == 0.5
+    assert gga.latitude == pytest.approx(-33.75)
+    assert gga.longitude == pytest.approx(-70.5)
+
+
+def test_vtg_gsa_gsv():
+    parser = NMEAParser()
+    vtg = parser.parse(sentence(b"GPVTG,054.7,T,034.4,M,005.5,N,010.2,K"))
+    assert vtg == VTG("GP", 54.7, 5.5, 10.2)
+    gsa = parser.parse(sentence(b"GPGSA,A,3,04,05,,09,12,,,24,,,,,2.5,1.3,2.1"))
+    assert gsa == GSA("GP", "A", 3, (4, 5, 9, 12, 24), 2.5, 1.3, 2.1)
+    gsv = parser.parse(sentence(b"GPGSV,2,1,08,01,40,083,46,02,17,308,,12,07,344,39,14,22,228,45"))
+    assert isinstance(gsv, GSV)
+    assert gsv.satellites_in_view == 8
+    assert [satellite.prn for satellite in gsv.satellites] == [1, 2, 12, 14]
+    assert gsv.satellites[1].snr is None
+
+
+def test_lower_case_checksum_is_accepted():
+    assert NMEAParser().parse(GGA_LINE.replace(b"*47", b"*47".lower())) is not None
+    line = sentence(b"GPVTG,054.7,T,034.4,M,005.5,N,010.2,K").lower().replace(b"$gpvtg", b"$GPVTG")
+    assert NMEAParser().parse(line) is not None
+
+
+def test_invalid_sentences_are_counted():
+    parser = NMEAParser()
+    assert parser.parse(GGA_LINE.replace(b"*47", b"*48")) is None
+    assert parser.parse(sentence(b"GPZDA,201530.00,04,07,2002,00,00")) is None
+    assert parser.parse(b"$GPGGA,123519,4807.038\r\n") is None
+    assert parser.parse(sentence(b"GPGGA,123519,48x7.038,N,01131.000,E,1,08,0.9,545.4,M,46.9,M,,")) is None
+    assert (parser.checksum_errors, parser.unsupported, parser.malformed, parser.sentences) == (1, 1, 2, 0)
+
+
+def test_feed_joins_sentences_split_across_reads():
+    parser = NMEAParser()
+    data = GGA_LINE + RMC_LINE
+    assert parser.feed(data[:30]) == []
+    decoded = parser.feed(data[30:90]) + parser.feed(data[90:])
+    assert [type(s) for s in decoded] == [GGA, RMC]
+    assert parser.sentences == 2
+
+
+def test_feed_drops_noise_without_line_ends():
+    parser = NMEAParser(max_line=64)
+    assert parser.feed(b"\xff" * 100) == []
+    assert parser.malformed == 1
+    assert len(parser.feed(GGA_LINE)) == 1
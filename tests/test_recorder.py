@@ -0,0 +1,99 @@
+import argparse
+import os
+import socket
+import time
+
+import pytest
+
+from recorder import SessionRecorder, iter_segment, iter_session, session_segments
+from replay import SessionReplayer, parse_speed
+from tests.conftest import FakeSocket
+
+RECORDS = [(1_000_000_000 + n * 10_000_000, "AB" if n % 2 else "CD", f"E;1;X;1;;;;S;{n}\r\n".encode())
+           for n in range(20)]
+
+
+def record_session(directory, records=RECORDS, session="session_a", **kwargs):
+    recorder = SessionRecorder(str(directory), **kwargs)
+    recorder.session = session
+    recorder.open()
+    for record in records:
+        assert recorder.write(*record)
+    recorder.close()
+    return recorder
+
+
+def test_round_trip(tmp_path):
+    recorder = record_session(tmp_path)
+    assert recorder.records == len(RECORDS)
+    [segments] = session_segments(str(tmp_path))
+    assert [(t, s, bytes(p)) for t, s, p in iter_session(segments)] == RECORDS
+
+
+def test_rotated_segments_are_self_contained(tmp_path):
+    record_session(tmp_path, segment_mb=100 / (1024 * 1024))
+    [segments] = session_segments(str(tmp_path))
+    assert len(segments) > 1
+    # Every segment names its own sources, so each one replays on its own
+    for segment in segments:
+        assert all(source in ("AB", "CD") for _, source, _ in iter_segment(segment))
+    assert [bytes(p) for _, _, p in iter_session(segments)] == [p for _, _, p in RECORDS]
+
+
+def test_truncated_record_ends_the_segment(tmp_path):
+    record_session(tmp_path)
+    [[segment]] = session_segments(str(tmp_path))
+    with open(segment, "r+b") as f:
+        f.truncate(os.path.getsize(segment) - 3)
+    assert [bytes(p) for _, _, p in iter_segment(segment)] == [p for _, _, p in RECORDS[:-1]]
+
+
+def test_not_a_segment(tmp_path):
+    path = tmp_path / "other.imrec"
+    path.write_bytes(b"something else entirely")
+    with pytest.raises(ValueError):
+        list(iter_segment(str(path)))
+
+
+def test_write_after_close_is_dropped(tmp_path):
+    recorder = record_session(tmp_path, records=[])
+    assert not recorder.write(0, "AB", b"late")
+    assert recorder.dropped == 1
+
+
+def test_session_segments_groups_by_session(tmp_path):
+    for name in ("session_a_0001", "session_a_0002", "session_b_0001"):
+        (tmp_path / f"{name}.imrec").write_bytes(b"")
+    a1, a2, b1 = (str(tmp_path / f"{name}.imrec") for name in ("session_a_0001", "session_a_0002", "session_b_0001"))
+    assert session_segments(str(tmp_path)) == [[a1, a2], [b1]]
+    assert session_segments(str(tmp_path / "session_a")) == [[a1, a2]]
+    assert session_segments(a2) == [[a2]]
+
+
+def test_replay_sends_every_record(tmp_path):
+    record_session(tmp_path)
+    sock = FakeSocket(type=socket.SOCK_DGRAM)
+    replayer = SessionReplayer(sock, speed=None, sources=["AB"])
+    replayer.replay(str(tmp_path))
+    assert sock.writes == [p for _, s, p in RECORDS if s == "AB"]
+    assert replayer.records == len(sock.writes)
+
+
+def test_replay_paces_each_session_on_its_own_clock(tmp_path):
+    # Two sessions an hour apart still replay back to back
+    record_session(tmp_path, records=RECORDS[:2], session="session_a")
+    later = [(t + 3600 * 10 ** 9, s, p) for t, s, p in RECORDS[2:4]]
+    record_session(tmp_path, records=later, session="session_b")
+    sock = FakeSocket()
+    replayer = SessionReplayer(sock, speed=1.0)
+    t_start = time.monotonic()
+    replayer.replay(str(tmp_path))
+    assert time.monotonic() - t_start < 1.0
+    assert b"".join(sock.writes) == b"".join(p for _, _, p in RECORDS[:4])
+
+
+def test_parse_speed():
+    assert parse_speed("max") is None
+    assert parse_speed("2.5") == 2.5
+    with pytest.raises(argparse.ArgumentTypeError):
+        parse_speed("-1")
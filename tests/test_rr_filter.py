@@ -0,0 +1,36 @@
+from rr_filter import RRArtifactFilter
+
+
+def test_normal_beats_pass():
+    rr_filter = RRArtifactFilter()
+    assert [rr_filter.check(rr) for rr in (0.8, 0.82, 0.79, 0.81, 0.8, 0.83)] == [
+        (0.8, 0), (0.82, 0), (0.79, 0), (0.81, 0), (0.8, 0), (0.83, 0)]
+    assert rr_filter.corrected == 0
+
+
+def test_missed_beat_is_replaced_by_the_median():
+    rr_filter = RRArtifactFilter()
+    for rr in (0.8, 0.82, 0.79, 0.81, 0.8):
+        rr_filter.check(rr)
+    assert rr_filter.check(1.6) == (0.8, 1)
+    assert rr_filter.corrected == 1
+
+
+def test_first_beats_are_only_checked_against_the_bounds():
+    rr_filter = RRArtifactFilter(min_beats=5)
+    assert rr_filter.check(0.8) == (0.8, 0)
+    assert rr_filter.check(1.6) == (1.6, 0)
+    assert rr_filter.check(3.0) == (0.8, 1)
+
+
+def test_out_of_range_without_history_is_clamped():
+    assert RRArtifactFilter().check(0.1) == (0.25, 1)
+
+
+def test_a_real_change_of_rate_takes_over():
+    rr_filter = RRArtifactFilter(window=11)
+    for _ in range(11):
+        rr_filter.check(1.0)
+    results = [rr_filter.check(0.6) for _ in range(11)]
+    assert results[0] == (1.0, 1)
+    assert results[-1] == (0.6, 0)
@@ -0,0 +1,83 @@
+import asyncio
+import random
+
+from sensor import ConnectionStats, Sensor, backoff_delay
+
+
+class FlakySensor(Sensor):
+    """Connects, then loses the connection at once; stops itself after stop_after runs."""
+
+    def __init__(self, stop_after=3, fail=False):
+        super().__init__()
+        self.reconnect_initial_s = 0.001
+        self.stop_after = stop_after
+        self.fail = fail
+        self.runs = 0
+        self.messages = []
+        self.register_message_callback(lambda message, message_type: self.messages.append(message))
+
+    async def run(self):
+        self.runs += 1
+        if self.runs >= self.stop_after:
+            self.stop()
+            return
+        if self.fail:
+            raise OSError("no device")
+        self._notify_status_change(True)
+
+    def connect(self):
+        pass
+
+    def start(self):
+        pass
+
+    def stop(self):
+        self._stop_requested = True
+
+    def status(self):
+        return self.connected
+
+
+def test_backoff_delay_grows_and_is_capped():
+    random.seed(0)
+    for attempt, full in [(0, 0.5), (1, 1.0), (3, 4.0), (10, 30.0), (100, 30.0)]:
+        delay = backoff_delay(attempt, 0.5, 30.0)
+        assert full * 0.5 <= delay <= full
+    assert backoff_delay(4, 0.5, 30.0, jitter=0.0) == 8.0
+
+
+def test_connection_stats_gaps():
+    stats = ConnectionStats()
+    stats.recovered(1.0)
+    assert stats.recoveries == 0
+    stats.lost(10.0)
+    assert stats.snapshot(now=12.0)["down_s"] == 2.0
+    stats.recovered(13.5)
+    snapshot = stats.snapshot(now=20.0)
+    assert (snapshot["losses"], snapshot["recoveries"]) == (1, 1)
+    assert snapshot["last_recover_s"] == snapshot["max_recover_s"] == 3.5
+    assert snapshot["down_s"] == 0.0
+
+
+def test_supervise_reruns_until_stopped():
+    sensor = FlakySensor(stop_after=3)
+    asyncio.run(asyncio.wait_for(sensor.supervise(), 5))
+    assert sensor.runs == 3
+    assert sensor.connection_stats.attempts == 3
+    assert sensor.connection_stats.losses == 2
+    assert sensor.connection_stats.recoveries == 1
+
+
+def test_supervise_reports_errors_and_retries():
+    sensor = FlakySensor(stop_after=2, fail=True)
+    asyncio.run(asyncio.wait_for(sensor.supervise(), 5))
+    assert sensor.runs == 2
+    assert any("no device" in message for message in sensor.messages)
+    assert any("Reconnecting" in message for message in sensor.messages)
+
+
+def test_supervise_without_reconnect_runs_once():
+    sensor = FlakySensor(stop_after=3)
+    sensor.reconnect_enabled = False
+    asyncio.run(asyncio.wait_for(sensor.supervise(), 5))
+    assert sensor.runs == 1
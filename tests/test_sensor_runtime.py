@@ -0,0 +1,56 @@
+from gps import GPSListener
+from sensor_runtime import LineBuffer, SensorRuntime, read_available
+
+
+class BufferedSerial:
+    def __init__(self, data):
+        self.data = bytearray(data)
+        self.reads = 0
+
+    @property
+    def in_waiting(self):
+        return len(self.data)
+
+    def read(self, size=1):
+        self.reads += 1
+        chunk = bytes(self.data[:size])
+        del self.data[:size]
+        return chunk
+
+
+def test_line_buffer_keeps_the_time_of_the_first_byte():
+    lines = LineBuffer()
+    assert lines.feed(b"$GPG", 1) == []
+    assert lines.feed(b"GA\r\n$GPRMC\r\n$GP", 2) == [(b"$GPGGA\r\n", 1), (b"$GPRMC\r\n", 2)]
+    assert lines.feed(b"VTG\r\n", 3) == [(b"$GPVTG\r\n", 2)]
+
+
+def test_line_buffer_drops_an_overlong_partial_line():
+    lines = LineBuffer(max_line=8)
+    assert lines.feed(b"0123456789", 1) == []
+    assert lines.feed(b"ok\n", 2) == [(b"ok\n", 2)]
+
+
+def test_read_available_reads_everything_waiting_at_once():
+    ser = BufferedSerial(b"abc\r\ndef\r\n")
+    data, t_received = read_available(ser)
+    assert data == b"abc\r\ndef\r\n"
+    assert ser.reads == 1
+    assert t_received > 0
+
+
+def test_runtime_hosts_a_sensor_until_stopped(stream):
+    gps = GPSListener(None, stream, simulated_rate_hz=20)
+    messages = []
+    gps.register_message_callback(lambda message, message_type: messages.append(message))
+    runtime = SensorRuntime()
+    runtime.start()
+    try:
+        runtime.run(gps)
+        assert stream.received.wait(3.0)
+        gps.stop()
+    finally:
+        runtime.stop()
+    assert stream.samples[0][0] == "GPS"
+    assert not gps.connected
+    assert not any("Reconnecting" in message for message in messages)
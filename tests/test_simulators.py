@@ -0,0 +1,37 @@
+import time
+
+from nmea import NMEAParser, GGA, RMC
+from simulators import SimulatedSerial, heart_rate_measurement, nmea_chunks, trigger_chunks, trigger_frame_chunks
+from heart_rate import decode_heart_rate
+from trigger_frames import FrameDecoder
+
+
+def test_nmea_epochs_are_valid():
+    parser = NMEAParser()
+    chunks = nmea_chunks(10)
+    decoded = parser.feed(b"".join(next(chunks) for _ in range(5)))
+    assert [type(sentence) for sentence in decoded] == [GGA, RMC] * 5
+    assert parser.checksum_errors == 0
+    assert decoded[0].utc == decoded[1].utc
+
+
+def test_trigger_chunks_cycle():
+    chunks = trigger_chunks(3)
+    assert [next(chunks) for _ in range(4)] == [b"1\r\n", b"2\r\n", b"3\r\n", b"1\r\n"]
+    frames = FrameDecoder().feed(b"".join(next(trigger_frame_chunks(2)) for _ in range(1)))
+    assert frames[0][0] == 1
+
+
+def test_heart_rate_measurement_decodes():
+    assert decode_heart_rate(heart_rate_measurement(300, [0.5])) == (300, None, [0.5])
+
+
+def test_simulated_serial_paces_its_output():
+    ser = SimulatedSerial(trigger_chunks(4), rate_hz=50, timeout=1.0)
+    t_start = time.monotonic()
+    data = b""
+    while data.count(b"\n") < 5:
+        data += ser.read(ser.in_waiting or 1)
+    assert time.monotonic() - t_start >= 0.07
+    ser.close()
+    assert ser.read() == b""
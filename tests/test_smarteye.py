@@ -0,0 +1,16 @@
+import pytest
+
+pytest.importorskip("sep")
+
+from sep.sepd import Parser
+
+from imotions_schema import get_schema
+from simulators import sepd_packets
+from smarteye import _extract_sep_dx, _serialize_sep_dx
+
+
+def test_sep_dx_fields_follow_the_schema():
+    packet = Parser().parse_packet(next(sepd_packets(120)))
+    values = _extract_sep_dx(packet)
+    assert len(values) == len(get_schema("SEP_DX").fields)
+    assert _serialize_sep_dx(packet) == ";".join(map(str, values))
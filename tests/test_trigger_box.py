@@ -0,0 +1,52 @@
+import time
+
+import pytest
+
+from trigger_box import TriggerBoxListener
+from trigger_frames import FrameDecoder, encode_frame
+
+TRIGGERS = ["FP_LEFT", "FP_RIGHT", "DRIVE", "DONE"]
+
+
+def trigger_times(stream):
+    return [(values[0], values[1]) for _, _, values in stream.samples]
+
+
+def test_plain_line_is_sent_with_its_arrival_time(stream):
+    listener = TriggerBoxListener(TRIGGERS, None, stream)
+    t_received = time.perf_counter_ns()
+    listener.process_line(b"3\r\n", t_received)
+    [(cmd, trigger_time)] = trigger_times(stream)
+    assert cmd == "DRIVE"
+    assert trigger_time == pytest.approx(time.time(), abs=0.05)
+    assert stream.samples[0][0] == "TriggerBox"
+
+
+def test_timed_lines_are_mapped_through_the_device_clock(stream):
+    listener = TriggerBoxListener(TRIGGERS, None, stream)
+    t0 = time.perf_counter_ns()
+    listener.process_line(b"0,1000000\r\n", t0)
+    assert stream.samples == []
+    assert listener.device_clock.pending == 0
+    # Arrived 30 ms late; the trigger keeps its device time
+    listener.process_line(b"1,1100000\r\n", t0 + 130_000_000)
+    [(cmd, trigger_time)] = trigger_times(stream)
+    assert cmd == "FP_LEFT"
+    expected = time.time() - (time.perf_counter_ns() - (t0 + 100_000_000)) * 1e-9
+    assert trigger_time == pytest.approx(expected, abs=0.005)
+
+
+def test_unknown_and_malformed_lines_are_ignored(stream):
+    listener = TriggerBoxListener(TRIGGERS, None, stream)
+    listener.process_line(b"9\r\n", time.perf_counter_ns())
+    listener.process_line(b"1,abc\r\n", time.perf_counter_ns())
+    assert stream.samples == []
+
+
+def test_binary_frames(stream):
+    listener = TriggerBoxListener(TRIGGERS, None, stream, protocol="binary")
+    decoder = FrameDecoder()
+    t0 = time.perf_counter_ns()
+    for item in decoder.feed(encode_frame(0, 5000) + encode_frame(2, 6000) + encode_frame(9, 7000), t0):
+        listener.process_frame(*item)
+    assert [cmd for cmd, _ in trigger_times(stream)] == ["FP_RIGHT"]
@@ -0,0 +1,38 @@
+from trigger_frames import FRAME_SIZE, SYNC, FrameDecoder, crc8, encode_frame
+
+
+def test_crc8_check_value():
+    # CRC-8/SMBUS of "123456789"
+    assert crc8(b"123456789") == 0xF4
+
+
+def test_round_trip():
+    decoder = FrameDecoder()
+    data = encode_frame(1, 123) + encode_frame(4, 0xFFFFFFFF) + encode_frame(0, 2 ** 32 + 5)
+    assert decoder.feed(data, 7) == [(1, 123, 7), (4, 0xFFFFFFFF, 7), (0, 5, 7)]
+    assert decoder.frames == 3
+
+
+def test_frame_split_across_reads_keeps_the_time_of_its_sync_byte():
+    decoder = FrameDecoder()
+    frame = encode_frame(2, 1000)
+    assert decoder.feed(frame[:3], 1) == []
+    assert decoder.feed(frame[3:] + frame[:1], 2) == [(2, 1000, 1)]
+    assert decoder.feed(frame[1:], 3) == [(2, 1000, 2)]
+
+
+def test_corrupted_frame_is_dropped_and_the_next_one_found():
+    decoder = FrameDecoder()
+    bad = bytearray(encode_frame(1, 1000))
+    bad[3] ^= 0xFF
+    # A sync value inside the corrupted frame must not swallow the good one
+    bad[4] = SYNC
+    assert decoder.feed(b"\x00\x01" + bytes(bad) + encode_frame(3, 2000), 1) == [(3, 2000, 1)]
+    assert decoder.crc_errors >= 1
+    assert decoder.skipped_bytes == 2 + FRAME_SIZE
+
+
+def test_garbage_without_sync_is_skipped():
+    decoder = FrameDecoder()
+    assert decoder.feed(b"\x00" * 10, 1) == []
+    assert decoder.skipped_bytes == 10
@@ -3,13 +3,18 @@ import socket
 import keyboard
 import re
 import serial
+import asyncio
+import time
 from datetime import datetime
+from device_clock import DeviceClock
 from utils import haversine_distance
 from sensor import Sensor
+from trigger_frames import FrameDecoder
+from sensor_runtime import LineBuffer, SerialLineReader, read_available
 
 
 class TriggerBoxListener(Sensor):
-    def __init__(self, triggers, serial_com,stream,callback=None):
+    def __init__(self, triggers, serial_com,stream,callback=None,simulated_rate_hz=None,protocol="ascii",baud=9600):
         super().__init__()
         self.triggers = triggers
         self.stream = stream
@@ -18,14 +23,37 @@ class TriggerBoxListener(Sensor):
         self.is_debug = False
         self.callback = callback
         self.running = False
+        self.simulated_rate_hz = simulated_rate_hz
+        # "ascii" lines or "binary" frames (see trigger_frames.py)
+        self.protocol = protocol
+        self.baud = baud
+        self.frame_decoder = None
+        # Trigger line -> trigger, with and without line ending, so a line is looked up as it comes off the port
+        self._commands = {}
+        for index, trigger in enumerate(triggers, 1):
+            for ending in (b"", b"\n", b"\r\n"):
+                self._commands[b"%d%s" % (index, ending)] = trigger
+        # Maps the micros() of "<index>,<micros>" lines and of frames onto the host clock
+        self.device_clock = DeviceClock()
         #self.start()
 
     def connect(self):
+        # Opening the port resets an Arduino, and with it its micros() counter
+        self.device_clock.reset()
         try:
-            self.ser = serial.Serial(self.serial_com, 9600, timeout=1)
+            if self.simulated_rate_hz:
+                from simulators import SimulatedSerial, trigger_chunks, trigger_frame_chunks
+
+                chunks = trigger_frame_chunks if self.protocol == "binary" else trigger_chunks
+                self.ser = SimulatedSerial(chunks(len(self.triggers)), self.simulated_rate_hz, timeout=1)
+                self.running = True
+                self._notify_status_change(True)
+                self._notify_message(f"Trigger Box: Simulated triggers at {self.simulated_rate_hz} Hz", "Success")
+                return
+            self.ser = serial.Serial(self.serial_com, self.baud, timeout=1)
             self.running = True
             self._notify_status_change(True)
-            self._notify_message(f"Trigger Box: Connected on {self.serial_com}", "Success")
+            self._notify_message(f"Trigger Box: Connected on {self.serial_com} at {self.baud} baud ({self.protocol})", "Success")
         except serial.SerialException as e:
             self._notify_status_change(False)
             self._notify_message(f"Trigger Box: Error - {e}", "Error")
@@ -38,10 +66,14 @@ class TriggerBoxListener(Sensor):
         3 = DRIVE
         4 = DONE
         """
-        for i, trigger in enumerate(self.triggers):
-            if str(i+1) == trigger_index:
-                return trigger
-        return None
+        return self._commands.get(trigger_index)
+    
+    def _splitter(self):
+        """Return the splitter of the configured protocol and the handler of the items it returns."""
+        if self.protocol == "binary":
+            self.frame_decoder = FrameDecoder()
+            return self.frame_decoder, self.process_frame
+        return LineBuffer(), self.process_line
     
     def start(self):
         """
@@ -49,23 +81,80 @@ class TriggerBoxListener(Sensor):
         """
         if self.ser is None:
             return
+        splitter, handle = self._splitter()
         while self.running:
-            line = self.ser.readline().decode("ascii", errors="ignore").strip()
-            if line:
-                cmd = self.parse_trigger(line)
-                if cmd is not None:
-                    data = f"E;1;Shamir_TB;1;;;;TriggerBox;{cmd}\r\n"
-                    
-                    # send the data to the UDP client
-                    try:
-                        if self.stream:
-                            self.stream.send(data.encode())
-                    except:
-                        self._notify_status_change(False)
-                        self._notify_message(f"Trigger Box: Failed to sent to IMotions", "Error")
+            for item in splitter.feed(*read_available(self.ser)):
+                handle(*item)
+    
+    async def run(self):
+        """Connect and read the trigger box on the shared event loop (see sensor_runtime.py)."""
+        await asyncio.to_thread(self.connect)
+        if self.ser is None or not self.running:
+            return
+        splitter, handle = self._splitter()
+        reader = SerialLineReader(self.ser, splitter=splitter)
+        try:
+            while self.running:
+                for item in await reader.read_lines():
+                    handle(*item)
+        finally:
+            reader.close()
+            # Free the port, so that a reconnect can open it again
+            self.ser.close()
+    
+    def process_line(self, line, t_received):
+        """Handle one raw trigger line (bytes) whose first byte was read at perf_counter_ns() t_received.
+
+        A line is "<index>" or "<index>,<micros>" with the trigger box's
+        micros() counter at the trigger; index 0 only synchronises the clock.
+        The trigger is sent with its time as Unix seconds: the device time
+        mapped onto the host clock if the line has one, else t_received.
+        """
+        cmd = self._commands.get(line)
+        t_trigger = t_received
+        comma = None
+        if cmd is None:
+            index, comma, micros = line.strip().partition(b",")
+            if comma:
+                try:
+                    t_trigger = self.device_clock.to_host(int(micros), t_received)
+                except ValueError:
+                    return
+            cmd = self._commands.get(index)
+        if cmd is not None:
+            self._send_trigger(cmd, t_trigger, t_received)
+        # Off the latency path: the trigger, if any, has been sent
+        if comma and (cmd is None or self.device_clock.due):
+            self.device_clock.refit()
+    
+    def process_frame(self, trigger_id, micros, t_received):
+        """Handle one binary frame whose sync byte was read at perf_counter_ns() t_received; id 0 only synchronises the clock."""
+        t_trigger = self.device_clock.to_host(micros, t_received)
+        if 0 < trigger_id <= len(self.triggers):
+            self._send_trigger(self.triggers[trigger_id - 1], t_trigger, t_received)
+        # Off the latency path: the trigger, if any, has been sent
+        if trigger_id == 0 or self.device_clock.due:
+            self.device_clock.refit()
+    
+    def _send_trigger(self, cmd, t_trigger, t_received):
+        trigger_time = time.time() - (time.perf_counter_ns() - t_trigger) * 1e-9
+        # send the sample to IMotions, it is encoded by the stream
+        try:
+            if self.stream:
+                self._record_parse_latency(t_received)
+                self.stream.send_sample("TriggerBox", (cmd, trigger_time), t_received, self.latency)
+        except:
+            self._notify_status_change(False)
+            self._notify_message(f"Trigger Box: Failed to sent to IMotions", "Error")
     
     def stop(self):
         self.running = False
+        if self.ser:
+            # A stop, not a lost connection, for supervise() once the woken read loop ends
+            self._stop_requested = True
+            # Wake start() from a blocking read at once instead of at the port timeout
+            self.ser.cancel_read()
+        self._cancel_run()
         if self.ser:
             self.ser.close()
         self._notify_status_change(False)